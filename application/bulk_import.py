@@ -0,0 +1,62 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Optional
+
+SUPPORTED_FORMATS = ("ndjson", "csv")
+
+
+async def aiter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Разбить поток байтов на строки без загрузки всего тела в память"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    tail = ""
+    async for chunk in chunks:
+        tail += decoder.decode(chunk)
+        *lines, tail = tail.split("\n")
+        for line in lines:
+            yield line
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _parse_ndjson(line: str) -> Any:
+    """Разобрать строку NDJSON"""
+    return json.loads(line)
+
+
+class _CsvParser:
+    """Построчный разбор CSV с заголовком в первой строке"""
+
+    def __init__(self):
+        self.header: Optional[list[str]] = None
+
+    def __call__(self, line: str) -> Optional[dict[str, str]]:
+        try:
+            values = next(csv.reader([line]))
+        except csv.Error as e:
+            raise ValueError(str(e))
+
+        if self.header is None:
+            self.header = [name.strip() for name in values]
+            return None
+
+        if len(values) != len(self.header):
+            raise ValueError(
+                f"Expected {len(self.header)} columns, got {len(values)}"
+            )
+        # Пустые ячейки считаем отсутствующими значениями
+        return {name: value for name, value in zip(self.header, values) if value != ""}
+
+
+def make_record_parser(fmt: str) -> Callable[[str], Any]:
+    """Получить парсер строк для формата импорта.
+
+    Парсер возвращает None для служебных строк (заголовок CSV)
+    и выбрасывает ValueError для некорректных строк.
+    """
+    if fmt == "ndjson":
+        return _parse_ndjson
+    if fmt == "csv":
+        return _CsvParser()
+    raise ValueError(f"Unsupported import format: {fmt}")
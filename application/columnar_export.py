@@ -0,0 +1,114 @@
+from typing import AsyncIterable, AsyncIterator
+
+from domain.entities import PredictionLog
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - зависит от окружения
+    pa = None
+    pq = None
+
+COLUMNAR_FORMATS = ("arrow", "parquet")
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def columnar_available() -> bool:
+    """Установлен ли pyarrow"""
+    return pa is not None
+
+
+def arrow_schema() -> "pa.Schema":
+    """Схема выгрузки; метки времени хранятся в UTC"""
+    return pa.schema(
+        [
+            pa.field("id", pa.int64(), nullable=False),
+            pa.field(
+                "model_name", pa.dictionary(pa.int32(), pa.string()), nullable=False
+            ),
+            pa.field("duration_ms", pa.int32(), nullable=False),
+            pa.field("was_successful", pa.bool_(), nullable=False),
+            pa.field("timestamp", pa.timestamp("us", tz="UTC"), nullable=False),
+        ]
+    )
+
+
+def to_record_batch(
+    batch: list[PredictionLog], schema: "pa.Schema"
+) -> "pa.RecordBatch":
+    """Пачка сущностей в record batch; имена моделей кодируются словарем"""
+    return pa.record_batch(
+        [
+            pa.array([p.id for p in batch], pa.int64()),
+            pa.array([p.model_name for p in batch], pa.string()).dictionary_encode(),
+            pa.array([p.duration_ms for p in batch], pa.int32()),
+            pa.array([p.was_successful for p in batch], pa.bool_()),
+            pa.array([p.timestamp for p in batch], pa.timestamp("us", tz="UTC")),
+        ],
+        schema=schema,
+    )
+
+
+class _ChunkSink:
+    """Файлоподобный приемник, отдающий записанные байты порциями"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        """Забрать накопленные байты"""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def encode_columnar(
+    batches: AsyncIterable[list[PredictionLog]], fmt: str
+) -> AsyncIterator[bytes]:
+    """Кодировать пачки в Arrow IPC stream или Parquet по мере чтения курсора"""
+    if not columnar_available():
+        raise RuntimeError("pyarrow is required for arrow and parquet export")
+
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    output = pa.PythonFile(sink, mode="w")
+    if fmt == "parquet":
+        # Каждая пачка курсора становится отдельной группой строк
+        writer = pq.ParquetWriter(output, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(output, schema)
+
+    try:
+        async for batch in batches:
+            if not batch:
+                continue
+            record_batch = to_record_batch(batch, schema)
+            if fmt == "parquet":
+                writer.write_batch(record_batch, row_group_size=len(batch))
+            else:
+                writer.write_batch(record_batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+    # Завершение потока Arrow или футер Parquet
+    yield sink.drain()
@@ -1,7 +1,12 @@
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Any, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import AfterValidator, BaseModel, Field
+
+from utils.datetimes import to_utc_naive
+
+# Метка времени, приведенная к naive UTC при разборе запроса
+UtcDatetime = Annotated[datetime, AfterValidator(to_utc_naive)]
 
 
 class PredictionLogCreate(BaseModel):
@@ -10,7 +15,7 @@ class PredictionLogCreate(BaseModel):
     model_name: str = Field(..., description="Название модели")
     duration_ms: int = Field(..., ge=0, description="Время выполнения в миллисекундах")
     was_successful: bool = Field(..., description="Успешность предсказания")
-    timestamp: Optional[datetime] = Field(None, description="Временная метка")
+    timestamp: Optional[UtcDatetime] = Field(None, description="Временная метка")
 
 
 class PredictionLogResponse(BaseModel):
@@ -26,17 +31,98 @@ class PredictionLogResponse(BaseModel):
         from_attributes = True
 
 
+class PredictionLogPageResponse(BaseModel):
+    """Схема страницы логов предсказаний с курсором"""
+
+    items: list[PredictionLogResponse]
+    next_cursor: Optional[str] = Field(
+        None, description="Курсор следующей страницы, null если страница последняя"
+    )
+
+
+class PredictionLogBatchError(BaseModel):
+    """Схема ошибки валидации элемента пачки"""
+
+    index: int = Field(..., description="Позиция элемента во входном списке")
+    errors: list[dict[str, Any]] = Field(..., description="Ошибки валидации")
+
+
+class PredictionLogBatchResponse(BaseModel):
+    """Схема ответа для пакетного логирования предсказаний"""
+
+    created: list[PredictionLogResponse]
+    errors: list[PredictionLogBatchError]
+
+
+class BulkImportRejectedLine(BaseModel):
+    """Схема отклоненной строки импорта"""
+
+    line: int = Field(..., description="Номер строки во входных данных")
+    errors: list[dict[str, Any]] = Field(..., description="Ошибки разбора или валидации")
+
+
+class BulkImportResponse(BaseModel):
+    """Схема отчета о массовом импорте логов"""
+
+    accepted: int
+    rejected: int
+    rejected_lines: list[BulkImportRejectedLine]
+    elapsed_seconds: float
+    rows_per_second: float
+
+
 class PredictionStatsResponse(BaseModel):
     """Схема ответа для статистики предсказаний"""
 
     total_requests: int
     successful_requests: int
     average_duration_ms: float
+    min_duration_ms: Optional[int] = None
+    max_duration_ms: Optional[int] = None
+    percentiles: dict[str, float] = Field(
+        default_factory=dict, description="Перцентили длительности, например p99"
+    )
 
     class Config:
         from_attributes = True
 
 
+class ModelStatsResponse(BaseModel):
+    """Схема статистики одной модели в сводке"""
+
+    model_name: str
+    total_requests: int
+    successful_requests: int
+    average_duration_ms: float
+
+
+class MultiModelStatsResponse(BaseModel):
+    """Схема ответа сводной статистики по нескольким моделям"""
+
+    models: list[ModelStatsResponse]
+
+
+class TimeseriesBucketResponse(BaseModel):
+    """Схема одного интервала временного ряда статистики"""
+
+    bucket_start: datetime
+    total_requests: int
+    successful_requests: int
+    average_duration_ms: float
+    histogram: Optional[list[int]] = Field(
+        None, description="Счетчики длительностей между границами histogram_bounds"
+    )
+
+
+class PredictionTimeseriesResponse(BaseModel):
+    """Схема ответа временного ряда статистики предсказаний"""
+
+    model_name: str
+    interval: str
+    histogram_bounds: Optional[list[int]] = None
+    buckets: list[TimeseriesBucketResponse]
+
+
 class StatsQueryParams(BaseModel):
     """Схема для параметров запроса статистики"""
 
@@ -1,11 +1,72 @@
+import base64
+import csv
+import io
+import json
+import time
 from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Optional, Sequence
 
+from pydantic import ValidationError
+
+from application.bulk_import import make_record_parser
+from application.columnar_export import COLUMNAR_FORMATS, encode_columnar
 from application.schemas import (
+    BulkImportRejectedLine,
+    BulkImportResponse,
+    ModelStatsResponse,
+    MultiModelStatsResponse,
+    PredictionLogBatchError,
+    PredictionLogBatchResponse,
     PredictionLogCreate,
+    PredictionLogPageResponse,
     PredictionLogResponse,
     PredictionStatsResponse,
+    PredictionTimeseriesResponse,
+    TimeseriesBucketResponse,
 )
+from domain.dto import ModelStatsDTO, PredictionLogFilter
+from domain.entities import PredictionLog
 from domain.services import PredictionLogService
+from utils.datetimes import utcnow
+from utils.metrics import CallbackMetric
+from utils.serialization import dumps
+from utils.single_flight import SingleFlight
+
+
+def _to_response(prediction_log: PredictionLog) -> PredictionLogResponse:
+    """Преобразовать доменную сущность в схему ответа"""
+    return PredictionLogResponse(
+        id=prediction_log.id,
+        model_name=prediction_log.model_name,
+        duration_ms=prediction_log.duration_ms,
+        was_successful=prediction_log.was_successful,
+        timestamp=prediction_log.timestamp,
+    )
+
+
+def _to_model_stats(stats: ModelStatsDTO) -> ModelStatsResponse:
+    """Преобразовать DTO статистики модели в схему ответа"""
+    return ModelStatsResponse(
+        model_name=stats.model_name,
+        total_requests=stats.total_requests,
+        successful_requests=stats.successful_requests,
+        average_duration_ms=stats.average_duration_ms,
+    )
+
+
+def encode_cursor(prediction_log: PredictionLog) -> str:
+    """Закодировать позицию (timestamp, id) в непрозрачный курсор"""
+    payload = json.dumps([prediction_log.timestamp.isoformat(), prediction_log.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Раскодировать курсор в позицию (timestamp, id)"""
+    try:
+        timestamp, prediction_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(timestamp), int(prediction_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 
 class LogPredictionUseCase:
@@ -14,46 +75,377 @@ class LogPredictionUseCase:
     def __init__(self, service: PredictionLogService):
         self.service = service
 
-    async def execute(self, data: PredictionLogCreate) -> PredictionLogResponse:
-        """Выполнить логирование предсказания"""
-        # Используем текущее время если timestamp не указан
-        timestamp = data.timestamp or datetime.now(datetime.UTC)
-        # Убираем timezone для совместимости с PostgreSQL
-        if timestamp.tzinfo is not None:
-            timestamp = timestamp.replace(tzinfo=None)
+    async def execute(self, data: PredictionLogCreate) -> Optional[PredictionLogResponse]:
+        """Выполнить логирование предсказания.
 
+        Возвращает None, если лог принят буфером отложенной записи без ожидания.
+        """
         prediction_log = await self.service.log_prediction(
             model_name=data.model_name,
             duration_ms=data.duration_ms,
             was_successful=data.was_successful,
-            timestamp=timestamp,
+            timestamp=data.timestamp or utcnow(),
+        )
+        if prediction_log is None:
+            return None
+
+        return _to_response(prediction_log)
+
+
+class LogPredictionBatchUseCase:
+    """Use case для пакетного логирования предсказаний"""
+
+    def __init__(self, service: PredictionLogService):
+        self.service = service
+
+    async def execute(self, items: list[Any]) -> PredictionLogBatchResponse:
+        """Провалидировать элементы пачки и записать валидные"""
+        predictions: list[PredictionLog] = []
+        errors: list[PredictionLogBatchError] = []
+
+        for index, item in enumerate(items):
+            try:
+                data = PredictionLogCreate.model_validate(item)
+            except ValidationError as e:
+                errors.append(
+                    PredictionLogBatchError(
+                        index=index,
+                        errors=e.errors(include_url=False, include_context=False),
+                    )
+                )
+                continue
+
+            predictions.append(
+                PredictionLog(
+                    model_name=data.model_name,
+                    duration_ms=data.duration_ms,
+                    was_successful=data.was_successful,
+                    timestamp=data.timestamp or utcnow(),
+                )
+            )
+
+        created = await self.service.log_predictions(predictions)
+
+        return PredictionLogBatchResponse(
+            created=[_to_response(prediction) for prediction in created],
+            errors=errors,
+        )
+
+
+class BulkImportPredictionsUseCase:
+    """Use case для массового импорта исторических логов из NDJSON/CSV"""
+
+    def __init__(
+        self,
+        service: PredictionLogService,
+        chunk_size: int = 5000,
+        max_reported_errors: int = 100,
+    ):
+        self.service = service
+        self.chunk_size = chunk_size
+        self.max_reported_errors = max_reported_errors
+
+    async def execute(self, lines: AsyncIterable[str], fmt: str) -> BulkImportResponse:
+        """Разобрать строки, провалидировать и загрузить их пачками"""
+        parse = make_record_parser(fmt)
+        started = time.perf_counter()
+        chunk: list[PredictionLog] = []
+        accepted = 0
+        rejected = 0
+        rejected_lines: list[BulkImportRejectedLine] = []
+
+        def reject(line_number: int, errors: list[dict[str, Any]]) -> None:
+            nonlocal rejected
+            rejected += 1
+            if len(rejected_lines) < self.max_reported_errors:
+                rejected_lines.append(
+                    BulkImportRejectedLine(line=line_number, errors=errors)
+                )
+
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+
+            try:
+                record = parse(line)
+            except ValueError as e:
+                reject(line_number, [{"type": "parse_error", "msg": str(e)}])
+                continue
+            if record is None:
+                continue
+
+            try:
+                data = PredictionLogCreate.model_validate(record)
+            except ValidationError as e:
+                reject(line_number, e.errors(include_url=False, include_context=False))
+                continue
+
+            chunk.append(
+                PredictionLog(
+                    model_name=data.model_name,
+                    duration_ms=data.duration_ms,
+                    was_successful=data.was_successful,
+                    timestamp=data.timestamp or utcnow(),
+                )
+            )
+            if len(chunk) >= self.chunk_size:
+                accepted += await self.service.import_predictions(chunk)
+                chunk = []
+
+        if chunk:
+            accepted += await self.service.import_predictions(chunk)
+
+        elapsed = time.perf_counter() - started
+        return BulkImportResponse(
+            accepted=accepted,
+            rejected=rejected,
+            rejected_lines=rejected_lines,
+            elapsed_seconds=round(elapsed, 3),
+            rows_per_second=round(accepted / elapsed, 1) if elapsed > 0 else 0.0,
         )
 
-        return PredictionLogResponse(
-            id=prediction_log.id,
-            model_name=prediction_log.model_name,
-            duration_ms=prediction_log.duration_ms,
-            was_successful=prediction_log.was_successful,
-            timestamp=prediction_log.timestamp,
+
+class ListPredictionsUseCase:
+    """Use case для постраничного получения логов по курсору"""
+
+    def __init__(self, service: PredictionLogService):
+        self.service = service
+
+    async def execute(
+        self, filters: PredictionLogFilter, limit: int, after: Optional[str] = None
+    ) -> PredictionLogPageResponse:
+        """Получить страницу логов и курсор следующей страницы"""
+        predictions, next_cursor = await self.fetch(filters, limit, after)
+        return PredictionLogPageResponse(
+            items=[_to_response(prediction) for prediction in predictions],
+            next_cursor=next_cursor,
+        )
+
+    async def fetch(
+        self, filters: PredictionLogFilter, limit: int, after: Optional[str] = None
+    ) -> tuple[list[PredictionLog], Optional[str]]:
+        """Получить сущности страницы и курсор без построения схем ответа"""
+        position = decode_cursor(after) if after else None
+        # Берем на одну запись больше, чтобы понять, есть ли следующая страница
+        predictions = await self.service.get_predictions_page(
+            filters, limit + 1, position
         )
 
+        next_cursor = None
+        if len(predictions) > limit:
+            predictions = predictions[:limit]
+            next_cursor = encode_cursor(predictions[-1])
+        return predictions, next_cursor
+
+
+class ExportPredictionsUseCase:
+    """Use case для потоковой выгрузки логов в NDJSON/CSV/Arrow/Parquet"""
+
+    CSV_COLUMNS = ["id", "model_name", "duration_ms", "was_successful", "timestamp"]
+
+    def __init__(self, service: PredictionLogService, batch_size: int = 1000):
+        self.service = service
+        self.batch_size = batch_size
+
+    async def execute(
+        self, filters: PredictionLogFilter, fmt: str
+    ) -> AsyncIterator[bytes]:
+        """Выдавать закодированные пачки строк по мере чтения курсора"""
+        batches = self.service.stream_predictions(filters, self.batch_size)
+        if fmt in COLUMNAR_FORMATS:
+            async for chunk in encode_columnar(batches, fmt):
+                yield chunk
+            return
+
+        if fmt == "csv":
+            yield (",".join(self.CSV_COLUMNS) + "\r\n").encode()
+
+        async for batch in batches:
+            if fmt == "csv":
+                yield self._encode_csv(batch)
+            else:
+                yield self._encode_ndjson(batch)
+
+    def _encode_ndjson(self, batch: list[PredictionLog]) -> bytes:
+        """Закодировать пачку в NDJSON"""
+        return b"".join(dumps(p) + b"\n" for p in batch)
+
+    def _encode_csv(self, batch: list[PredictionLog]) -> bytes:
+        """Закодировать пачку в CSV"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(
+            (
+                p.id,
+                p.model_name,
+                p.duration_ms,
+                "true" if p.was_successful else "false",
+                p.timestamp.isoformat(),
+            )
+            for p in batch
+        )
+        return buffer.getvalue().encode()
+
+
+stats_single_flight = SingleFlight()
+
+CallbackMetric(
+    "stats_single_flight_leaders_total",
+    "Запросы статистики, выполненные в БД",
+    lambda: stats_single_flight.leaders,
+    kind="counter",
+)
+CallbackMetric(
+    "stats_single_flight_coalesced_total",
+    "Запросы статистики, дождавшиеся чужого результата",
+    lambda: stats_single_flight.coalesced,
+    kind="counter",
+)
+CallbackMetric(
+    "stats_single_flight_in_flight",
+    "Выполняющиеся сейчас запросы статистики",
+    stats_single_flight.in_flight,
+)
+
 
 class GetPredictionStatsUseCase:
     """Use case для получения статистики предсказаний"""
 
-    def __init__(self, service: PredictionLogService):
+    def __init__(
+        self,
+        service: PredictionLogService,
+        single_flight: Optional[SingleFlight] = stats_single_flight,
+    ):
         self.service = service
+        self.single_flight = single_flight
 
     async def execute(
-        self, model_name: str, from_date: datetime, to_date: datetime
+        self,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        percentiles: Sequence[float] = (),
+        exact: bool = False,
     ) -> PredictionStatsResponse:
         """Получить статистику предсказаний"""
-        stats = await self.service.get_prediction_stats(
-            model_name=model_name, from_date=from_date, to_date=to_date
-        )
+        percentiles = tuple(sorted({float(p) for p in percentiles}))
+
+        async def query():
+            return await self.service.get_prediction_stats(
+                model_name=model_name,
+                from_date=from_date,
+                to_date=to_date,
+                percentiles=percentiles,
+                exact=exact,
+            )
+
+        if self.single_flight is None:
+            stats = await query()
+        else:
+            # Одинаковые конкурентные запросы ждут один общий запрос к БД
+            key = (model_name, from_date, to_date, percentiles, exact)
+            stats = await self.single_flight.do(key, query)
 
         return PredictionStatsResponse(
             total_requests=stats.total_requests,
             successful_requests=stats.successful_requests,
             average_duration_ms=stats.average_duration_ms,
+            min_duration_ms=stats.min_duration_ms,
+            max_duration_ms=stats.max_duration_ms,
+            percentiles=stats.percentiles,
         )
+
+
+class GetPredictionTimeseriesUseCase:
+    """Use case для получения временного ряда статистики"""
+
+    INTERVALS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+
+    def __init__(self, service: PredictionLogService, max_buckets: int = 10000):
+        self.service = service
+        self.max_buckets = max_buckets
+
+    async def execute(
+        self,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        interval: str,
+        histogram_bounds: Sequence[int] = (),
+    ) -> PredictionTimeseriesResponse:
+        """Получить статистику по интервалам за период"""
+        if interval not in self.INTERVALS:
+            raise ValueError(f"Unsupported interval: {interval}")
+        interval_seconds = self.INTERVALS[interval]
+        if (to_date - from_date).total_seconds() / interval_seconds > self.max_buckets:
+            raise ValueError(f"Too many buckets, limit is {self.max_buckets}")
+        if list(histogram_bounds) != sorted(set(histogram_bounds)):
+            raise ValueError("Histogram bounds must be strictly increasing")
+
+        buckets = await self.service.get_prediction_timeseries(
+            model_name, from_date, to_date, interval_seconds, histogram_bounds
+        )
+
+        return PredictionTimeseriesResponse(
+            model_name=model_name,
+            interval=interval,
+            histogram_bounds=list(histogram_bounds) or None,
+            buckets=[
+                TimeseriesBucketResponse(
+                    bucket_start=bucket.bucket_start,
+                    total_requests=bucket.total_requests,
+                    successful_requests=bucket.successful_requests,
+                    average_duration_ms=bucket.average_duration_ms,
+                    histogram=bucket.histogram,
+                )
+                for bucket in buckets
+            ],
+        )
+
+
+class GetModelsStatsUseCase:
+    """Use case для сводной статистики по нескольким моделям"""
+
+    ORDERINGS = ("volume", "error_rate", "latency")
+
+    def __init__(self, service: PredictionLogService):
+        self.service = service
+
+    def _validate(self, order_by: Optional[str], top_k: Optional[int]) -> None:
+        if order_by is not None and order_by not in self.ORDERINGS:
+            raise ValueError(f"Unsupported ordering: {order_by}")
+        if top_k is not None and top_k < 1:
+            raise ValueError("top_k must be positive")
+
+    async def execute(
+        self,
+        model_names: Optional[Sequence[str]],
+        from_date: datetime,
+        to_date: datetime,
+        order_by: Optional[str] = None,
+        top_k: Optional[int] = None,
+    ) -> MultiModelStatsResponse:
+        """Получить статистику по моделям (None - по всем моделям)"""
+        self._validate(order_by, top_k)
+        stats = await self.service.get_models_stats(
+            model_names, from_date, to_date, order_by, top_k
+        )
+        return MultiModelStatsResponse(models=[_to_model_stats(s) for s in stats])
+
+    async def stream(
+        self,
+        model_names: Optional[Sequence[str]],
+        from_date: datetime,
+        to_date: datetime,
+        order_by: Optional[str] = None,
+        top_k: Optional[int] = None,
+    ) -> AsyncIterator[bytes]:
+        """Выдавать статистику по моделям в NDJSON по мере чтения"""
+        self._validate(order_by, top_k)
+        async for batch in self.service.stream_models_stats(
+            model_names, from_date, to_date, order_by, top_k
+        ):
+            # Поля DTO совпадают с ModelStatsResponse
+            yield b"".join(dumps(stats) + b"\n" for stats in batch)
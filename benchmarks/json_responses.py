@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк сериализации списка логов: прежний путь через pydantic-схемы
+и response_model против прямой сериализации сущностей в байты.
+
+База данных не нужна: сравнивается только путь от сущностей до тела ответа.
+
+    python benchmarks/json_responses.py --rows 10000
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from application.schemas import PredictionLogResponse  # noqa: E402
+from domain.entities import PredictionLog  # noqa: E402
+from presentation.responses import FastJSONResponse  # noqa: E402
+from utils import serialization  # noqa: E402
+
+RESPONSE_FIELD = create_response_field(
+    name="Response_get_all_predictions", type_=list[PredictionLogResponse]
+)
+
+
+def make_logs(rows: int) -> list[PredictionLog]:
+    """Сущности, как их возвращает репозиторий"""
+    start = datetime(2025, 6, 1)
+    return [
+        PredictionLog(
+            id=i,
+            model_name=f"model_{i % 20}",
+            duration_ms=100 + i % 900,
+            was_successful=i % 10 != 0,
+            timestamp=start + timedelta(seconds=i),
+        )
+        for i in range(rows)
+    ]
+
+
+async def pydantic_path(logs: list[PredictionLog]) -> bytes:
+    """Сущность -> схема ответа -> проверка response_model -> dict -> json"""
+    responses = [
+        PredictionLogResponse(
+            id=log.id,
+            model_name=log.model_name,
+            duration_ms=log.duration_ms,
+            was_successful=log.was_successful,
+            timestamp=log.timestamp,
+        )
+        for log in logs
+    ]
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=responses)
+    return JSONResponse(content).body
+
+
+async def fast_path(logs: list[PredictionLog]) -> bytes:
+    """Сущности сразу в байты"""
+    return FastJSONResponse(logs).body
+
+
+async def measure(title: str, path, logs: list[PredictionLog], repeat: int) -> float:
+    """Вывести медиану и минимум времени сериализации"""
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await path(logs)
+        timings.append((time.perf_counter() - started) * 1000)
+        size = len(body)
+    median = statistics.median(timings)
+    print(f"{title:<32} p50 {median:8.2f} мс, min {min(timings):8.2f} мс, {size} байт")
+    return median
+
+
+async def run(rows: int, repeat: int) -> int:
+    """Сравнить пути сериализации"""
+    logs = make_logs(rows)
+    backend = "orjson" if serialization.orjson is not None else "stdlib json"
+    print(f"{rows} строк, {repeat} повторов, FastJSONResponse: {backend}")
+
+    baseline = await measure("pydantic + response_model", pydantic_path, logs, repeat)
+    fast = await measure("FastJSONResponse", fast_path, logs, repeat)
+    print(f"Ускорение: x{baseline / fast:.1f}")
+    return 0
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Бенчмарк JSON-ответов")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    return asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк индексов под запрос статистики: планы и задержка до и после.
+
+Нужен PostgreSQL (DATABASE_URL). Данные пишутся в отдельную таблицу
+bench_prediction_logs, рабочие таблицы не затрагиваются.
+
+    python benchmarks/stats_indexes.py --rows 10000000
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config import settings  # noqa: E402
+
+TABLE = "bench_prediction_logs"
+
+STATS_QUERY = f"""
+SELECT count(*),
+       sum(CASE WHEN was_successful THEN 1 ELSE 0 END),
+       sum(duration_ms), min(duration_ms), max(duration_ms)
+FROM {TABLE}
+WHERE model_name = 'model_7'
+  AND timestamp >= TIMESTAMP '2025-03-01' AND timestamp <= TIMESTAMP '2025-03-08'
+"""
+
+MODELS_QUERY = f"""
+SELECT model_name, count(*), sum(duration_ms)
+FROM {TABLE}
+WHERE timestamp >= TIMESTAMP '2025-03-01' AND timestamp <= TIMESTAMP '2025-03-02'
+GROUP BY model_name
+"""
+
+# Каждый сценарий применяется поверх предыдущего
+SCENARIOS = [
+    (
+        "single-column indexes (migration 001)",
+        [
+            f"CREATE INDEX bench_model_name ON {TABLE} (model_name)",
+            f"CREATE INDEX bench_timestamp ON {TABLE} (timestamp)",
+        ],
+    ),
+    (
+        "covering (model_name, timestamp) INCLUDE (duration_ms, was_successful)",
+        [
+            "DROP INDEX bench_model_name",
+            f"CREATE INDEX bench_covering ON {TABLE} (model_name, timestamp) "
+            "INCLUDE (duration_ms, was_successful)",
+        ],
+    ),
+    (
+        "covering + BRIN (timestamp) instead of B-tree",
+        [
+            "DROP INDEX bench_timestamp",
+            f"CREATE INDEX bench_brin ON {TABLE} USING brin (timestamp) "
+            "WITH (pages_per_range = 32)",
+        ],
+    ),
+]
+
+
+async def populate(conn: AsyncConnection, rows: int, models: int) -> None:
+    """Заполнить таблицу в порядке времени, как при постоянной записи логов"""
+    await conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    await conn.execute(
+        text(
+            f"""
+            CREATE TABLE {TABLE} (
+                id bigserial PRIMARY KEY,
+                model_name varchar NOT NULL,
+                duration_ms integer NOT NULL,
+                was_successful boolean NOT NULL,
+                timestamp timestamp NOT NULL
+            )
+            """
+        )
+    )
+    started = time.perf_counter()
+    await conn.execute(
+        text(
+            f"""
+            INSERT INTO {TABLE} (model_name, duration_ms, was_successful, timestamp)
+            SELECT 'model_' || (g % {int(models)}),
+                   (random() * 1000)::integer,
+                   random() > 0.05,
+                   TIMESTAMP '2025-01-01' + g * (interval '180 days' / {int(rows)})
+            FROM generate_series(1, {int(rows)}) AS g
+            """
+        )
+    )
+    print(f"Загружено {rows} строк за {time.perf_counter() - started:.1f} с")
+
+
+async def measure(conn: AsyncConnection, query: str, repeat: int) -> None:
+    """Вывести план и задержку запроса"""
+    plan = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {query}"))
+    for (line,) in plan:
+        print(f"    {line}")
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await conn.execute(text(query))
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+    print(
+        f"  p50 {statistics.median(timings):.2f} мс, "
+        f"p95 {p95:.2f} мс, min {timings[0]:.2f} мс"
+    )
+
+
+async def run(rows: int, models: int, repeat: int, keep: bool) -> int:
+    """Заполнить таблицу и замерить запросы во всех сценариях"""
+    engine = create_async_engine(settings.database_url)
+    async with engine.connect() as conn:
+        # VACUUM и CREATE INDEX вне транзакции
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await populate(conn, rows, models)
+
+        for title, statements in SCENARIOS:
+            for statement in statements:
+                await conn.execute(text(statement))
+            # Карта видимости нужна для index-only scan
+            await conn.execute(text(f"VACUUM ANALYZE {TABLE}"))
+            size = await conn.execute(
+                text(f"SELECT pg_size_pretty(pg_indexes_size('{TABLE}'))")
+            )
+            print(f"\n=== {title} (индексы: {size.scalar()})")
+            for name, query in (("stats", STATS_QUERY), ("models", MODELS_QUERY)):
+                print(f"  -- {name}")
+                await measure(conn, query, repeat)
+
+        if not keep:
+            await conn.execute(text(f"DROP TABLE {TABLE}"))
+    await engine.dispose()
+    return 0
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Бенчмарк индексов статистики")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--models", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--keep", action="store_true", help="Не удалять таблицу после замеров"
+    )
+    args = parser.parse_args()
+    return asyncio.run(run(args.rows, args.models, args.repeat, args.keep))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
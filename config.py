@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -12,14 +14,122 @@ class Settings(BaseSettings):
     db_user: str = "postgres"
     db_password: str = "password"
 
+    # Engine and connection pool settings
+    db_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Кэш подготовленных выражений asyncpg; 0 для PgBouncer в режиме transaction
+    db_statement_cache_size: int = 100
+    db_server_settings: dict[str, str] = {"application_name": "ml-logging-service"}
+    db_ready_timeout_s: float = 2.0
+
+    # Read replica settings
+    db_read_replica_urls: list[str] = []
+    db_replica_strategy: Literal["round_robin", "least_connections"] = "round_robin"
+    db_replica_retry_after_s: float = 30.0
+
+    # Partitioning settings (PostgreSQL, миграция 004)
+    partition_management_enabled: bool = True
+    partition_interval: Literal["day", "month"] = "month"
+    partition_premake: int = 3
+    partition_check_interval_s: float = 3600.0
+
+    # Retention settings
+    retention_enabled: bool = False
+    retention_raw_days: Optional[int] = None
+    retention_aggregate_months: Optional[int] = None
+    # {"model_name": {"raw_days": 30, "aggregate_months": 12}}
+    retention_policies: dict[str, dict[str, Optional[int]]] = {}
+    retention_batch_size: int = 10000
+    retention_batch_pause_ms: int = 100
+    retention_interval_s: float = 3600.0
+
+    # Schema drift check at startup: сравнение моделей со схемой после миграций
+    schema_drift_check: Literal["off", "warn", "fail"] = "warn"
+
     # Application settings
     app_name: str = "ML Prediction Logging Service"
     app_version: str = "1.0.0"
     debug: bool = False
 
+    # Ingestion settings
+    batch_max_size: int = 10000
+    bulk_import_chunk_size: int = 5000
+    bulk_import_max_reported_errors: int = 100
+
+    # Query settings
+    stats_rollups_enabled: bool = True
+    # Применяются, только если включены агрегаты (перцентили по скетчам)
+    stats_default_percentiles: list[float] = [50, 90, 95, 99]
+    timeseries_max_buckets: int = 10000
+    page_default_limit: int = 100
+    page_max_limit: int = 1000
+    export_batch_size: int = 1000
+    # Строк в одном record batch / группе строк Parquet
+    export_columnar_batch_size: int = 65536
+
+    # Stats cache settings
+    stats_cache_enabled: bool = True
+    stats_cache_max_entries: int = 1024
+    stats_cache_ttl_seconds: float = 5.0
+    stats_cache_settle_seconds: float = 60.0
+    # TTL окон в прошлом: ограничивает устаревание после записей мимо инвалидации
+    # (другой процесс, очистка, отставшая реплика)
+    stats_cache_settled_ttl_seconds: float = 600.0
+    stats_single_flight_enabled: bool = True
+
+    # Write-behind buffer settings
+    write_behind_enabled: bool = False
+    write_behind_batch_size: int = 500
+    write_behind_flush_interval_ms: int = 50
+    write_behind_max_queue_size: int = 10000
+    write_behind_overflow: Literal["reject", "block"] = "reject"
+    write_behind_block_timeout_ms: int = 1000
+    write_behind_ack_mode: Literal["accepted", "durable"] = "accepted"
+    write_behind_drain_timeout_s: float = 30.0
+
+    # Logging settings
+    log_level: Optional[str] = None  # по умолчанию INFO, при DEBUG=true - DEBUG
+    log_format: Literal["json", "text"] = "json"
+    log_queue_size: int = 10000
+    # Одинаковых предупреждений и ошибок за окно; остальные подавляются, 0 - без лимита
+    log_rate_limit_burst: int = 10
+    log_rate_limit_window_s: float = 60.0
+
+    # Metrics settings
+    metrics_enabled: bool = True
+    # Имена моделей, которые попадают в метки метрик; остальные считаются как other
+    metrics_model_labels: list[str] = []
+    # Каталог файлов метрик воркеров serve.py; пусто - временный каталог мастера
+    metrics_multiprocess_dir: Optional[str] = None
+    metrics_write_interval_s: float = 1.0
+
+    # Profiling settings
+    # Разбивка времени запроса в Server-Timing по заголовку X-Profile или ?profile=1
+    profiling_enabled: bool = False
+    # Доля запросов, для которых пишется cProfile; маршруты - шаблоны путей
+    profiling_sample_rate: float = 0.0
+    profiling_sample_routes: list[str] = []
+    profiling_output_dir: str = "profiles"
+    # Порог журнала медленных запросов; отдельные пороги по методам репозитория
+    slow_query_threshold_ms: Optional[float] = 1000.0
+    slow_query_thresholds_ms: dict[str, float] = {}
+
     # Server settings
     host: str = "0.0.0.0"
     port: int = 8000
+    # Процессы serve.py; 0 - по числу ядер
+    workers: int = 1
+    # auto выбирает uvloop и httptools, если они установлены
+    server_loop: Literal["auto", "uvloop", "asyncio"] = "auto"
+    server_http: Literal["auto", "httptools", "h11"] = "auto"
+    server_backlog: int = 2048
+    server_keepalive_s: int = 5
+    # Сколько ждать незавершенные запросы при остановке воркера
+    server_graceful_timeout_s: float = 30.0
 
     class Config:
         env_file = ".env"
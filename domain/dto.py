@@ -1,4 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
 
 
 @dataclass
@@ -8,3 +10,45 @@ class PredictionStatsDTO:
     total_requests: int
     successful_requests: int
     average_duration_ms: float
+    min_duration_ms: Optional[int] = None
+    max_duration_ms: Optional[int] = None
+    percentiles: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class ModelStatsDTO:
+    """DTO для статистики одной модели в сводке по нескольким моделям"""
+
+    model_name: str
+    total_requests: int
+    successful_requests: int
+    average_duration_ms: float
+
+
+@dataclass
+class PredictionLogFilter:
+    """DTO с фильтрами выборки логов предсказаний"""
+
+    model_name: Optional[str] = None
+    from_date: Optional[datetime] = None
+    to_date: Optional[datetime] = None
+    was_successful: Optional[bool] = None
+
+
+@dataclass
+class TimeseriesBucketDTO:
+    """DTO для одного интервала временного ряда статистики"""
+
+    bucket_start: datetime
+    total_requests: int
+    successful_requests: int
+    average_duration_ms: float
+    histogram: Optional[List[int]] = None
+
+
+@dataclass
+class RetentionPolicy:
+    """Политика хранения: сырые логи N дней, агрегаты M месяцев (None - вечно)"""
+
+    raw_days: Optional[int] = None
+    aggregate_months: Optional[int] = None
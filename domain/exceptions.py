@@ -0,0 +1,16 @@
+class DomainException(Exception):
+    """Базовое исключение доменного слоя"""
+
+    pass
+
+
+class WriteBufferFullException(DomainException):
+    """Исключение при переполнении буфера отложенной записи"""
+
+    pass
+
+
+class WriteBufferClosedException(DomainException):
+    """Исключение при записи в остановленный буфер"""
+
+    pass
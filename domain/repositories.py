@@ -1,8 +1,23 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Generic, List, Optional, TypeVar
+from typing import (
+    AsyncIterator,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
-from domain.dto import PredictionStatsDTO
+from domain.dto import (
+    ModelStatsDTO,
+    PredictionLogFilter,
+    PredictionStatsDTO,
+    TimeseriesBucketDTO,
+)
 from domain.entities import PredictionLog
 
 # Type variables for generic repository
@@ -18,6 +33,11 @@ class BaseRepository(ABC, Generic[T, ID]):
         """Создать новую сущность"""
         pass
 
+    @abstractmethod
+    async def create_many(self, entities: List[T]) -> List[T]:
+        """Создать несколько сущностей в одной транзакции"""
+        pass
+
     @abstractmethod
     async def get_by_id(self, entity_id: ID) -> Optional[T]:
         """Получить сущность по ID"""
@@ -42,9 +62,134 @@ class BaseRepository(ABC, Generic[T, ID]):
 class PredictionLogRepository(BaseRepository[PredictionLog, int]):
     """Интерфейс репозитория для работы с логами предсказаний"""
 
+    @abstractmethod
+    async def bulk_insert(self, entities: List[PredictionLog]) -> int:
+        """Массово загрузить логи без возврата id, вернуть число записанных строк"""
+        pass
+
+    @abstractmethod
+    async def get_page(
+        self,
+        filters: PredictionLogFilter,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> List[PredictionLog]:
+        """Получить страницу логов, упорядоченных по (timestamp, id), после курсора"""
+        pass
+
+    @abstractmethod
+    def stream_batches(
+        self, filters: PredictionLogFilter, batch_size: int = 1000
+    ) -> AsyncIterator[List[PredictionLog]]:
+        """Потоково читать логи пачками через серверный курсор"""
+        pass
+
     @abstractmethod
     async def get_stats(
-        self, model_name: str, from_date: datetime, to_date: datetime
+        self,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        percentiles: Sequence[float] = (),
+        exact: bool = False,
     ) -> PredictionStatsDTO:
-        """Получить статистику по модели за период"""
+        """Получить статистику по модели за период.
+
+        Перцентили (в процентах) по умолчанию оцениваются по скетчам,
+        exact=True включает точный расчет по сырым строкам.
+        """
+        pass
+
+    @abstractmethod
+    async def get_timeseries(
+        self,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        interval_seconds: int,
+        histogram_bounds: Sequence[int] = (),
+    ) -> List[TimeseriesBucketDTO]:
+        """Получить статистику по интервалам одним сгруппированным запросом.
+
+        Интервалы без данных не возвращаются. Гистограмма содержит
+        len(histogram_bounds) + 1 счетчиков: до первой границы, между
+        соседними границами и от последней границы.
+        """
+        pass
+
+    @abstractmethod
+    async def get_models_stats(
+        self,
+        model_names: Optional[Sequence[str]],
+        from_date: datetime,
+        to_date: datetime,
+        order_by: Optional[str] = None,
+        top_k: Optional[int] = None,
+    ) -> List[ModelStatsDTO]:
+        """Получить статистику по нескольким моделям одним GROUP BY.
+
+        model_names=None означает все модели; order_by - volume, error_rate
+        или latency (по убыванию), top_k ограничивает число моделей.
+        """
+        pass
+
+    @abstractmethod
+    def stream_models_stats(
+        self,
+        model_names: Optional[Sequence[str]],
+        from_date: datetime,
+        to_date: datetime,
+        order_by: Optional[str] = None,
+        top_k: Optional[int] = None,
+    ) -> AsyncIterator[List[ModelStatsDTO]]:
+        """Потоково получить статистику по моделям пачками"""
+        pass
+
+
+class PredictionLogWriteBuffer(ABC):
+    """Интерфейс буфера отложенной записи логов предсказаний"""
+
+    @abstractmethod
+    async def submit(self, prediction_log: PredictionLog) -> Optional[PredictionLog]:
+        """Поставить лог в очередь на запись.
+
+        Возвращает сохраненную сущность в режиме durable и None в режиме accepted.
+        """
+        pass
+
+
+class PredictionStatsCache(ABC):
+    """Интерфейс кэша статистики с инвалидацией при записи"""
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[PredictionStatsDTO]:
+        """Получить статистику из кэша"""
+        pass
+
+    @abstractmethod
+    def version(self, model_name: str) -> int:
+        """Текущая версия данных модели, берется до запроса к БД"""
+        pass
+
+    @abstractmethod
+    def put(
+        self,
+        key: Hashable,
+        stats: PredictionStatsDTO,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        version: int,
+    ) -> None:
+        """Сохранить статистику, если с момента version модель не менялась"""
+        pass
+
+    @abstractmethod
+    def invalidate(self, model_name: str, timestamps: Iterable[datetime]) -> None:
+        """Вытеснить записи модели, окно которых содержит новые метки"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Очистить кэш целиком"""
         pass
@@ -1,15 +1,32 @@
 from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence
 
-from domain.dto import PredictionStatsDTO
+from domain.dto import (
+    ModelStatsDTO,
+    PredictionLogFilter,
+    PredictionStatsDTO,
+    TimeseriesBucketDTO,
+)
 from domain.entities import PredictionLog
-from domain.repositories import PredictionLogRepository
+from domain.repositories import (
+    PredictionLogRepository,
+    PredictionLogWriteBuffer,
+    PredictionStatsCache,
+)
 
 
 class PredictionLogService:
     """Доменный сервис для работы с логами предсказаний"""
 
-    def __init__(self, repository: PredictionLogRepository):
+    def __init__(
+        self,
+        repository: PredictionLogRepository,
+        write_buffer: Optional[PredictionLogWriteBuffer] = None,
+        stats_cache: Optional[PredictionStatsCache] = None,
+    ):
         self.repository = repository
+        self.write_buffer = write_buffer
+        self.stats_cache = stats_cache
 
     async def log_prediction(
         self,
@@ -17,8 +34,12 @@ class PredictionLogService:
         duration_ms: int,
         was_successful: bool,
         timestamp: datetime,
-    ) -> PredictionLog:
-        """Записать лог предсказания"""
+    ) -> Optional[PredictionLog]:
+        """Записать лог предсказания.
+
+        При включенном буфере отложенной записи возвращает None, если буфер
+        работает в режиме accepted и запись еще не выполнена.
+        """
         prediction_log = PredictionLog(
             model_name=model_name,
             duration_ms=duration_ms,
@@ -26,7 +47,27 @@ class PredictionLogService:
             timestamp=timestamp,
         )
 
-        return await self.repository.create(prediction_log)
+        if self.write_buffer is not None:
+            # Буфер сам инвалидирует кэш после записи пачки
+            return await self.write_buffer.submit(prediction_log)
+
+        created = await self.repository.create(prediction_log)
+        self._invalidate_stats([created])
+        return created
+
+    async def log_predictions(
+        self, predictions: list[PredictionLog]
+    ) -> list[PredictionLog]:
+        """Записать пачку логов предсказаний в одной транзакции"""
+        created = await self.repository.create_many(predictions)
+        self._invalidate_stats(created)
+        return created
+
+    async def import_predictions(self, predictions: list[PredictionLog]) -> int:
+        """Массово загрузить исторические логи предсказаний"""
+        inserted = await self.repository.bulk_insert(predictions)
+        self._invalidate_stats(predictions)
+        return inserted
 
     async def get_prediction_by_id(self, prediction_id: int) -> PredictionLog | None:
         """Получить лог предсказания по ID"""
@@ -36,16 +77,107 @@ class PredictionLogService:
         """Получить все логи предсказаний"""
         return await self.repository.get_all()
 
+    async def get_predictions_page(
+        self,
+        filters: PredictionLogFilter,
+        limit: int,
+        after: Optional[tuple[datetime, int]] = None,
+    ) -> list[PredictionLog]:
+        """Получить страницу логов предсказаний по курсору"""
+        return await self.repository.get_page(filters, limit, after)
+
+    def stream_predictions(
+        self, filters: PredictionLogFilter, batch_size: int = 1000
+    ) -> AsyncIterator[list[PredictionLog]]:
+        """Потоково получить логи предсказаний пачками"""
+        return self.repository.stream_batches(filters, batch_size)
+
     async def update_prediction(self, prediction_log: PredictionLog) -> PredictionLog:
         """Обновить лог предсказания"""
-        return await self.repository.update(prediction_log)
+        updated = await self.repository.update(prediction_log)
+        # Прежние модель и метка неизвестны, поэтому сбрасываем кэш целиком
+        if self.stats_cache is not None:
+            self.stats_cache.clear()
+        return updated
 
     async def delete_prediction(self, prediction_id: int) -> bool:
         """Удалить лог предсказания"""
-        return await self.repository.delete(prediction_id)
+        deleted = await self.repository.delete(prediction_id)
+        if deleted and self.stats_cache is not None:
+            self.stats_cache.clear()
+        return deleted
 
     async def get_prediction_stats(
-        self, model_name: str, from_date: datetime, to_date: datetime
+        self,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        percentiles: Sequence[float] = (),
+        exact: bool = False,
     ) -> PredictionStatsDTO:
         """Получить статистику предсказаний"""
-        return await self.repository.get_stats(model_name, from_date, to_date)
+        if self.stats_cache is None:
+            return await self.repository.get_stats(
+                model_name, from_date, to_date, percentiles, exact
+            )
+
+        key = (model_name, from_date, to_date, tuple(percentiles), exact)
+        cached = self.stats_cache.get(key)
+        if cached is not None:
+            return cached
+
+        version = self.stats_cache.version(model_name)
+        stats = await self.repository.get_stats(
+            model_name, from_date, to_date, percentiles, exact
+        )
+        self.stats_cache.put(key, stats, model_name, from_date, to_date, version)
+        return stats
+
+    def _invalidate_stats(self, predictions: list[PredictionLog]) -> None:
+        """Вытеснить из кэша окна статистики, затронутые новыми логами"""
+        if self.stats_cache is None:
+            return
+        timestamps: dict[str, list[datetime]] = {}
+        for prediction in predictions:
+            timestamps.setdefault(prediction.model_name, []).append(prediction.timestamp)
+        for model_name, model_timestamps in timestamps.items():
+            self.stats_cache.invalidate(model_name, model_timestamps)
+
+    async def get_prediction_timeseries(
+        self,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        interval_seconds: int,
+        histogram_bounds: Sequence[int] = (),
+    ) -> list[TimeseriesBucketDTO]:
+        """Получить временной ряд статистики предсказаний"""
+        return await self.repository.get_timeseries(
+            model_name, from_date, to_date, interval_seconds, histogram_bounds
+        )
+
+    async def get_models_stats(
+        self,
+        model_names: Optional[Sequence[str]],
+        from_date: datetime,
+        to_date: datetime,
+        order_by: Optional[str] = None,
+        top_k: Optional[int] = None,
+    ) -> list[ModelStatsDTO]:
+        """Получить статистику по нескольким моделям"""
+        return await self.repository.get_models_stats(
+            model_names, from_date, to_date, order_by, top_k
+        )
+
+    def stream_models_stats(
+        self,
+        model_names: Optional[Sequence[str]],
+        from_date: datetime,
+        to_date: datetime,
+        order_by: Optional[str] = None,
+        top_k: Optional[int] = None,
+    ) -> AsyncIterator[list[ModelStatsDTO]]:
+        """Потоково получить статистику по нескольким моделям"""
+        return self.repository.stream_models_stats(
+            model_names, from_date, to_date, order_by, top_k
+        )
@@ -1,10 +1,12 @@
-from typing import Generic, List, Optional, Type, TypeVar
+from typing import Any, Dict, Generic, List, Optional, Tuple, Type, TypeVar
 
-from sqlalchemy import select
+from sqlalchemy import Row, Select, delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 
 from domain.repositories import BaseRepository
+from infrastructure.instrumentation import instrumented
+from infrastructure.replicas import READ_ONLY
 
 T = TypeVar("T")
 ID = TypeVar("ID")
@@ -18,18 +20,39 @@ class SQLAlchemyBaseRepository(BaseRepository[T, ID], Generic[T, ID, ModelType])
         self.session = session
         self.model = model
 
+    @instrumented
     async def create(self, entity: T) -> T:
-        """Создать новую сущность"""
-        db_model = self._entity_to_model(entity)
-        self.session.add(db_model)
+        """Создать новую сущность одним INSERT ... RETURNING id"""
+        # Остальные поля известны вызывающему, перечитывать строку не нужно
+        created = await self.create_many([entity])
+        return created[0]
+
+    @instrumented
+    async def create_many(self, entities: List[T]) -> List[T]:
+        """Создать несколько сущностей одним многострочным INSERT ... RETURNING id"""
+        if not entities:
+            return []
+
+        await self._before_write(entities)
+        values = [self._entity_to_values(entity) for entity in entities]
+        # sort_by_parameter_order гарантирует порядок id как у входных строк
+        query = insert(self.model).returning(
+            self.model.id, sort_by_parameter_order=True
+        )
+        result = await self.session.execute(query, values)
+        ids = result.scalars().all()
+        await self._on_created(entities)
         await self.session.commit()
-        await self.session.refresh(db_model)
-        return self._model_to_entity(db_model)
 
+        for entity, entity_id in zip(entities, ids):
+            entity.id = entity_id
+        return entities
+
+    @instrumented
     async def get_by_id(self, entity_id: ID) -> Optional[T]:
         """Получить сущность по ID"""
         query = select(self.model).where(self.model.id == entity_id)
-        result = await self.session.execute(query)
+        result = await self.session.execute(query, bind_arguments=READ_ONLY)
         db_model = result.scalar_one_or_none()
 
         if db_model is None:
@@ -37,55 +60,112 @@ class SQLAlchemyBaseRepository(BaseRepository[T, ID], Generic[T, ID, ModelType])
 
         return self._model_to_entity(db_model)
 
+    @instrumented
     async def get_all(self) -> List[T]:
         """Получить все сущности"""
         query = select(self.model)
-        result = await self.session.execute(query)
+        result = await self.session.execute(query, bind_arguments=READ_ONLY)
         db_models = result.scalars().all()
 
         return [self._model_to_entity(model) for model in db_models]
 
+    @instrumented
     async def update(self, entity: T) -> T:
-        """Обновить сущность"""
+        """Обновить сущность одним UPDATE ... WHERE id = ? RETURNING"""
         if not hasattr(entity, "id") or entity.id is None:
             raise ValueError("Cannot update entity without ID")
 
-        query = select(self.model).where(self.model.id == entity.id)
-        result = await self.session.execute(query)
-        db_model = result.scalar_one_or_none()
-
-        if db_model is None:
+        await self._before_write([entity])
+        statement = update(self.model.__table__).values(self._entity_to_values(entity))
+        found, previous = await self._modify(statement, entity.id)
+        if not found:
             raise ValueError(f"Entity with ID {entity.id} not found")
 
-        # Обновляем поля
-        self._update_model_from_entity(db_model, entity)
-
+        await self._on_modified([*previous, entity])
         await self.session.commit()
-        await self.session.refresh(db_model)
-
-        return self._model_to_entity(db_model)
+        return entity
 
+    @instrumented
     async def delete(self, entity_id: ID) -> bool:
-        """Удалить сущность по ID"""
-        query = select(self.model).where(self.model.id == entity_id)
-        result = await self.session.execute(query)
-        db_model = result.scalar_one_or_none()
-
-        if db_model is None:
+        """Удалить сущность по ID одним DELETE ... RETURNING"""
+        found, previous = await self._modify(delete(self.model.__table__), entity_id)
+        if not found:
             return False
 
-        await self.session.delete(db_model)
+        await self._on_modified(previous)
         await self.session.commit()
         return True
 
-    def _entity_to_model(self, entity: T) -> ModelType:
-        """Преобразовать доменную сущность в модель SQLAlchemy"""
-        raise NotImplementedError("Subclasses must implement _entity_to_model")
+    async def _modify(self, statement: Any, entity_id: ID) -> Tuple[bool, List[T]]:
+        """UPDATE/DELETE по id: найдена ли строка и ее прежнее состояние для хуков"""
+        table = self.model.__table__
+        if not self._needs_previous_state():
+            result = await self.session.execute(
+                statement.where(table.c.id == entity_id).returning(table.c.id)
+            )
+            return result.first() is not None, []
+
+        connection = await self.session.connection()
+        if connection.dialect.name == "postgresql":
+            result = await self.session.execute(
+                self._returning_previous(statement, entity_id)
+            )
+            rows = result.all()
+        else:
+            # SQLite не возвращает колонки других таблиц из UPDATE ... FROM
+            result = await self.session.execute(
+                self._entity_query().where(table.c.id == entity_id)
+            )
+            rows = result.all()
+            if rows:
+                await self.session.execute(statement.where(table.c.id == entity_id))
+        return bool(rows), [self._row_to_entity(row) for row in rows]
+
+    def _returning_previous(self, statement: Any, entity_id: ID) -> Any:
+        """Добавить к UPDATE/DELETE чтение прежнего состояния строки в том же запросе"""
+        table = self.model.__table__
+        previous = (
+            self._entity_query()
+            .where(table.c.id == entity_id)
+            .with_for_update(of=table)
+            .cte("previous")
+            .prefix_with("MATERIALIZED")
+        )
+        # Условие по всему ключу маппера (id, timestamp) оставляет одну секцию
+        keys = [
+            column == previous.c[column.name]
+            for column in self.model.__mapper__.primary_key
+        ]
+        return statement.where(*keys).returning(*previous.c)
+
+    async def _before_write(self, entities: List[T]) -> None:
+        """Хук перед записью сущностей, например для разрешения ссылок на справочники"""
+        pass
+
+    async def _on_created(self, entities: List[T]) -> None:
+        """Хук после вставки сущностей, вызывается до commit в той же транзакции"""
+        pass
+
+    async def _on_modified(self, entities: List[T]) -> None:
+        """Хук после изменения или удаления, получает состояния до и после"""
+        pass
+
+    def _entity_to_values(self, entity: T) -> Dict[str, Any]:
+        """Преобразовать доменную сущность в словарь значений колонок"""
+        raise NotImplementedError("Subclasses must implement _entity_to_values")
 
     def _model_to_entity(self, model: ModelType) -> T:
         """Преобразовать модель SQLAlchemy в доменную сущность"""
         raise NotImplementedError("Subclasses must implement _model_to_entity")
 
-    def _update_model_from_entity(self, model: ModelType, entity: T) -> None:
-        """Обновить модель SQLAlchemy из доменной сущности"""
-        raise NotImplementedError("Subclasses must implement _update_model_from_entity")
+    def _entity_query(self) -> Select:
+        """Запрос колонок, из которых строится сущность"""
+        return select(self.model.__table__)
+
+    def _row_to_entity(self, row: Row) -> T:
+        """Преобразовать строку результата Core-запроса в доменную сущность"""
+        raise NotImplementedError("Subclasses must implement _row_to_entity")
+
+    def _needs_previous_state(self) -> bool:
+        """Нужно ли хуку _on_modified состояние сущности до изменения"""
+        return False
@@ -1,6 +1,87 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from config import settings
+from infrastructure.instrumentation import observe_query
+from infrastructure.replicas import ReplicaSet, RoutingSession
+from utils.metrics import CallbackMetric, Histogram
+
+pool_wait_seconds = Histogram(
+    "db_pool_wait_seconds", "Время ожидания соединения из пула"
+)
+pool_connect_seconds = Histogram(
+    "db_pool_connect_seconds", "Время установки нового соединения с БД"
+)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий ожидание свободного соединения"""
+
+    timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            InstrumentedAsyncAdaptedQueuePool.timeouts += 1
+            raise
+        finally:
+            pool_wait_seconds.observe(time.perf_counter() - start)
+
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """Параметры движка и пула из настроек"""
+    options: Dict[str, Any] = {"echo": settings.db_echo, "future": True}
+    if make_url(url).get_backend_name() == "sqlite":
+        # Для SQLite в памяти SQLAlchemy сам выбирает StaticPool
+        return options
+
+    options.update(
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={
+            "statement_cache_size": settings.db_statement_cache_size,
+            "server_settings": dict(settings.db_server_settings),
+        },
+    )
+    return options
+
+
+def instrument_engine(engine: AsyncEngine) -> AsyncEngine:
+    """Замерять установку новых соединений и каждый SQL-запрос"""
+
+    @event.listens_for(engine.sync_engine, "do_connect")
+    def _connect_started(dialect, conn_rec, cargs, cparams):
+        conn_rec.info["connect_started"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine.pool, "connect")
+    def _connect_finished(dbapi_connection, conn_rec):
+        started = conn_rec.info.pop("connect_started", None)
+        if started is not None:
+            pool_connect_seconds.observe(time.perf_counter() - started)
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _query_started(conn, cursor, statement, parameters, context, executemany):
+        context.query_started = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _query_finished(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.query_started
+        observe_query(statement, parameters, executemany, elapsed)
+
+    return engine
 
 
 # Создаем асинхронный движок для PostgreSQL
@@ -9,26 +90,69 @@ def get_engine():
     try:
         from sqlalchemy.ext.asyncio import create_async_engine
 
-        return create_async_engine(
-            settings.database_url,
-            echo=True,  # Логирование SQL запросов
-            future=True,
+        return instrument_engine(
+            create_async_engine(
+                settings.database_url, **engine_options(settings.database_url)
+            )
         )
     except ImportError:
         # Для тестов используем SQLite
         from sqlalchemy.ext.asyncio import create_async_engine
 
-        return create_async_engine(
-            "sqlite+aiosqlite:///:memory:", echo=True, future=True
-        )
+        url = "sqlite+aiosqlite:///:memory:"
+        return instrument_engine(create_async_engine(url, **engine_options(url)))
+
+
+def get_replicas() -> Optional[ReplicaSet]:
+    """Создать движки реплик для чтения из настроек"""
+    if not settings.db_read_replica_urls:
+        return None
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engines = [
+        instrument_engine(create_async_engine(url, **engine_options(url)))
+        for url in settings.db_read_replica_urls
+    ]
+    return ReplicaSet(
+        engines,
+        strategy=settings.db_replica_strategy,
+        retry_after_s=settings.db_replica_retry_after_s,
+    )
+
+
+def create_session_factory(
+    primary: AsyncEngine, replicas: Optional[ReplicaSet] = None
+) -> async_sessionmaker[AsyncSession]:
+    """Фабрика сессий: запись в основную БД, чтение - на реплики, если они заданы"""
+    if replicas is None:
+        return async_sessionmaker(primary, class_=AsyncSession, expire_on_commit=False)
+    return async_sessionmaker(
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        primary=primary,
+        replicas=replicas,
+        expire_on_commit=False,
+    )
 
 
 engine = get_engine()
+replicas = get_replicas()
+
+
+def reset_pools_after_fork() -> None:
+    """Начать в дочернем процессе с пустыми пулами основной БД и реплик"""
+    # Соединения родителя не закрываем: их сокеты принадлежат ему
+    engine.sync_engine.dispose(close=False)
+    if replicas is not None:
+        for replica in replicas.engines:
+            replica.sync_engine.dispose(close=False)
+
+
+# Воркеры serve.py форкаются после импорта приложения
+os.register_at_fork(after_in_child=reset_pools_after_fork)
 
 # Создаем фабрику асинхронных сессий
-AsyncSessionLocal = async_sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
-)
+AsyncSessionLocal = create_session_factory(engine, replicas)
 
 
 async def get_db_session() -> AsyncSession:
@@ -38,3 +162,72 @@ async def get_db_session() -> AsyncSession:
             yield session
         finally:
             await session.close()
+
+
+async def ping_database(timeout: float) -> None:
+    """Проверить БД запросом через пул соединений"""
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.wait_for(ping(), timeout)
+
+
+def _read_pool(read: Callable[[AsyncAdaptedQueuePool], int]) -> Callable[[], Any]:
+    """Читать значение пула основной БД при экспозиции метрик"""
+
+    def collect() -> Optional[int]:
+        pool = engine.sync_engine.pool
+        return read(pool) if isinstance(pool, AsyncAdaptedQueuePool) else None
+
+    return collect
+
+
+CallbackMetric(
+    "db_pool_size", "Размер пула соединений основной БД", _read_pool(lambda p: p.size())
+)
+CallbackMetric(
+    "db_pool_checked_out",
+    "Соединения основной БД, выданные из пула",
+    _read_pool(lambda p: p.checkedout()),
+)
+CallbackMetric(
+    "db_pool_overflow",
+    "Соединения сверх pool_size",
+    _read_pool(lambda p: max(p.overflow(), 0)),
+)
+CallbackMetric(
+    "db_pool_timeouts_total",
+    "Таймауты ожидания соединения из пула",
+    lambda: InstrumentedAsyncAdaptedQueuePool.timeouts,
+    kind="counter",
+)
+
+
+def pool_status() -> Dict[str, Any]:
+    """Текущее состояние пула соединений и гистограммы ожидания"""
+    pool = engine.sync_engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=settings.db_max_overflow,
+            timeouts=InstrumentedAsyncAdaptedQueuePool.timeouts,
+        )
+    status["wait_seconds"] = pool_wait_seconds.snapshot()
+    status["connect_seconds"] = pool_connect_seconds.snapshot()
+    if replicas is not None:
+        status["replicas"] = replicas.status()
+    return status
+
+
+async def dispose_engines() -> None:
+    """Закрыть соединения основной БД и реплик"""
+    await engine.dispose()
+    if replicas is not None:
+        for replica in replicas.engines:
+            await replica.dispose()
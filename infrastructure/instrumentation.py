@@ -0,0 +1,145 @@
+import functools
+import inspect
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Optional, TypeVar
+
+from config import settings
+from utils.logger import log_warning
+from utils.metrics import Counter, Histogram
+from utils.profiling import current_profile
+
+F = TypeVar("F", bound=Callable)
+
+# Метод репозитория, внутри которого выполняется текущий SQL-запрос
+current_operation: ContextVar[Optional[str]] = ContextVar(
+    "current_operation", default=None
+)
+
+db_query_seconds = Histogram(
+    "db_query_seconds", "Длительность SQL-запроса по методу репозитория"
+)
+db_operation_seconds = Histogram(
+    "db_operation_seconds", "Длительность метода репозитория целиком"
+)
+prediction_logs_ingested = Counter(
+    "prediction_logs_ingested_total", "Записанные логи предсказаний"
+)
+slow_queries = Counter("db_slow_queries_total", "SQL-запросы дольше порога")
+
+OTHER = "other"
+SLOW_QUERY_MAX_LENGTH = 2000
+
+
+def operation_label() -> str:
+    """Метка operation для запроса вне методов репозитория"""
+    return current_operation.get() or OTHER
+
+
+def parameters_shape(parameters: Any, executemany: bool = False) -> str:
+    """Форма параметров запроса без значений: типы и число строк"""
+    if executemany and parameters:
+        return f"{len(parameters)} x {parameters_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        items = (f"{key}: {type(value).__name__}" for key, value in parameters.items())
+        return "{" + ", ".join(items) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def observe_query(
+    statement: str, parameters: Any, executemany: bool, elapsed: float
+) -> None:
+    """Учесть выполненный SQL-запрос в метриках, профиле запроса и журнале медленных"""
+    # Метка - метод репозитория из контекста задачи, а не текст запроса
+    operation = operation_label()
+    db_query_seconds.observe(elapsed, operation=operation)
+    profile = current_profile.get()
+    if profile is not None:
+        profile.add_query(elapsed)
+
+    threshold = settings.slow_query_thresholds_ms.get(
+        operation, settings.slow_query_threshold_ms
+    )
+    if threshold is None or elapsed * 1000 < threshold:
+        return
+    slow_queries.inc(operation=operation)
+    # Значения параметров не пишем: в них могут быть данные клиентов
+    sql = re.sub(r"\s+", " ", statement).strip()[:SLOW_QUERY_MAX_LENGTH]
+    log_warning(
+        "Slow query in %s: %.1f ms, parameters %s: %s",
+        operation,
+        elapsed * 1000,
+        parameters_shape(parameters, executemany),
+        sql,
+        dedup_key=("slow_query", operation, sql),
+    )
+
+
+def model_label(model_name: str) -> str:
+    """Имя модели как метка, только если оно в списке разрешенных"""
+    # Имена моделей приходят от клиентов: без списка число рядов не ограничено
+    return model_name if model_name in settings.metrics_model_labels else OTHER
+
+
+def count_ingested(model_names: Iterable[str]) -> None:
+    """Учесть записанные логи по моделям"""
+    counts: dict = {}
+    for model_name in model_names:
+        label = model_label(model_name)
+        counts[label] = counts.get(label, 0) + 1
+    for label, count in counts.items():
+        prediction_logs_ingested.inc(count, model=label)
+
+
+def instrumented(func: F) -> F:
+    """Замерять метод репозитория и помечать его SQL-запросы именем метода.
+
+    Метка ставится только самым внешним методом: запросы create, идущие
+    через create_many, считаются как create.
+    """
+    name = func.__name__
+
+    if inspect.isasyncgenfunction(func):
+
+        @functools.wraps(func)
+        async def generator_wrapper(*args, **kwargs):
+            stream = func(*args, **kwargs)
+            outer = current_operation.get() is None
+            elapsed = 0.0
+            try:
+                while True:
+                    # Контекст ставится на каждый шаг: между шагами работает потребитель
+                    token = current_operation.set(name) if outer else None
+                    started = time.perf_counter()
+                    try:
+                        item = await stream.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        elapsed += time.perf_counter() - started
+                        if token is not None:
+                            current_operation.reset(token)
+                    yield item
+            finally:
+                await stream.aclose()
+                if outer:
+                    db_operation_seconds.observe(elapsed, operation=name)
+
+        return generator_wrapper
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if current_operation.get() is not None:
+            return await func(*args, **kwargs)
+        token = current_operation.set(name)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            db_operation_seconds.observe(time.perf_counter() - started, operation=name)
+            current_operation.reset(token)
+
+    return wrapper
@@ -0,0 +1,120 @@
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from infrastructure.models import ModelNameModel
+
+# Ключи, созданные или найденные в еще не зафиксированной транзакции сессии
+PENDING_KEY = "pending_model_ids"
+
+
+def model_id_subquery(model_name: str):
+    """Подзапрос ключа модели по имени для условий WHERE"""
+    return (
+        select(ModelNameModel.id)
+        .where(ModelNameModel.name == model_name)
+        .scalar_subquery()
+    )
+
+
+class ModelRegistry:
+    """Кэш соответствия имени модели и ее ключа в справочнике models"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+
+    def get(self, model_name: str) -> Optional[int]:
+        """Ключ модели из кэша или None"""
+        return self._ids.get(model_name)
+
+    async def resolve(
+        self, session: AsyncSession, model_names: Iterable[str]
+    ) -> Dict[str, int]:
+        """Ключи моделей по именам; недостающие добавляются в справочник"""
+        pending: Dict[str, int] = session.info.setdefault(PENDING_KEY, {})
+        result = {}
+        missing = []
+        for model_name in set(model_names):
+            model_id = self._ids.get(model_name, pending.get(model_name))
+            if model_id is None:
+                missing.append(model_name)
+            else:
+                result[model_name] = model_id
+        if not missing:
+            return result
+
+        # Сначала только чтение: на PostgreSQL INSERT ... ON CONFLICT расходует
+        # значение последовательности (SMALLSERIAL) даже для существующего имени
+        found = await self._select(session, missing)
+        # Найденные строки уже зафиксированы: свои незафиксированные есть в pending
+        self._ids.update(found)
+        result.update(found)
+        missing = sorted(set(missing) - set(found))
+        if not missing:
+            return result
+
+        connection = await session.connection()
+        if connection.dialect.name == "postgresql":
+            statement = postgresql.insert(ModelNameModel)
+        elif connection.dialect.name == "sqlite":
+            statement = sqlite.insert(ModelNameModel)
+        else:
+            raise NotImplementedError(
+                f"Model registry is not supported for {connection.dialect.name}"
+            )
+        # Сортировка снижает риск взаимных блокировок при параллельной записи
+        statement = statement.values([{"name": name} for name in missing])
+        await session.execute(statement.on_conflict_do_nothing(index_elements=["name"]))
+        found = await self._select(session, missing)
+        # В кэш попадут только после commit: при откате ключей в БД не будет
+        pending.update(found)
+        result.update(found)
+        return result
+
+    async def preload(self, session: AsyncSession) -> int:
+        """Загрузить в кэш весь справочник; возвращает число моделей"""
+        rows = await session.execute(select(ModelNameModel.name, ModelNameModel.id))
+        self._ids.update(rows.all())
+        return len(self._ids)
+
+    def clear(self) -> None:
+        """Очистить кэш"""
+        self._ids.clear()
+
+    @staticmethod
+    async def _select(session: AsyncSession, names: Iterable[str]) -> Dict[str, int]:
+        rows = await session.execute(
+            select(ModelNameModel.name, ModelNameModel.id).where(
+                ModelNameModel.name.in_(list(names))
+            )
+        )
+        return dict(rows.all())
+
+    def _promote(self, session: Session) -> None:
+        pending = session.info.pop(PENDING_KEY, None)
+        if pending:
+            self._ids.update(pending)
+
+    def _discard(self, session: Session) -> None:
+        session.info.pop(PENDING_KEY, None)
+
+
+model_registry = ModelRegistry()
+
+
+@event.listens_for(Session, "after_commit")
+def _promote_pending_models(session: Session) -> None:
+    model_registry._promote(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_models(session: Session) -> None:
+    model_registry._discard(session)
+
+
+def get_model_registry() -> ModelRegistry:
+    """Получить кэш справочника моделей"""
+    return model_registry
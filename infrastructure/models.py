@@ -1,16 +1,118 @@
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    SmallInteger,
+    String,
+    UniqueConstraint,
+    select,
+)
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import column_property
 
 Base = declarative_base()
 
+# SQLite выдает автоинкремент только для INTEGER PRIMARY KEY
+ModelIdType = SmallInteger().with_variant(Integer(), "sqlite")
+
+
+class ModelNameModel(Base):
+    """Справочник моделей: имя и короткий суррогатный ключ"""
+
+    __tablename__ = "models"
+
+    id = Column(ModelIdType, primary_key=True)
+    name = Column(String, nullable=False)
+
+    __table_args__ = (UniqueConstraint("name", name="uq_models_name"),)
+
 
 class PredictionLogModel(Base):
     """SQLAlchemy модель для таблицы логов предсказаний"""
 
     __tablename__ = "prediction_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
-    model_name = Column(String, nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    model_id = Column(
+        ModelIdType,
+        ForeignKey("models.id", name="fk_prediction_logs_model_id"),
+        nullable=False,
+    )
+    # Имя только для чтения; фильтры и запись идут по model_id
+    model_name = column_property(
+        select(ModelNameModel.name)
+        .where(ModelNameModel.id == model_id)
+        .scalar_subquery()
+    )
     duration_ms = Column(Integer, nullable=False)
     was_successful = Column(Boolean, nullable=False)
     timestamp = Column(DateTime, nullable=False, index=True)
+
+    # В секционированной таблице ключ (id, timestamp): UPDATE/DELETE по нему
+    # затрагивают только одну секцию
+    __mapper_args__ = {"primary_key": [id, timestamp]}
+
+    __table_args__ = (
+        # Покрывающий индекс под запрос статистики: index-only scan без чтения кучи
+        Index(
+            "ix_prediction_logs_model_id_timestamp",
+            "model_id",
+            "timestamp",
+            postgresql_include=["duration_ms", "was_successful"],
+        ),
+    )
+
+
+class StatsRollupMixin:
+    """Общие колонки таблиц предагрегированной статистики"""
+
+    model_name = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    total_count = Column(BigInteger, nullable=False)
+    success_count = Column(BigInteger, nullable=False)
+    duration_sum = Column(BigInteger, nullable=False)
+    duration_min = Column(Integer, nullable=False)
+    duration_max = Column(Integer, nullable=False)
+
+
+class PredictionStatsMinuteModel(StatsRollupMixin, Base):
+    """Поминутная статистика по модели"""
+
+    __tablename__ = "prediction_stats_minute"
+
+
+class PredictionStatsHourModel(StatsRollupMixin, Base):
+    """Почасовая статистика по модели"""
+
+    __tablename__ = "prediction_stats_hour"
+
+
+class PredictionStatsDayModel(StatsRollupMixin, Base):
+    """Посуточная статистика по модели"""
+
+    __tablename__ = "prediction_stats_day"
+
+
+class LatencySketchMixin:
+    """Общие колонки таблиц квантильных скетчей длительности (DDSketch)"""
+
+    model_name = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    bin = Column(Integer, primary_key=True)
+    count = Column(BigInteger, nullable=False)
+
+
+class PredictionLatencyHourModel(LatencySketchMixin, Base):
+    """Почасовой скетч длительности по модели"""
+
+    __tablename__ = "prediction_latency_sketch_hour"
+
+
+class PredictionLatencyDayModel(LatencySketchMixin, Base):
+    """Посуточный скетч длительности по модели"""
+
+    __tablename__ = "prediction_latency_sketch_day"
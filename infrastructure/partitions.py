@@ -0,0 +1,236 @@
+import asyncio
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from config import settings
+from infrastructure.database import engine
+from utils.datetimes import utcnow
+from utils.logger import log_error, log_info
+
+PARTITIONED_TABLE = "prediction_logs"
+DEFAULT_PARTITION = "prediction_logs_default"
+
+# Суффиксы имен секций: prediction_logs_p20250601 / prediction_logs_p202506
+NAME_FORMATS = {"day": "%Y%m%d", "month": "%Y%m"}
+
+_BOUND_PATTERN = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+@dataclass(frozen=True)
+class Partition:
+    """Секция таблицы логов: полуинтервал [start, end)"""
+
+    name: str
+    start: datetime
+    end: datetime
+
+
+def partition_start(value: datetime, interval: str) -> datetime:
+    """Начало секции, в которую попадает метка"""
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "month":
+        value = value.replace(day=1)
+    return value
+
+
+def partition_end(start: datetime, interval: str) -> datetime:
+    """Начало следующей секции"""
+    if interval == "day":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_for(value: datetime, interval: str) -> Partition:
+    """Секция, в которую попадает метка"""
+    start = partition_start(value, interval)
+    name = f"{PARTITIONED_TABLE}_p{start.strftime(NAME_FORMATS[interval])}"
+    return Partition(name, start, partition_end(start, interval))
+
+
+def plan_partitions(now: datetime, interval: str, premake: int) -> List[Partition]:
+    """Текущая секция и premake следующих"""
+    partitions = [partition_for(now, interval)]
+    for _ in range(premake):
+        partitions.append(partition_for(partitions[-1].end, interval))
+    return partitions
+
+
+class PartitionManager:
+    """Заранее создает секции prediction_logs (PostgreSQL, RANGE по timestamp)"""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        interval: str = "month",
+        premake: int = 3,
+        check_interval_s: float = 3600.0,
+    ):
+        if interval not in NAME_FORMATS:
+            raise ValueError(f"Unsupported partition interval: {interval}")
+        self.engine = engine
+        self.interval = interval
+        self.premake = premake
+        self.check_interval_s = check_interval_s
+        self._task: Optional[asyncio.Task] = None
+
+    async def is_partitioned(self, conn: AsyncConnection) -> bool:
+        """Секционирована ли таблица логов (миграция 004 применена)"""
+        if conn.dialect.name != "postgresql":
+            return False
+        result = await conn.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table "
+                "WHERE partrelid = to_regclass(:table)"
+            ),
+            {"table": PARTITIONED_TABLE},
+        )
+        return result.scalar() is not None
+
+    async def list_partitions(self) -> List[Partition]:
+        """Существующие секции по возрастанию, без секции по умолчанию"""
+        async with self.engine.connect() as conn:
+            if not await self.is_partitioned(conn):
+                return []
+            return await self._list_partitions(conn)
+
+    async def _list_partitions(self, conn: AsyncConnection) -> List[Partition]:
+        rows = await conn.execute(
+            text(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+                "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:table)"
+            ),
+            {"table": PARTITIONED_TABLE},
+        )
+        partitions = []
+        for name, bound in rows:
+            match = _BOUND_PATTERN.search(bound)
+            if match is None:
+                continue
+            partitions.append(
+                Partition(
+                    name,
+                    datetime.fromisoformat(match.group(1)),
+                    datetime.fromisoformat(match.group(2)),
+                )
+            )
+        return sorted(partitions, key=lambda partition: partition.start)
+
+    async def ensure_partitions(self, now: Optional[datetime] = None) -> List[Partition]:
+        """Создать недостающие секции на текущий и premake следующих интервалов"""
+        now = now or utcnow()
+        created = []
+
+        async with self.engine.begin() as conn:
+            if not await self.is_partitioned(conn):
+                return []
+            # Воркеры запускают проверку одновременно: секции создает только один
+            await conn.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:table))"),
+                {"table": PARTITIONED_TABLE},
+            )
+            existing = {
+                partition.name for partition in await self._list_partitions(conn)
+            }
+            for partition in plan_partitions(now, self.interval, self.premake):
+                if partition.name in existing:
+                    continue
+                await self._create_partition(conn, partition)
+                created.append(partition)
+
+        for partition in created:
+            log_info("Created partition %s", partition.name)
+        return created
+
+    async def _create_partition(self, conn: AsyncConnection, partition: Partition) -> None:
+        """Создать секцию, перенеся в нее строки из секции по умолчанию"""
+        bounds = {"start": partition.start, "end": partition.end}
+        await conn.execute(
+            text(
+                f'CREATE TABLE "{partition.name}" '
+                f"(LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS)"
+            )
+        )
+        # Иначе ATTACH упадет: строки этого диапазона уже лежат в секции по умолчанию
+        await conn.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                "WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+                f'INSERT INTO "{partition.name}" SELECT * FROM moved'
+            ),
+            bounds,
+        )
+        await conn.execute(
+            text(
+                f'ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION "{partition.name}" '
+                f"FOR VALUES FROM ('{partition.start.isoformat(' ')}') "
+                f"TO ('{partition.end.isoformat(' ')}')"
+            )
+        )
+
+    async def drop_partition(self, partition: Partition) -> None:
+        """Отсоединить и удалить секцию целиком"""
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text(
+                    f"ALTER TABLE {PARTITIONED_TABLE} "
+                    f'DETACH PARTITION "{partition.name}"'
+                )
+            )
+            await conn.execute(text(f'DROP TABLE "{partition.name}"'))
+        log_info("Dropped partition %s", partition.name)
+
+    async def start(self) -> None:
+        """Запустить фоновое создание секций"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановить фоновую задачу"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.ensure_partitions()
+            except Exception as e:
+                log_error(e, "partition maintenance")
+            await asyncio.sleep(self.check_interval_s)
+
+
+partition_manager: Optional[PartitionManager] = None
+
+
+async def start_partition_manager() -> None:
+    """Создать и запустить менеджер секций"""
+    global partition_manager
+    partition_manager = PartitionManager(
+        engine,
+        interval=settings.partition_interval,
+        premake=settings.partition_premake,
+        check_interval_s=settings.partition_check_interval_s,
+    )
+    await partition_manager.start()
+
+
+async def stop_partition_manager() -> None:
+    """Остановить менеджер секций"""
+    global partition_manager
+    if partition_manager is None:
+        return
+    await partition_manager.stop()
+    partition_manager = None
@@ -0,0 +1,141 @@
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+from utils.logger import log_error
+
+# Аргументы привязки для запросов, которые можно выполнить на реплике
+READ_ONLY: Dict[str, Any] = {"read_only": True}
+
+
+class ReplicaSet:
+    """Набор реплик для чтения: выбор по стратегии и учет недоступных"""
+
+    def __init__(
+        self,
+        engines: List[AsyncEngine],
+        strategy: str = "round_robin",
+        retry_after_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engines = engines
+        self.strategy = strategy
+        self.retry_after_s = retry_after_s
+        self._clock = clock
+        self._order = itertools.count()
+        self._unhealthy_until: Dict[AsyncEngine, float] = {}
+
+        for engine in engines:
+            self._watch(engine)
+
+    def is_healthy(self, engine: AsyncEngine) -> bool:
+        """Доступна ли реплика (после ошибки - не раньше retry_after_s)"""
+        return self._unhealthy_until.get(engine, 0.0) <= self._clock()
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """Выбрать доступную реплику или None, если читать нужно с основной БД"""
+        healthy = [engine for engine in self.engines if self.is_healthy(engine)]
+        if not healthy:
+            return None
+        if self.strategy == "least_connections":
+            return min(healthy, key=lambda engine: engine.sync_engine.pool.checkedout())
+        return healthy[next(self._order) % len(healthy)]
+
+    def mark_unhealthy(self, engine: AsyncEngine) -> None:
+        """Исключить реплику из выбора на retry_after_s секунд"""
+        self._unhealthy_until[engine] = self._clock() + self.retry_after_s
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Состояние реплик для мониторинга"""
+        return [
+            {
+                "url": engine.url.render_as_string(hide_password=True),
+                "healthy": self.is_healthy(engine),
+                "checked_out": engine.sync_engine.pool.checkedout(),
+            }
+            for engine in self.engines
+        ]
+
+    def _watch(self, engine: AsyncEngine) -> None:
+        @event.listens_for(engine.sync_engine, "handle_error")
+        def _on_error(context):
+            # Ошибка подключения или обрыв соединения - реплика недоступна
+            if context.is_disconnect or context.connection is None:
+                self.mark_unhealthy(engine)
+                log_error(context.original_exception, "read replica unavailable")
+
+
+class RoutingSession(Session):
+    """Сессия, которая отправляет чтения на реплики, а запись - на основную БД.
+
+    Реплика выбирается один раз на сессию (то есть на запрос). После первой
+    записи все чтения сессии идут на основную БД, чтобы видеть свои изменения.
+    Чтение, на котором реплика оказалась недоступна, один раз повторяется на
+    основной БД, и дальше сессия читает только с нее.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: Optional[ReplicaSet] = None,
+        **kwargs: Any,
+    ):
+        kwargs["bind"] = primary.sync_engine
+        super().__init__(**kwargs)
+        self.primary = primary
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, *, clause=None, read_only=False, **kw):
+        if self._flushing or (clause is not None and clause.is_dml):
+            self.info["wrote"] = True
+
+        if (
+            read_only
+            and self.replicas is not None
+            and not self.info.get("wrote")
+            and not self.info.get("replica_failed")
+        ):
+            replica = self.info.get("replica")
+            if replica is None or not self.replicas.is_healthy(replica):
+                replica = self.replicas.choose()
+                self.info["replica"] = replica
+            if replica is not None:
+                return replica.sync_engine
+
+        return self.primary.sync_engine
+
+    def execute(self, statement, params=None, **kw):
+        return self._read_with_fallback(super().execute, statement, params, **kw)
+
+    def scalar(self, statement, params=None, **kw):
+        return self._read_with_fallback(super().scalar, statement, params, **kw)
+
+    def scalars(self, statement, params=None, **kw):
+        return self._read_with_fallback(super().scalars, statement, params, **kw)
+
+    def _read_with_fallback(self, run, statement, params, **kw):
+        try:
+            return run(statement, params, **kw)
+        except exc.DBAPIError:
+            if not self._replica_failed(kw.get("bind_arguments")):
+                raise
+        # Записей в сессии не было, откат теряет только прочитанное с реплики
+        self.rollback()
+        self.info["replica_failed"] = True
+        return run(statement, params, **kw)
+
+    def _replica_failed(self, bind_arguments: Optional[Dict[str, Any]]) -> bool:
+        """Упал ли запрос из-за недоступности выбранной для чтения реплики"""
+        replica = self.info.get("replica")
+        return (
+            bool(bind_arguments and bind_arguments.get("read_only"))
+            and replica is not None
+            and not self.info.get("wrote")
+            and not self.info.get("replica_failed")
+            # handle_error исключает реплику только при ошибке соединения
+            and not self.replicas.is_healthy(replica)
+        )
@@ -1,13 +1,37 @@
-from datetime import datetime
+import math
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import case, func, select
+from sqlalchemy import (
+    Integer,
+    Row,
+    Select,
+    and_,
+    case,
+    cast,
+    func,
+    insert,
+    literal_column,
+    select,
+    tuple_,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from domain.dto import PredictionStatsDTO
+from config import settings
+from domain.dto import (
+    ModelStatsDTO,
+    PredictionLogFilter,
+    PredictionStatsDTO,
+    TimeseriesBucketDTO,
+)
 from domain.entities import PredictionLog
 from domain.repositories import PredictionLogRepository
 from infrastructure.base_repository import SQLAlchemyBaseRepository
-from infrastructure.models import PredictionLogModel
+from infrastructure.instrumentation import count_ingested, instrumented
+from infrastructure.model_registry import model_id_subquery, model_registry
+from infrastructure.models import ModelNameModel, PredictionLogModel
+from infrastructure.replicas import READ_ONLY
+from infrastructure.rollups import StatsRollups, percentile_label
 
 
 class SQLAlchemyPredictionLogRepository(
@@ -16,18 +40,51 @@ class SQLAlchemyPredictionLogRepository(
 ):
     """Реализация репозитория с использованием SQLAlchemy"""
 
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, use_rollups: Optional[bool] = None):
         super().__init__(session, PredictionLogModel)
+        if use_rollups is None:
+            use_rollups = settings.stats_rollups_enabled
+        self.rollups = StatsRollups(session) if use_rollups else None
+        self._model_ids: Dict[str, int] = {}
 
-    def _entity_to_model(self, entity: PredictionLog) -> PredictionLogModel:
-        """Преобразовать доменную сущность в модель SQLAlchemy"""
-        return PredictionLogModel(
-            model_name=entity.model_name,
-            duration_ms=entity.duration_ms,
-            was_successful=entity.was_successful,
-            timestamp=entity.timestamp,
+    async def _before_write(self, entities: List[PredictionLog]) -> None:
+        """Получить ключи моделей из справочника до записи логов"""
+        self._model_ids.update(
+            await model_registry.resolve(
+                self.session, {entity.model_name for entity in entities}
+            )
         )
 
+    @instrumented
+    async def create_many(self, entities: List[PredictionLog]) -> List[PredictionLog]:
+        """Создать логи и учесть их в метрике записи"""
+        created = await super().create_many(entities)
+        count_ingested(entity.model_name for entity in created)
+        return created
+
+    async def _on_created(self, entities: List[PredictionLog]) -> None:
+        """Добавить новые логи в таблицы предагрегации"""
+        if self.rollups is not None:
+            await self.rollups.apply(entities)
+
+    def _needs_previous_state(self) -> bool:
+        """Прежние модель и время нужны для пересчета бакетов"""
+        return self.rollups is not None
+
+    async def _on_modified(self, entities: List[PredictionLog]) -> None:
+        """Пересчитать затронутые бакеты предагрегации"""
+        if self.rollups is not None:
+            await self.rollups.rebuild(entities)
+
+    def _entity_to_values(self, entity: PredictionLog) -> Dict[str, Any]:
+        """Преобразовать доменную сущность в словарь значений колонок"""
+        return {
+            "model_id": self._model_ids[entity.model_name],
+            "duration_ms": entity.duration_ms,
+            "was_successful": entity.was_successful,
+            "timestamp": entity.timestamp,
+        }
+
     def _model_to_entity(self, model: PredictionLogModel) -> PredictionLog:
         """Преобразовать модель SQLAlchemy в доменную сущность"""
         return PredictionLog(
@@ -38,37 +95,375 @@ class SQLAlchemyPredictionLogRepository(
             timestamp=model.timestamp,
         )
 
-    def _update_model_from_entity(
-        self, model: PredictionLogModel, entity: PredictionLog
-    ) -> None:
-        """Обновить модель SQLAlchemy из доменной сущности"""
-        model.model_name = entity.model_name
-        model.duration_ms = entity.duration_ms
-        model.was_successful = entity.was_successful
-        model.timestamp = entity.timestamp
+    def _row_to_entity(self, row: Row) -> PredictionLog:
+        """Преобразовать строку результата Core-запроса в доменную сущность"""
+        return PredictionLog(
+            id=row.id,
+            model_name=row.model_name,
+            duration_ms=row.duration_ms,
+            was_successful=row.was_successful,
+            timestamp=row.timestamp,
+        )
+
+    @instrumented
+    async def bulk_insert(self, entities: List[PredictionLog]) -> int:
+        """Массово загрузить логи через COPY (asyncpg) или executemany"""
+        if not entities:
+            return 0
+
+        await self._before_write(entities)
+        # Агрегаты пишем первыми: так COPY выполнится в уже открытой транзакции
+        await self._on_created(entities)
+
+        connection = await self.session.connection()
+        if connection.dialect.driver == "asyncpg":
+            columns = ["model_id", "duration_ms", "was_successful", "timestamp"]
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                PredictionLogModel.__tablename__,
+                records=[
+                    (
+                        self._model_ids[e.model_name],
+                        e.duration_ms,
+                        e.was_successful,
+                        e.timestamp,
+                    )
+                    for e in entities
+                ],
+                columns=columns,
+            )
+        else:
+            # Переносимый путь для SQLite и других драйверов
+            await self.session.execute(
+                insert(PredictionLogModel),
+                [self._entity_to_values(entity) for entity in entities],
+            )
+
+        await self.session.commit()
+        count_ingested(entity.model_name for entity in entities)
+        return len(entities)
+
+    def _filter_conditions(self, filters: PredictionLogFilter) -> list:
+        """Построить условия WHERE по фильтрам выборки"""
+        conditions = []
+        if filters.model_name is not None:
+            conditions.append(
+                PredictionLogModel.model_id == model_id_subquery(filters.model_name)
+            )
+        if filters.from_date is not None:
+            conditions.append(PredictionLogModel.timestamp >= filters.from_date)
+        if filters.to_date is not None:
+            conditions.append(PredictionLogModel.timestamp <= filters.to_date)
+        if filters.was_successful is not None:
+            conditions.append(PredictionLogModel.was_successful == filters.was_successful)
+        return conditions
+
+    def _entity_query(self) -> Select:
+        """Колонки лога с именем модели из справочника"""
+        return select(
+            PredictionLogModel.id,
+            ModelNameModel.name.label("model_name"),
+            PredictionLogModel.duration_ms,
+            PredictionLogModel.was_successful,
+            PredictionLogModel.timestamp,
+        ).join(ModelNameModel, ModelNameModel.id == PredictionLogModel.model_id)
+
+    def _list_query(self, filters: PredictionLogFilter):
+        """Базовый запрос списка логов в порядке (timestamp, id)"""
+        return (
+            self._entity_query()
+            .where(*self._filter_conditions(filters))
+            .order_by(PredictionLogModel.timestamp, PredictionLogModel.id)
+        )
+
+    @instrumented
+    async def get_page(
+        self,
+        filters: PredictionLogFilter,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> List[PredictionLog]:
+        """Получить страницу логов, упорядоченных по (timestamp, id), после курсора"""
+        query = self._list_query(filters).limit(limit)
+        if after is not None:
+            query = query.where(
+                tuple_(PredictionLogModel.timestamp, PredictionLogModel.id)
+                > tuple_(*after)
+            )
+
+        result = await self.session.execute(query, bind_arguments=READ_ONLY)
+        return [self._row_to_entity(row) for row in result]
 
+    @instrumented
+    async def stream_batches(
+        self, filters: PredictionLogFilter, batch_size: int = 1000
+    ) -> AsyncIterator[List[PredictionLog]]:
+        """Потоково читать логи пачками через серверный курсор"""
+        query = self._list_query(filters).execution_options(yield_per=batch_size)
+        result = await self.session.stream(query, bind_arguments=READ_ONLY)
+        async for partition in result.partitions():
+            yield [self._row_to_entity(row) for row in partition]
+
+    @instrumented
     async def get_stats(
-        self, model_name: str, from_date: datetime, to_date: datetime
+        self,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        percentiles: Sequence[float] = (),
+        exact: bool = False,
     ) -> PredictionStatsDTO:
         """Получить статистику по модели за период"""
+        if self.rollups is not None:
+            stats = await self.rollups.get_stats(
+                model_name, from_date, to_date, () if exact else percentiles
+            )
+        else:
+            stats = await self.get_raw_stats(model_name, from_date, to_date)
+            # Без таблиц скетчей перцентили считаем только точно
+            exact = True
+
+        if exact and percentiles and stats.total_requests:
+            stats.percentiles = await self._get_exact_percentiles(
+                model_name, from_date, to_date, percentiles
+            )
+        return stats
+
+    @instrumented
+    async def get_raw_stats(
+        self, model_name: str, from_date: datetime, to_date: datetime
+    ) -> PredictionStatsDTO:
+        """Получить статистику полным сканированием сырых строк"""
         # Запрос для получения общей статистики
         query = select(
             func.count().label("total_requests"),
             func.sum(case((PredictionLogModel.was_successful, 1), else_=0)).label(
                 "successful_requests"
             ),
-            func.avg(PredictionLogModel.duration_ms).label("average_duration_ms"),
+            func.sum(PredictionLogModel.duration_ms).label("duration_sum"),
+            func.min(PredictionLogModel.duration_ms).label("duration_min"),
+            func.max(PredictionLogModel.duration_ms).label("duration_max"),
         ).where(
-            PredictionLogModel.model_name == model_name,
+            PredictionLogModel.model_id == model_id_subquery(model_name),
             PredictionLogModel.timestamp >= from_date,
             PredictionLogModel.timestamp <= to_date,
         )
 
-        result = await self.session.execute(query)
+        result = await self.session.execute(query, bind_arguments=READ_ONLY)
         row = result.first()
 
+        total_requests = row.total_requests or 0
+        # Среднее считаем так же, как по бакетам, чтобы результаты совпадали точно
         return PredictionStatsDTO(
-            total_requests=row.total_requests or 0,
+            total_requests=total_requests,
             successful_requests=row.successful_requests or 0,
-            average_duration_ms=float(row.average_duration_ms or 0.0),
+            average_duration_ms=(
+                int(row.duration_sum) / total_requests if total_requests else 0.0
+            ),
+            min_duration_ms=row.duration_min,
+            max_duration_ms=row.duration_max,
+        )
+
+    @instrumented
+    async def get_timeseries(
+        self,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        interval_seconds: int,
+        histogram_bounds: Sequence[int] = (),
+    ) -> List[TimeseriesBucketDTO]:
+        """Получить статистику по интервалам одним сгруппированным запросом"""
+        connection = await self.session.connection(bind_arguments=READ_ONLY)
+        duration = PredictionLogModel.duration_ms
+
+        if connection.dialect.name == "postgresql":
+            # Литералы вместо параметров: выражение в SELECT и GROUP BY должно совпадать
+            bucket = func.date_bin(
+                literal_column(f"INTERVAL '{int(interval_seconds)} seconds'"),
+                PredictionLogModel.timestamp,
+                literal_column("TIMESTAMP '1970-01-01'"),
+            )
+        else:
+            # Переносимый путь: целочисленное деление unix-времени на интервал
+            epoch = cast(func.strftime("%s", PredictionLogModel.timestamp), Integer)
+            bucket = epoch // interval_seconds * interval_seconds
+        bucket = bucket.label("bucket")
+
+        histogram_columns = []
+        if histogram_bounds:
+            edges = [None, *histogram_bounds, None]
+            for lower, upper in zip(edges, edges[1:]):
+                conditions = []
+                if lower is not None:
+                    conditions.append(duration >= lower)
+                if upper is not None:
+                    conditions.append(duration < upper)
+                histogram_columns.append(
+                    func.sum(case((and_(*conditions), 1), else_=0))
+                )
+
+        query = (
+            select(
+                bucket,
+                func.count(),
+                func.sum(case((PredictionLogModel.was_successful, 1), else_=0)),
+                func.sum(duration),
+                *histogram_columns,
+            )
+            .where(
+                PredictionLogModel.model_id == model_id_subquery(model_name),
+                PredictionLogModel.timestamp >= from_date,
+                PredictionLogModel.timestamp <= to_date,
+            )
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+
+        result = await self.session.execute(query, bind_arguments=READ_ONLY)
+        buckets = []
+        for bucket_start, total, success, duration_sum, *histogram in result:
+            if not isinstance(bucket_start, datetime):
+                bucket_start = datetime(1970, 1, 1) + timedelta(seconds=bucket_start)
+            buckets.append(
+                TimeseriesBucketDTO(
+                    bucket_start=bucket_start,
+                    total_requests=total,
+                    successful_requests=int(success),
+                    average_duration_ms=int(duration_sum) / total,
+                    histogram=[int(count) for count in histogram]
+                    if histogram_bounds
+                    else None,
+                )
+            )
+        return buckets
+
+    def _models_stats_query(
+        self,
+        model_names: Optional[Sequence[str]],
+        from_date: datetime,
+        to_date: datetime,
+        order_by: Optional[str],
+        top_k: Optional[int],
+    ):
+        """Запрос статистики по моделям с группировкой по модели"""
+        total = func.count()
+        successful = func.sum(case((PredictionLogModel.was_successful, 1), else_=0))
+        orderings = {
+            "volume": total.desc(),
+            "error_rate": ((total - successful) * 1.0 / total).desc(),
+            "latency": func.avg(PredictionLogModel.duration_ms).desc(),
+        }
+        if order_by is not None and order_by not in orderings:
+            raise ValueError(f"Unsupported ordering: {order_by}")
+
+        query = (
+            select(
+                ModelNameModel.name.label("model_name"),
+                total.label("total_requests"),
+                successful.label("successful_requests"),
+                func.sum(PredictionLogModel.duration_ms).label("duration_sum"),
+            )
+            .join(ModelNameModel, ModelNameModel.id == PredictionLogModel.model_id)
+            .where(
+                PredictionLogModel.timestamp >= from_date,
+                PredictionLogModel.timestamp <= to_date,
+            )
+            .group_by(ModelNameModel.name)
+        )
+        if model_names is not None:
+            query = query.where(ModelNameModel.name.in_(model_names))
+        if order_by is not None:
+            query = query.order_by(orderings[order_by])
+        query = query.order_by(ModelNameModel.name)
+        if top_k is not None:
+            query = query.limit(top_k)
+        return query
+
+    def _row_to_model_stats(self, row: Row) -> ModelStatsDTO:
+        """Преобразовать строку сводки в DTO статистики модели"""
+        return ModelStatsDTO(
+            model_name=row.model_name,
+            total_requests=row.total_requests,
+            successful_requests=int(row.successful_requests),
+            average_duration_ms=int(row.duration_sum) / row.total_requests,
+        )
+
+    @instrumented
+    async def get_models_stats(
+        self,
+        model_names: Optional[Sequence[str]],
+        from_date: datetime,
+        to_date: datetime,
+        order_by: Optional[str] = None,
+        top_k: Optional[int] = None,
+    ) -> List[ModelStatsDTO]:
+        """Получить статистику по нескольким моделям одним GROUP BY"""
+        query = self._models_stats_query(model_names, from_date, to_date, order_by, top_k)
+        result = await self.session.execute(query, bind_arguments=READ_ONLY)
+        return [self._row_to_model_stats(row) for row in result]
+
+    @instrumented
+    async def stream_models_stats(
+        self,
+        model_names: Optional[Sequence[str]],
+        from_date: datetime,
+        to_date: datetime,
+        order_by: Optional[str] = None,
+        top_k: Optional[int] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[ModelStatsDTO]]:
+        """Потоково получить статистику по моделям пачками"""
+        query = self._models_stats_query(
+            model_names, from_date, to_date, order_by, top_k
+        ).execution_options(yield_per=batch_size)
+        result = await self.session.stream(query, bind_arguments=READ_ONLY)
+        async for partition in result.partitions():
+            yield [self._row_to_model_stats(row) for row in partition]
+
+    async def _get_exact_percentiles(
+        self,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        percentiles: Sequence[float],
+    ) -> Dict[str, float]:
+        """Точные перцентили с линейной интерполяцией, как percentile_cont"""
+        conditions = (
+            PredictionLogModel.model_id == model_id_subquery(model_name),
+            PredictionLogModel.timestamp >= from_date,
+            PredictionLogModel.timestamp <= to_date,
+        )
+
+        connection = await self.session.connection(bind_arguments=READ_ONLY)
+        if connection.dialect.name == "postgresql":
+            query = select(
+                *[
+                    func.percentile_cont(percentile / 100).within_group(
+                        PredictionLogModel.duration_ms
+                    )
+                    for percentile in percentiles
+                ]
+            ).where(*conditions)
+            row = (await self.session.execute(query, bind_arguments=READ_ONLY)).one()
+            return {
+                percentile_label(percentile): float(value)
+                for percentile, value in zip(percentiles, row)
+                if value is not None
+            }
+
+        # Переносимый путь: сортировка длительностей на стороне приложения
+        durations = sorted(
+            await self.session.scalars(
+                select(PredictionLogModel.duration_ms).where(*conditions),
+                bind_arguments=READ_ONLY,
+            )
         )
+        result = {}
+        for percentile in percentiles:
+            position = percentile / 100 * (len(durations) - 1)
+            lower, upper = math.floor(position), math.ceil(position)
+            result[percentile_label(percentile)] = durations[lower] + (
+                durations[upper] - durations[lower]
+            ) * (position - lower)
+        return result
@@ -0,0 +1,348 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import Table, delete, func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import settings
+from domain.dto import RetentionPolicy
+from infrastructure.database import engine
+from infrastructure.models import (
+    ModelNameModel,
+    PredictionLatencyDayModel,
+    PredictionLatencyHourModel,
+    PredictionLogModel,
+    PredictionStatsDayModel,
+    PredictionStatsHourModel,
+    PredictionStatsMinuteModel,
+)
+from infrastructure.partitions import PartitionManager
+from infrastructure.stats_cache import get_stats_cache
+from utils.datetimes import utcnow
+from utils.logger import log_error, log_info, log_warning
+from utils.metrics import Counter, Histogram
+
+retention_rows_deleted = Counter(
+    "retention_rows_deleted_total", "Строки, удаленные политикой хранения"
+)
+retention_partitions_dropped = Counter(
+    "retention_partitions_dropped_total", "Секции, удаленные политикой хранения"
+)
+retention_batch_seconds = Histogram(
+    "retention_batch_seconds", "Длительность одной пачки удаления"
+)
+retention_run_seconds = Histogram(
+    "retention_run_seconds", "Длительность полного прохода очистки"
+)
+
+# Сырые логи и поминутные бакеты живут raw_days, часовые и суточные - aggregate_months
+RAW_TABLES: List[Tuple[Table, str]] = [
+    (PredictionLogModel.__table__, "timestamp"),
+    (PredictionStatsMinuteModel.__table__, "bucket"),
+]
+AGGREGATE_TABLES: List[Tuple[Table, str]] = [
+    (PredictionStatsHourModel.__table__, "bucket"),
+    (PredictionStatsDayModel.__table__, "bucket"),
+    (PredictionLatencyHourModel.__table__, "bucket"),
+    (PredictionLatencyDayModel.__table__, "bucket"),
+]
+
+# Ключ advisory-блокировки: проход очистки выполняет один процесс
+RETENTION_LOCK = "retention"
+
+
+@dataclass
+class RetentionReport:
+    """Итог прохода очистки"""
+
+    deleted: Dict[str, int] = field(default_factory=dict)
+    dropped_partitions: List[str] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+    # Проход пропущен: очистку уже выполняет другой процесс
+    skipped: bool = False
+
+
+def subtract_months(value: datetime, months: int) -> datetime:
+    """Сдвинуть дату на months месяцев назад, обрезая день до конца месяца"""
+    month_index = value.year * 12 + value.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    next_month = datetime(year + month // 12, month % 12 + 1, 1)
+    last_day = (next_month - timedelta(days=1)).day
+    return value.replace(year=year, month=month, day=min(value.day, last_day))
+
+
+def policies_from_settings() -> Tuple[RetentionPolicy, Dict[str, RetentionPolicy]]:
+    """Политика по умолчанию и политики отдельных моделей из настроек"""
+    default = RetentionPolicy(
+        raw_days=settings.retention_raw_days,
+        aggregate_months=settings.retention_aggregate_months,
+    )
+    per_model = {
+        model_name: RetentionPolicy(**policy)
+        for model_name, policy in settings.retention_policies.items()
+    }
+    return default, per_model
+
+
+class RetentionJob:
+    """Удаление устаревших логов и агрегатов ограниченными пачками"""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        default_policy: RetentionPolicy,
+        policies: Optional[Dict[str, RetentionPolicy]] = None,
+        batch_size: int = 10000,
+        batch_pause_ms: int = 100,
+        partition_manager: Optional[PartitionManager] = None,
+        rollups_enabled: bool = True,
+    ):
+        self.engine = engine
+        self.default_policy = default_policy
+        self.policies = policies or {}
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause_ms / 1000
+        self.partition_manager = partition_manager
+        self.rollups_enabled = rollups_enabled
+        self._task: Optional[asyncio.Task] = None
+
+    def _cutoffs(self, now: datetime, tier: str) -> List[Tuple[list, datetime]]:
+        """Условия на модель и границы удаления для уровня raw или aggregate"""
+
+        def cutoff(policy: RetentionPolicy) -> Optional[datetime]:
+            if tier == "raw":
+                if policy.raw_days is None:
+                    return None
+                return now - timedelta(days=policy.raw_days)
+            if policy.aggregate_months is None:
+                return None
+            return subtract_months(now, policy.aggregate_months)
+
+        rules = []
+        for model_name, policy in self.policies.items():
+            model_cutoff = cutoff(policy)
+            if model_cutoff is not None:
+                rules.append(([model_name], model_cutoff))
+
+        default_cutoff = cutoff(self.default_policy)
+        if default_cutoff is not None:
+            # Политика по умолчанию действует на модели без своей политики
+            rules.append((None, default_cutoff))
+        return rules
+
+    def _condition(self, table: Table, model_names: Optional[list]):
+        if model_names is None and not self.policies:
+            return None
+        names = model_names if model_names is not None else list(self.policies)
+        if "model_id" in table.c:
+            # Сырые логи ссылаются на справочник моделей
+            column = table.c.model_id
+            names = select(ModelNameModel.id).where(ModelNameModel.name.in_(names))
+        else:
+            column = table.c.model_name
+        if model_names is not None:
+            return column.in_(names)
+        return column.not_in(names)
+
+    async def run(
+        self, now: Optional[datetime] = None, dry_run: bool = False
+    ) -> RetentionReport:
+        """Один проход очистки; dry_run только считает строки к удалению"""
+        now = now or utcnow()
+        started = time.perf_counter()
+        report = RetentionReport()
+
+        async with self._exclusive() as acquired:
+            if not acquired:
+                report.skipped = True
+                return report
+            await self._run_pass(now, dry_run, report)
+
+        report.elapsed_seconds = round(time.perf_counter() - started, 3)
+        if not dry_run:
+            retention_run_seconds.observe(report.elapsed_seconds)
+            if get_stats_cache() is not None and (
+                any(report.deleted.values()) or report.dropped_partitions
+            ):
+                # Кэш этого процесса; другие процессы увидят удаление по TTL окон
+                get_stats_cache().clear()
+        return report
+
+    async def _run_pass(
+        self, now: datetime, dry_run: bool, report: RetentionReport
+    ) -> None:
+        tiers = [("aggregate", AGGREGATE_TABLES)]
+        if self.rollups_enabled:
+            tiers.insert(0, ("raw", RAW_TABLES))
+            if not dry_run:
+                report.dropped_partitions = await self._drop_expired_partitions(now)
+        elif self._cutoffs(now, "raw"):
+            # Без агрегатов удаление сырых строк стерло бы всю историю периода
+            log_warning(
+                "Retention: raw logs are kept because stats rollups are disabled"
+            )
+
+        for tier, tables in tiers:
+            for model_names, cutoff in self._cutoffs(now, tier):
+                for table, time_column in tables:
+                    conditions = [table.c[time_column] < cutoff]
+                    model_condition = self._condition(table, model_names)
+                    if model_condition is not None:
+                        conditions.append(model_condition)
+
+                    if dry_run:
+                        count = await self._count(table, conditions)
+                    else:
+                        count = await self._delete_batches(
+                            table, time_column, conditions
+                        )
+                    report.deleted[table.name] = (
+                        report.deleted.get(table.name, 0) + count
+                    )
+
+    @asynccontextmanager
+    async def _exclusive(self) -> AsyncIterator[bool]:
+        """Advisory-блокировка PostgreSQL на время прохода; False - занята"""
+        async with self.engine.connect() as conn:
+            if conn.dialect.name != "postgresql":
+                yield True
+                return
+            lock = {"name": RETENTION_LOCK}
+            acquired = (
+                await conn.execute(
+                    text("SELECT pg_try_advisory_lock(hashtext(:name))"), lock
+                )
+            ).scalar()
+            # Блокировка сессионная: транзакцию не держим открытой весь проход
+            await conn.commit()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    await conn.execute(
+                        text("SELECT pg_advisory_unlock(hashtext(:name))"), lock
+                    )
+                    await conn.commit()
+
+    async def _count(self, table: Table, conditions: list) -> int:
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                select(func.count()).select_from(table).where(*conditions)
+            )
+            return result.scalar_one()
+
+    async def _delete_batches(
+        self, table: Table, time_column: str, conditions: list
+    ) -> int:
+        """Удалять по batch_size строк в отдельных транзакциях с паузой между ними"""
+        key_columns = list(table.primary_key.columns)
+        if time_column not in {column.name for column in key_columns}:
+            # Ключ секционирования в условии ограничивает поиск нужными секциями
+            key_columns.append(table.c[time_column])
+
+        batch = select(*key_columns).where(*conditions).limit(self.batch_size)
+        statement = delete(table).where(tuple_(*key_columns).in_(batch))
+
+        total = 0
+        while True:
+            batch_started = time.perf_counter()
+            async with self.engine.begin() as conn:
+                deleted = (await conn.execute(statement)).rowcount
+            retention_batch_seconds.observe(time.perf_counter() - batch_started)
+            retention_rows_deleted.inc(deleted, table=table.name)
+            total += deleted
+
+            if deleted < self.batch_size:
+                return total
+            await asyncio.sleep(self.batch_pause)
+
+    async def _drop_expired_partitions(self, now: datetime) -> List[str]:
+        """Удалить секции сырых логов, устаревшие для всех моделей"""
+        if self.partition_manager is None or self.default_policy.raw_days is None:
+            return []
+        if any(policy.raw_days is None for policy in self.policies.values()):
+            return []
+
+        # Самая длинная политика определяет, что устарело для всех моделей
+        cutoff = min(cutoff for _, cutoff in self._cutoffs(now, "raw"))
+        dropped = []
+        for partition in await self.partition_manager.list_partitions():
+            if partition.end > cutoff:
+                break
+            await self.partition_manager.drop_partition(partition)
+            retention_partitions_dropped.inc()
+            dropped.append(partition.name)
+        return dropped
+
+    async def start(self, interval_s: float) -> None:
+        """Запустить периодическую очистку"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval_s))
+
+    async def stop(self) -> None:
+        """Остановить периодическую очистку"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, interval_s: float) -> None:
+        while True:
+            try:
+                report = await self.run()
+                if report.skipped:
+                    log_info("Retention: skipped, another process holds the lock")
+                else:
+                    log_info(
+                        "Retention: deleted %s, dropped partitions %s in %ss",
+                        report.deleted,
+                        report.dropped_partitions,
+                        report.elapsed_seconds,
+                    )
+            except Exception as e:
+                log_error(e, "retention")
+            await asyncio.sleep(interval_s)
+
+
+def create_retention_job() -> RetentionJob:
+    """Задача очистки с политиками из настроек"""
+    default_policy, policies = policies_from_settings()
+    return RetentionJob(
+        engine,
+        default_policy,
+        policies,
+        batch_size=settings.retention_batch_size,
+        batch_pause_ms=settings.retention_batch_pause_ms,
+        partition_manager=PartitionManager(
+            engine, interval=settings.partition_interval
+        ),
+        rollups_enabled=settings.stats_rollups_enabled,
+    )
+
+
+retention_job: Optional[RetentionJob] = None
+
+
+async def start_retention() -> None:
+    """Запустить фоновую очистку устаревших данных"""
+    global retention_job
+    retention_job = create_retention_job()
+    await retention_job.start(settings.retention_interval_s)
+
+
+async def stop_retention() -> None:
+    """Остановить фоновую очистку"""
+    global retention_job
+    if retention_job is None:
+        return
+    await retention_job.stop()
+    retention_job = None
@@ -0,0 +1,433 @@
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import Float, Integer, and_, case, cast, func, literal, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.dto import PredictionStatsDTO
+from domain.entities import PredictionLog
+from infrastructure.models import (
+    LatencySketchMixin,
+    PredictionLatencyDayModel,
+    PredictionLatencyHourModel,
+    PredictionLogModel,
+    PredictionStatsDayModel,
+    PredictionStatsHourModel,
+    PredictionStatsMinuteModel,
+    StatsRollupMixin,
+)
+from infrastructure.model_registry import model_id_subquery
+from infrastructure.replicas import READ_ONLY
+from utils.sketch import ZERO_KEY, DDSketch
+
+Range = Tuple[datetime, datetime]
+
+# Точность скетчей зашита в сохраненные ключи бакетов, менять только с пересчетом
+SKETCH_RELATIVE_ACCURACY = 0.01
+# Предел параметров в одном выражении у asyncpg (и у SQLite с версии 3.32)
+MAX_BIND_PARAMETERS = 32767
+
+
+def percentile_label(percentile: float) -> str:
+    """Имя перцентиля в ответе: 50 -> p50, 99.9 -> p99.9"""
+    return f"p{percentile:g}"
+
+
+@dataclass(frozen=True)
+class RollupLevel:
+    """Уровень предагрегации: таблица и способ выравнивания метки"""
+
+    name: str
+    model: Type[StatsRollupMixin]
+    step: timedelta
+    sketch_model: Optional[Type[LatencySketchMixin]] = None
+
+    def floor(self, value: datetime) -> datetime:
+        """Начало бакета, содержащего метку"""
+        if self.name == "day":
+            return value.replace(hour=0, minute=0, second=0, microsecond=0)
+        if self.name == "hour":
+            return value.replace(minute=0, second=0, microsecond=0)
+        return value.replace(second=0, microsecond=0)
+
+    def ceil(self, value: datetime) -> datetime:
+        """Начало первого бакета, начинающегося не раньше метки"""
+        floored = self.floor(value)
+        return floored if floored == value else floored + self.step
+
+
+# От крупных к мелким: так диапазон покрывается минимальным числом строк
+LEVELS = [
+    RollupLevel(
+        "day", PredictionStatsDayModel, timedelta(days=1), PredictionLatencyDayModel
+    ),
+    RollupLevel(
+        "hour", PredictionStatsHourModel, timedelta(hours=1), PredictionLatencyHourModel
+    ),
+    RollupLevel("minute", PredictionStatsMinuteModel, timedelta(minutes=1)),
+]
+
+# Поминутные скетчи слишком объемны, края до часа дочитываются из сырых строк
+SKETCH_LEVELS = [level for level in LEVELS if level.sketch_model is not None]
+
+
+def plan_ranges(
+    start: datetime, end: datetime, levels: Sequence[RollupLevel] = LEVELS
+) -> Tuple[Dict[str, List[Range]], List[Range]]:
+    """Разбить полуинтервал [start, end) на целые бакеты и невыровненные края.
+
+    Возвращает диапазоны бакетов по уровням и диапазоны сырых строк.
+    """
+    buckets: Dict[str, List[Range]] = {level.name: [] for level in levels}
+    raw: List[Range] = []
+
+    def decompose(left: datetime, right: datetime, depth: int) -> None:
+        if left >= right:
+            return
+        if depth == len(levels):
+            raw.append((left, right))
+            return
+
+        level = levels[depth]
+        first, last = level.ceil(left), level.floor(right)
+        if first < last:
+            buckets[level.name].append((first, last))
+            decompose(left, first, depth + 1)
+            decompose(last, right, depth + 1)
+        else:
+            decompose(left, right, depth + 1)
+
+    decompose(start, end, 0)
+    return buckets, raw
+
+
+@dataclass
+class _Totals:
+    """Накопитель агрегатов из нескольких источников"""
+
+    total: int = 0
+    success: int = 0
+    duration_sum: int = 0
+    duration_min: Optional[int] = None
+    duration_max: Optional[int] = None
+
+    def add(self, total, success, duration_sum, duration_min, duration_max) -> None:
+        if not total:
+            return
+        self.total += int(total)
+        self.success += int(success)
+        self.duration_sum += int(duration_sum)
+        if self.duration_min is None or duration_min < self.duration_min:
+            self.duration_min = duration_min
+        if self.duration_max is None or duration_max > self.duration_max:
+            self.duration_max = duration_max
+
+    def to_dto(self) -> PredictionStatsDTO:
+        return PredictionStatsDTO(
+            total_requests=self.total,
+            successful_requests=self.success,
+            average_duration_ms=self.duration_sum / self.total if self.total else 0.0,
+            min_duration_ms=self.duration_min,
+            max_duration_ms=self.duration_max,
+        )
+
+
+def _range_condition(column, ranges: List[Range]):
+    """Условие попадания колонки в любой из полуинтервалов"""
+    return or_(*[and_(column >= start, column < end) for start, end in ranges])
+
+
+def _sketch_bins(*conditions):
+    """Подзапрос ключей бакетов DDSketch для сырых строк; совпадает с DDSketch.key"""
+    duration = PredictionLogModel.duration_ms
+    log_gamma = math.log(DDSketch(SKETCH_RELATIVE_ACCURACY).gamma)
+    key = case(
+        (duration == 0, ZERO_KEY),
+        else_=cast(func.ceil(func.ln(cast(duration, Float)) / log_gamma), Integer),
+    )
+    return select(key.label("bin")).where(*conditions).subquery()
+
+
+def _on_conflict_add(statement, model: type, keys: List[str]):
+    """ON CONFLICT: счетчики суммируются, min/max выбираются из двух значений"""
+    excluded = statement.excluded
+    table = model.__table__.c
+    updates = {}
+    for column in table:
+        if column.name in keys:
+            continue
+        if column.name == "duration_min":
+            updates[column.name] = case(
+                (excluded.duration_min < column, excluded.duration_min),
+                else_=column,
+            )
+        elif column.name == "duration_max":
+            updates[column.name] = case(
+                (excluded.duration_max > column, excluded.duration_max),
+                else_=column,
+            )
+        else:
+            updates[column.name] = column + excluded[column.name]
+
+    return statement.on_conflict_do_update(
+        index_elements=[table[key] for key in keys], set_=updates
+    )
+
+
+class StatsRollups:
+    """Поддержка таблиц предагрегированной статистики и ответы по ним"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def apply(self, entities: Iterable[PredictionLog]) -> None:
+        """Инкрементально добавить новые логи в бакеты всех уровней"""
+        entities = list(entities)
+        if not entities:
+            return
+
+        for level in LEVELS:
+            rows: Dict[Tuple[str, datetime], _Totals] = {}
+            for entity in entities:
+                key = (entity.model_name, level.floor(entity.timestamp))
+                totals = rows.setdefault(key, _Totals())
+                totals.add(
+                    1,
+                    1 if entity.was_successful else 0,
+                    entity.duration_ms,
+                    entity.duration_ms,
+                    entity.duration_ms,
+                )
+            # Сортировка ключей снижает риск взаимных блокировок при upsert
+            await self._upsert(
+                level.model,
+                ["model_name", "bucket"],
+                [
+                    {
+                        "model_name": model_name,
+                        "bucket": bucket,
+                        "total_count": totals.total,
+                        "success_count": totals.success,
+                        "duration_sum": totals.duration_sum,
+                        "duration_min": totals.duration_min,
+                        "duration_max": totals.duration_max,
+                    }
+                    for (model_name, bucket), totals in sorted(rows.items())
+                ],
+            )
+
+        sketch = DDSketch(SKETCH_RELATIVE_ACCURACY)
+        for level in SKETCH_LEVELS:
+            bins: Dict[Tuple[str, datetime, int], int] = {}
+            for entity in entities:
+                key = (
+                    entity.model_name,
+                    level.floor(entity.timestamp),
+                    sketch.key(entity.duration_ms),
+                )
+                bins[key] = bins.get(key, 0) + 1
+            await self._upsert(
+                level.sketch_model,
+                ["model_name", "bucket", "bin"],
+                [
+                    {"model_name": name, "bucket": bucket, "bin": bin, "count": count}
+                    for (name, bucket, bin), count in sorted(bins.items())
+                ],
+            )
+
+    async def rebuild(self, entities: Iterable[PredictionLog]) -> None:
+        """Пересчитать из сырых строк бакеты, затронутые изменением или удалением"""
+        keys = {(entity.model_name, entity.timestamp) for entity in entities}
+        for level in LEVELS:
+            for model_name, bucket in sorted(
+                {(name, level.floor(ts)) for name, ts in keys}
+            ):
+                await self._rebuild_bucket(level, model_name, bucket)
+
+    async def _rebuild_bucket(
+        self, level: RollupLevel, model_name: str, bucket: datetime
+    ) -> None:
+        """Пересчитать один бакет уровня и его скетч"""
+        table = PredictionLogModel
+        in_bucket = (
+            table.model_id == model_id_subquery(model_name),
+            table.timestamp >= bucket,
+            table.timestamp < bucket + level.step,
+        )
+
+        rollup = level.model
+        await self.session.execute(
+            rollup.__table__.delete().where(
+                rollup.model_name == model_name, rollup.bucket == bucket
+            )
+        )
+        source = (
+            select(
+                literal(model_name, rollup.model_name.type),
+                literal(bucket, rollup.bucket.type),
+                func.count(),
+                func.sum(case((table.was_successful, 1), else_=0)),
+                func.sum(table.duration_ms),
+                func.min(table.duration_ms),
+                func.max(table.duration_ms),
+            )
+            .where(*in_bucket)
+            .having(func.count() > 0)
+        )
+        await self.session.execute(
+            rollup.__table__.insert().from_select(
+                [
+                    "model_name",
+                    "bucket",
+                    "total_count",
+                    "success_count",
+                    "duration_sum",
+                    "duration_min",
+                    "duration_max",
+                ],
+                source,
+            )
+        )
+
+        if level.sketch_model is None:
+            return
+
+        sketch_model = level.sketch_model
+        await self.session.execute(
+            sketch_model.__table__.delete().where(
+                sketch_model.model_name == model_name, sketch_model.bucket == bucket
+            )
+        )
+        # Бакеты скетча считаются в БД, длительности в приложение не читаются
+        bins = _sketch_bins(*in_bucket)
+        await self.session.execute(
+            sketch_model.__table__.insert().from_select(
+                ["model_name", "bucket", "bin", "count"],
+                select(
+                    literal(model_name, sketch_model.model_name.type),
+                    literal(bucket, sketch_model.bucket.type),
+                    bins.c.bin,
+                    func.count(),
+                ).group_by(bins.c.bin),
+            )
+        )
+
+    async def get_stats(
+        self,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        percentiles: Sequence[float] = (),
+    ) -> PredictionStatsDTO:
+        """Посчитать статистику за [from_date, to_date] по бакетам и краям диапазона"""
+        totals = _Totals()
+        if from_date > to_date:
+            return totals.to_dto()
+
+        # Верхняя граница включительная, метки хранятся с точностью до микросекунды
+        end = to_date + timedelta(microseconds=1)
+        buckets, raw = plan_ranges(from_date, end)
+
+        for level in LEVELS:
+            ranges = buckets[level.name]
+            if not ranges:
+                continue
+            rollup = level.model
+            query = select(
+                func.sum(rollup.total_count),
+                func.sum(rollup.success_count),
+                func.sum(rollup.duration_sum),
+                func.min(rollup.duration_min),
+                func.max(rollup.duration_max),
+            ).where(
+                rollup.model_name == model_name,
+                _range_condition(rollup.bucket, ranges),
+            )
+            result = await self.session.execute(query, bind_arguments=READ_ONLY)
+            totals.add(*result.one())
+
+        if raw:
+            table = PredictionLogModel
+            query = select(
+                func.count(),
+                func.sum(case((table.was_successful, 1), else_=0)),
+                func.sum(table.duration_ms),
+                func.min(table.duration_ms),
+                func.max(table.duration_ms),
+            ).where(
+                table.model_id == model_id_subquery(model_name),
+                _range_condition(table.timestamp, raw),
+            )
+            result = await self.session.execute(query, bind_arguments=READ_ONLY)
+            totals.add(*result.one())
+
+        stats = totals.to_dto()
+        if percentiles and stats.total_requests:
+            sketch = await self._merge_sketch(model_name, from_date, end)
+            for percentile in percentiles:
+                value = sketch.quantile(percentile / 100)
+                if value is None:
+                    continue
+                # Представитель бакета может выйти за фактический min/max
+                value = min(max(value, stats.min_duration_ms), stats.max_duration_ms)
+                stats.percentiles[percentile_label(percentile)] = value
+        return stats
+
+    async def _merge_sketch(
+        self, model_name: str, start: datetime, end: datetime
+    ) -> DDSketch:
+        """Слить скетчи целых бакетов и бакеты сырых строк на краях"""
+        sketch = DDSketch(SKETCH_RELATIVE_ACCURACY)
+        buckets, raw = plan_ranges(start, end, SKETCH_LEVELS)
+
+        for level in SKETCH_LEVELS:
+            ranges = buckets[level.name]
+            if not ranges:
+                continue
+            sketch_model = level.sketch_model
+            query = (
+                select(sketch_model.bin, func.sum(sketch_model.count))
+                .where(
+                    sketch_model.model_name == model_name,
+                    _range_condition(sketch_model.bucket, ranges),
+                )
+                .group_by(sketch_model.bin)
+            )
+            result = await self.session.execute(query, bind_arguments=READ_ONLY)
+            sketch.merge_bins(dict(result.all()))
+
+        if raw:
+            bins = _sketch_bins(
+                PredictionLogModel.model_id == model_id_subquery(model_name),
+                _range_condition(PredictionLogModel.timestamp, raw),
+            )
+            query = select(bins.c.bin, func.count()).group_by(bins.c.bin)
+            result = await self.session.execute(query, bind_arguments=READ_ONLY)
+            sketch.merge_bins(dict(result.all()))
+
+        return sketch
+
+    async def _upsert(self, model: type, keys: List[str], rows: List[dict]) -> None:
+        """Добавить строки, суммируя счетчики с существующими по ключу"""
+        if not rows:
+            return
+        connection = await self.session.connection()
+        if connection.dialect.name == "postgresql":
+            insert = postgresql.insert
+        elif connection.dialect.name == "sqlite":
+            insert = sqlite.insert
+        else:
+            raise NotImplementedError(
+                f"Rollup upsert is not supported for {connection.dialect.name}"
+            )
+
+        # Один multi-VALUES на все строки упирается в предел параметров драйвера;
+        # порядок ключей между частями сохраняется
+        chunk_size = max(MAX_BIND_PARAMETERS // len(rows[0]), 1)
+        for start in range(0, len(rows), chunk_size):
+            statement = insert(model).values(rows[start : start + chunk_size])
+            await self.session.execute(_on_conflict_add(statement, model, keys))
+
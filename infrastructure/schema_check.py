@@ -0,0 +1,57 @@
+from typing import Any, List
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from infrastructure.models import Base
+from infrastructure.partitions import PARTITIONED_TABLE
+
+# Необязательные индексы из миграций (alembic -x brin=true)
+OPTIONAL_INDEXES = {"ix_prediction_logs_timestamp_brin"}
+
+
+def include_object(
+    obj: Any, name: str, type_: str, reflected: bool, compare_to: Any
+) -> bool:
+    """Пропустить объекты БД, которых нет в метаданных намеренно"""
+    if not reflected or compare_to is not None:
+        return True
+    if type_ == "table":
+        # Секции prediction_logs создаются миграцией 004 и менеджером секций
+        return not name.startswith(f"{PARTITIONED_TABLE}_")
+    if type_ == "index":
+        return name not in OPTIONAL_INDEXES
+    return True
+
+
+def describe_diff(diff: Any) -> str:
+    """Короткое описание расхождения из compare_metadata"""
+    if isinstance(diff, list):
+        # Изменения одной колонки приходят списком
+        return "; ".join(describe_diff(item) for item in diff)
+    action = diff[0]
+    if action.startswith("modify_"):
+        _, _, table_name, column_name, _, existing, new = diff
+        return f"{action} {table_name}.{column_name}: {existing} -> {new}"
+    if action.endswith("_column"):
+        _, _, table_name, column = diff
+        return f"{action} {table_name}.{column.name}"
+    target = diff[1]
+    return f"{action} {getattr(target, 'name', None) or target}"
+
+
+def compare_schema(connection: Connection) -> List[str]:
+    """Расхождения между Base.metadata и схемой подключенной БД"""
+    context = MigrationContext.configure(
+        connection,
+        opts={"include_object": include_object, "compare_type": True},
+    )
+    return [describe_diff(diff) for diff in compare_metadata(context, Base.metadata)]
+
+
+async def find_schema_drift(engine: AsyncEngine) -> List[str]:
+    """Сравнить модели со схемой БД после миграций"""
+    async with engine.connect() as conn:
+        return await conn.run_sync(compare_schema)
@@ -0,0 +1,182 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Hashable, Iterable, Optional, Set
+
+from config import settings
+from domain.dto import PredictionStatsDTO
+from domain.repositories import PredictionStatsCache
+from utils.datetimes import utcnow
+from utils.metrics import CallbackMetric
+
+
+@dataclass
+class _Entry:
+    """Запись кэша статистики"""
+
+    stats: PredictionStatsDTO
+    model_name: str
+    from_date: datetime
+    to_date: datetime
+    expires_at: float
+
+
+class InMemoryStatsCache(PredictionStatsCache):
+    """LRU-кэш статистики в памяти процесса с TTL и инвалидацией при записи.
+
+    Окна, целиком лежащие в прошлом, хранятся с длинным TTL: их меняют только
+    записи с «опоздавшими» метками, и такие записи этого процесса вытесняют окно
+    явно. Изменения из других процессов видны не позже settled_ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 5.0,
+        settle_seconds: float = 60.0,
+        settled_ttl_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = utcnow,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.settle = timedelta(seconds=settle_seconds)
+        self.settled_ttl_seconds = settled_ttl_seconds
+        self._clock = clock
+        self._now = now
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._keys_by_model: Dict[str, Set[Hashable]] = {}
+        self._changes = 0
+        self._changed_at: Dict[str, int] = {}
+        self._cleared_at = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[PredictionStatsDTO]:
+        """Получить статистику из кэша"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > self._clock():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.stats
+
+        if entry is not None:
+            self._remove(key)
+        self.misses += 1
+        return None
+
+    def version(self, model_name: str) -> int:
+        """Текущая версия данных модели, берется до запроса к БД"""
+        return max(self._changed_at.get(model_name, 0), self._cleared_at)
+
+    def put(
+        self,
+        key: Hashable,
+        stats: PredictionStatsDTO,
+        model_name: str,
+        from_date: datetime,
+        to_date: datetime,
+        version: int,
+    ) -> None:
+        """Сохранить статистику, если с момента version модель не менялась"""
+        # Запись успела изменить данные, пока шел запрос: результат мог устареть
+        if self.version(model_name) != version:
+            return
+
+        ttl = self.settled_ttl_seconds
+        if to_date + self.settle > self._now():
+            ttl = self.ttl_seconds
+        expires_at = self._clock() + ttl
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(stats, model_name, from_date, to_date, expires_at)
+        self._keys_by_model.setdefault(model_name, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, model_name: str, timestamps: Iterable[datetime]) -> None:
+        """Вытеснить записи модели, окно которых содержит новые метки"""
+        timestamps = list(timestamps)
+        self._changes += 1
+        self._changed_at[model_name] = self._changes
+
+        for key in list(self._keys_by_model.get(model_name, ())):
+            entry = self._entries[key]
+            if any(entry.from_date <= ts <= entry.to_date for ts in timestamps):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Очистить кэш целиком"""
+        self._changes += 1
+        self._cleared_at = self._changes
+        self._entries.clear()
+        self._keys_by_model.clear()
+
+    def snapshot(self) -> Dict[str, int]:
+        """Счетчики кэша для мониторинга"""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        keys = self._keys_by_model.get(entry.model_name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_model[entry.model_name]
+
+
+stats_cache: Optional[InMemoryStatsCache] = (
+    InMemoryStatsCache(
+        max_entries=settings.stats_cache_max_entries,
+        ttl_seconds=settings.stats_cache_ttl_seconds,
+        settle_seconds=settings.stats_cache_settle_seconds,
+        settled_ttl_seconds=settings.stats_cache_settled_ttl_seconds,
+    )
+    if settings.stats_cache_enabled
+    else None
+)
+
+
+def get_stats_cache() -> Optional[InMemoryStatsCache]:
+    """Получить общий кэш статистики процесса"""
+    return stats_cache
+
+
+def disable_settled_ttl() -> None:
+    """Хранить окна в прошлом не дольше текущих: для нескольких воркеров"""
+    # Запись вытесняет окна только в кэше своего процесса; с коротким TTL
+    # остальные воркеры отдают устаревшую статистику не дольше ttl_seconds
+    if stats_cache is not None:
+        stats_cache.settled_ttl_seconds = stats_cache.ttl_seconds
+
+
+def _read_cache(name: str) -> Callable[[], Optional[int]]:
+    """Читать счетчик общего кэша при экспозиции метрик"""
+    return lambda: None if stats_cache is None else stats_cache.snapshot()[name]
+
+
+CallbackMetric("stats_cache_entries", "Записи в кэше статистики", _read_cache("size"))
+for _name, _help in (
+    ("hits", "Попадания в кэш статистики"),
+    ("misses", "Промахи кэша статистики"),
+    ("evictions", "Вытеснения по размеру кэша"),
+    ("invalidations", "Окна, сброшенные записью логов"),
+):
+    CallbackMetric(
+        f"stats_cache_{_name}_total", _help, _read_cache(_name), kind="counter"
+    )
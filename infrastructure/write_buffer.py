@@ -0,0 +1,222 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from config import settings
+from domain.entities import PredictionLog
+from domain.exceptions import WriteBufferClosedException, WriteBufferFullException
+from domain.repositories import PredictionLogWriteBuffer, PredictionStatsCache
+from infrastructure.database import AsyncSessionLocal
+from infrastructure.repositories import SQLAlchemyPredictionLogRepository
+from infrastructure.stats_cache import get_stats_cache
+from utils.logger import log_error, log_info
+from utils.metrics import CallbackMetric
+
+_QueueItem = Tuple[PredictionLog, Optional[asyncio.Future]]
+
+
+def _fail(items: List[_QueueItem], error: Exception) -> None:
+    """Передать ошибку ожидающим записи логов"""
+    for _, future in items:
+        if future is not None and not future.done():
+            future.set_exception(error)
+
+
+class AsyncPredictionLogWriteBuffer(PredictionLogWriteBuffer):
+    """Буфер отложенной записи: копит логи в очереди и пишет их пачками"""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: int = 500,
+        flush_interval_ms: int = 50,
+        max_queue_size: int = 10000,
+        overflow: str = "reject",
+        block_timeout_ms: int = 1000,
+        ack_mode: str = "accepted",
+        stats_cache: Optional[PredictionStatsCache] = None,
+    ):
+        self.session_factory = session_factory
+        self.stats_cache = stats_cache
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.overflow = overflow
+        self.block_timeout = block_timeout_ms / 1000
+        self.ack_mode = ack_mode
+        self._queue: asyncio.Queue[_QueueItem] = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._closed = True
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли фоновый сброс"""
+        return self._task is not None and not self._closed
+
+    def queue_size(self) -> int:
+        """Логи, ожидающие записи"""
+        return self._queue.qsize()
+
+    async def start(self) -> None:
+        """Запустить фоновую задачу сброса буфера"""
+        if self._task is not None:
+            return
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """Перестать принимать логи, дождаться записи очереди и остановить сброс"""
+        if self._task is None:
+            return
+        self._closed = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            log_error(
+                TimeoutError(f"{self._queue.qsize()} logs were not flushed"),
+                "write_buffer drain",
+            )
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # Не записанные к таймауту логи: ожидающие в режиме durable получают ошибку
+        remaining = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+            self._queue.task_done()
+        _fail(remaining, WriteBufferClosedException("Буфер записи остановлен"))
+
+    async def submit(self, prediction_log: PredictionLog) -> Optional[PredictionLog]:
+        """Поставить лог в очередь на запись"""
+        if self._closed:
+            raise WriteBufferClosedException("Буфер записи остановлен")
+
+        future: Optional[asyncio.Future] = None
+        if self.ack_mode == "durable":
+            future = asyncio.get_running_loop().create_future()
+
+        item = (prediction_log, future)
+        if self.overflow == "block":
+            try:
+                await asyncio.wait_for(self._queue.put(item), self.block_timeout)
+            except asyncio.TimeoutError:
+                raise WriteBufferFullException("Буфер записи переполнен")
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except asyncio.QueueFull:
+                raise WriteBufferFullException("Буфер записи переполнен")
+
+        if future is None:
+            return None
+        return await future
+
+    async def _run(self) -> None:
+        """Собирать пачки по размеру или интервалу и записывать их"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+
+            try:
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(
+                            await asyncio.wait_for(self._queue.get(), timeout)
+                        )
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Пачка уже вынута из очереди: stop ее не увидит
+                _fail(batch, WriteBufferClosedException("Буфер записи остановлен"))
+                for _ in batch:
+                    self._queue.task_done()
+                raise
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[_QueueItem]) -> None:
+        """Записать пачку одним INSERT и разбудить ожидающих"""
+        try:
+            async with self.session_factory() as session:
+                repository = SQLAlchemyPredictionLogRepository(session)
+                created = await repository.create_many([log for log, _ in batch])
+        except asyncio.CancelledError:
+            _fail(batch, WriteBufferClosedException("Буфер записи остановлен"))
+            raise
+        except Exception as e:
+            log_error(e, "write_buffer flush", batch_size=len(batch))
+            _fail(batch, e)
+        else:
+            if self.stats_cache is not None:
+                timestamps: Dict[str, List[datetime]] = {}
+                for prediction_log in created:
+                    timestamps.setdefault(prediction_log.model_name, []).append(
+                        prediction_log.timestamp
+                    )
+                for model_name, model_timestamps in timestamps.items():
+                    self.stats_cache.invalidate(model_name, model_timestamps)
+            for prediction_log, (_, future) in zip(created, batch):
+                if future is not None and not future.done():
+                    future.set_result(prediction_log)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+
+write_buffer: Optional[AsyncPredictionLogWriteBuffer] = None
+
+
+async def start_write_buffer() -> None:
+    """Создать и запустить буфер отложенной записи"""
+    global write_buffer
+    write_buffer = AsyncPredictionLogWriteBuffer(
+        AsyncSessionLocal,
+        batch_size=settings.write_behind_batch_size,
+        flush_interval_ms=settings.write_behind_flush_interval_ms,
+        max_queue_size=settings.write_behind_max_queue_size,
+        overflow=settings.write_behind_overflow,
+        block_timeout_ms=settings.write_behind_block_timeout_ms,
+        ack_mode=settings.write_behind_ack_mode,
+        stats_cache=get_stats_cache(),
+    )
+    await write_buffer.start()
+    log_info(
+        "Write-behind buffer started in %s mode", settings.write_behind_ack_mode
+    )
+
+
+async def stop_write_buffer() -> None:
+    """Дождаться записи буфера и остановить его"""
+    global write_buffer
+    if write_buffer is None:
+        return
+    await write_buffer.stop(timeout=settings.write_behind_drain_timeout_s)
+    write_buffer = None
+    log_info("Write-behind buffer drained")
+
+
+def get_write_buffer() -> Optional[AsyncPredictionLogWriteBuffer]:
+    """Получить запущенный буфер отложенной записи"""
+    return write_buffer
+
+
+CallbackMetric(
+    "write_buffer_queue_size",
+    "Логи в очереди буфера отложенной записи",
+    lambda: None if write_buffer is None else write_buffer.queue_size(),
+)
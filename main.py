@@ -2,17 +2,38 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
 from config import settings
-from infrastructure.database import engine
+from infrastructure.database import (
+    AsyncSessionLocal,
+    dispose_engines,
+    engine,
+    ping_database,
+    pool_status,
+)
+from infrastructure.model_registry import get_model_registry
+from infrastructure.partitions import start_partition_manager, stop_partition_manager
+from infrastructure.retention import start_retention, stop_retention
+from infrastructure.schema_check import find_schema_drift
+from infrastructure.write_buffer import start_write_buffer, stop_write_buffer
 from presentation.controllers import router
+from presentation.middleware import (
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RequestIdMiddleware,
+    profile_sampler,
+)
+from presentation.responses import FastJSONResponse
+from utils.logger import log_error, log_info, log_warning
+from utils.metrics import get_shared_metrics, registry
 
 import asyncio
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Ждем готовности базы данных
-    print("Ожидание готовности базы данных...")
+    log_info("Ожидание готовности базы данных")
     max_retries = 30
     retry_delay = 2
     
@@ -21,23 +42,64 @@ async def lifespan(app: FastAPI):
             from sqlalchemy import text
             async with engine.begin() as conn:
                 await conn.execute(text("SELECT 1"))
-            print(" База данных готова")
+            log_info("База данных готова")
             break
         except Exception as e:
             if attempt < max_retries - 1:
-                print(f"Попытка {attempt + 1}/{max_retries}: База данных еще не готова, ждем {retry_delay}с...")
+                log_info(
+                    "Попытка %s/%s: база данных еще не готова, ждем %sс",
+                    attempt + 1,
+                    max_retries,
+                    retry_delay,
+                )
                 await asyncio.sleep(retry_delay)
             else:
-                print(f"Не удалось подключиться к базе данных после {max_retries} попыток: {e}")
+                log_error(e, f"database connection after {max_retries} attempts")
                 exit(1)
-    
+
+    if settings.schema_drift_check != "off":
+        drift = await find_schema_drift(engine)
+        if drift:
+            message = "Схема БД расходится с моделями: " + ", ".join(drift)
+            if settings.schema_drift_check == "fail":
+                raise RuntimeError(message)
+            log_warning(message)
+
+    # Справочник моделей целиком в кэш, чтобы новый воркер не вставлял имена заново
+    try:
+        async with AsyncSessionLocal() as session:
+            count = await get_model_registry().preload(session)
+        log_info("Model registry preloaded: %s models", count)
+    except Exception as e:
+        log_error(e, "model registry preload", traceback=False)
+
+    if settings.partition_management_enabled:
+        await start_partition_manager()
+    if settings.retention_enabled:
+        await start_retention()
+    if settings.write_behind_enabled:
+        await start_write_buffer()
+    shared_metrics = get_shared_metrics()
+    if shared_metrics is not None:
+        shared_metrics.start()
+
     yield
 
+    # Дописываем накопленные логи перед остановкой
+    await stop_write_buffer()
+    await stop_retention()
+    await stop_partition_manager()
+    await dispose_engines()
+    if shared_metrics is not None:
+        # Итоговые значения воркера мастер перенесет в архив
+        shared_metrics.stop()
+
 app = FastAPI(
     title=settings.app_name,
     description="Микросервис для логирования обращений к ML-моделям",
     version=settings.app_version,
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     debug=settings.debug,
 )
 
@@ -50,6 +112,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+if settings.profiling_enabled or settings.profiling_sample_rate > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        sampler=profile_sampler(),
+        timing=settings.profiling_enabled,
+    )
+# Последним добавленный middleware выполняется первым: id нужен всем остальным
+app.add_middleware(RequestIdMiddleware)
+
 # Подключаем роутеры
 app.include_router(router, prefix="/api/v1", tags=["predictions"])
 
@@ -71,10 +144,30 @@ async def health_check():
 async def readiness_check():
     """Проверка готовности сервиса к работе"""
     try:
-        # Здесь можно добавить проверки подключения к БД и других зависимостей
+        # Запрос идет через пул: проверяем и БД, и наличие свободных соединений
+        await ping_database(settings.db_ready_timeout_s)
         return {"status": "ready"}
     except Exception:
-        return {"status": "not ready"}
+        return JSONResponse(status_code=503, content={"status": "not ready"})
+
+@app.get("/health/pool")
+async def pool_check():
+    """Состояние пула соединений с БД"""
+    return pool_status()
+
+async def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    shared_metrics = get_shared_metrics()
+    if shared_metrics is None:
+        body = registry.render()
+    else:
+        # Сумма по воркерам serve.py: чтение файлов не блокирует event loop
+        body = await asyncio.to_thread(shared_metrics.render)
+    return Response(body, media_type="text/plain; version=0.0.4")
+
+
+if settings.metrics_enabled:
+    app.add_api_route("/metrics", metrics, include_in_schema=False)
 
 
 if __name__ == "__main__":
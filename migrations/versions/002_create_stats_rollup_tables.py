@@ -0,0 +1,64 @@
+"""Create prediction stats rollup tables
+
+Revision ID: 002
+Revises: 001
+Create Date: 2025-07-20 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+ROLLUP_TABLES = {
+    "prediction_stats_minute": "minute",
+    "prediction_stats_hour": "hour",
+    "prediction_stats_day": "day",
+}
+
+
+def upgrade() -> None:
+    for table_name in ROLLUP_TABLES:
+        op.create_table(
+            table_name,
+            sa.Column("model_name", sa.String(), nullable=False),
+            sa.Column("bucket", sa.DateTime(), nullable=False),
+            sa.Column("total_count", sa.BigInteger(), nullable=False),
+            sa.Column("success_count", sa.BigInteger(), nullable=False),
+            sa.Column("duration_sum", sa.BigInteger(), nullable=False),
+            sa.Column("duration_min", sa.Integer(), nullable=False),
+            sa.Column("duration_max", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("model_name", "bucket"),
+        )
+
+    # Заполняем бакеты по уже накопленным данным
+    for table_name, unit in ROLLUP_TABLES.items():
+        op.execute(
+            f"""
+            INSERT INTO {table_name} (
+                model_name, bucket, total_count, success_count,
+                duration_sum, duration_min, duration_max
+            )
+            SELECT
+                model_name,
+                date_trunc('{unit}', timestamp),
+                count(*),
+                sum(CASE WHEN was_successful THEN 1 ELSE 0 END),
+                sum(duration_ms)::bigint,
+                min(duration_ms)::integer,
+                max(duration_ms)::integer
+            FROM prediction_logs
+            GROUP BY model_name, date_trunc('{unit}', timestamp)
+            """
+        )
+
+
+def downgrade() -> None:
+    for table_name in reversed(list(ROLLUP_TABLES)):
+        op.drop_table(table_name)
@@ -0,0 +1,56 @@
+"""Create latency sketch tables
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-07-27 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+SKETCH_TABLES = {
+    "prediction_latency_sketch_hour": "hour",
+    "prediction_latency_sketch_day": "day",
+}
+
+# Должно совпадать с utils.sketch (ZERO_KEY) и SKETCH_RELATIVE_ACCURACY = 0.01
+BIN_EXPRESSION = (
+    "CASE WHEN duration_ms = 0 THEN -2147483648 "
+    "ELSE ceil(ln(duration_ms) / ln(1.01 / 0.99))::integer END"
+)
+
+
+def upgrade() -> None:
+    for table_name in SKETCH_TABLES:
+        op.create_table(
+            table_name,
+            sa.Column("model_name", sa.String(), nullable=False),
+            sa.Column("bucket", sa.DateTime(), nullable=False),
+            sa.Column("bin", sa.Integer(), nullable=False),
+            sa.Column("count", sa.BigInteger(), nullable=False),
+            sa.PrimaryKeyConstraint("model_name", "bucket", "bin"),
+        )
+
+    # Заполняем скетчи по уже накопленным данным
+    for table_name, unit in SKETCH_TABLES.items():
+        op.execute(
+            f"""
+            INSERT INTO {table_name} (model_name, bucket, bin, count)
+            SELECT model_name, date_trunc('{unit}', timestamp), {BIN_EXPRESSION}, count(*)
+            FROM prediction_logs
+            GROUP BY model_name, date_trunc('{unit}', timestamp), {BIN_EXPRESSION}
+            """
+        )
+
+
+def downgrade() -> None:
+    for table_name in reversed(list(SKETCH_TABLES)):
+        op.drop_table(table_name)
@@ -0,0 +1,112 @@
+"""Partition prediction_logs by timestamp range
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-08-03 00:00:00.000000
+
+Интервал секций задается через ``alembic -x partition_interval=day upgrade head``
+(по умолчанию month) и должен совпадать с настройкой PARTITION_INTERVAL.
+
+"""
+
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+# Должно совпадать с infrastructure.partitions (NAME_FORMATS и DEFAULT_PARTITION)
+NAME_FORMATS = {"day": "YYYYMMDD", "month": "YYYYMM"}
+DEFAULT_PARTITION = "prediction_logs_default"
+PREMAKE = 3
+
+
+def upgrade() -> None:
+    interval = context.get_x_argument(as_dictionary=True).get(
+        "partition_interval", "month"
+    )
+    if interval not in NAME_FORMATS:
+        raise ValueError(f"Unsupported partition_interval: {interval}")
+
+    op.execute("ALTER TABLE prediction_logs RENAME TO prediction_logs_legacy")
+    op.execute(
+        "ALTER TABLE prediction_logs_legacy "
+        "RENAME CONSTRAINT prediction_logs_pkey TO prediction_logs_legacy_pkey"
+    )
+    op.execute("DROP INDEX ix_prediction_logs_model_name")
+    op.execute("DROP INDEX ix_prediction_logs_timestamp")
+
+    # Ключ секционирования обязан входить в первичный ключ
+    op.execute(
+        """
+        CREATE TABLE prediction_logs (
+            LIKE prediction_logs_legacy INCLUDING DEFAULTS,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """
+    )
+    # Последовательность id переходит к новой таблице, иначе удалится вместе со старой
+    op.execute("ALTER SEQUENCE prediction_logs_id_seq OWNED BY prediction_logs.id")
+    op.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF prediction_logs DEFAULT")
+
+    # Секции от самой старой записи до PREMAKE интервалов вперед
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            bound timestamp;
+        BEGIN
+            FOR bound IN
+                SELECT generate_series(
+                    date_trunc('{interval}', coalesce(
+                        (SELECT min(timestamp) FROM prediction_logs_legacy),
+                        now() AT TIME ZONE 'UTC'
+                    )),
+                    date_trunc('{interval}', now() AT TIME ZONE 'UTC')
+                        + interval '{PREMAKE} {interval}',
+                    interval '1 {interval}'
+                )
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF prediction_logs FOR VALUES FROM (%L) TO (%L)',
+                    'prediction_logs_p' || to_char(bound, '{NAME_FORMATS[interval]}'),
+                    bound,
+                    bound + interval '1 {interval}'
+                );
+            END LOOP;
+        END $$;
+        """
+    )
+
+    op.execute("INSERT INTO prediction_logs SELECT * FROM prediction_logs_legacy")
+    op.execute("DROP TABLE prediction_logs_legacy")
+
+    op.create_index("ix_prediction_logs_model_name", "prediction_logs", ["model_name"])
+    op.create_index("ix_prediction_logs_timestamp", "prediction_logs", ["timestamp"])
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE prediction_logs RENAME TO prediction_logs_partitioned")
+    op.execute(
+        "ALTER TABLE prediction_logs_partitioned "
+        "RENAME CONSTRAINT prediction_logs_pkey TO prediction_logs_partitioned_pkey"
+    )
+    op.execute("DROP INDEX ix_prediction_logs_model_name")
+    op.execute("DROP INDEX ix_prediction_logs_timestamp")
+
+    op.execute(
+        """
+        CREATE TABLE prediction_logs (
+            LIKE prediction_logs_partitioned INCLUDING DEFAULTS,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE prediction_logs_id_seq OWNED BY prediction_logs.id")
+    op.execute("INSERT INTO prediction_logs SELECT * FROM prediction_logs_partitioned")
+    op.execute("DROP TABLE prediction_logs_partitioned CASCADE")
+
+    op.create_index("ix_prediction_logs_model_name", "prediction_logs", ["model_name"])
+    op.create_index("ix_prediction_logs_timestamp", "prediction_logs", ["timestamp"])
@@ -0,0 +1,67 @@
+"""Add covering index for stats queries
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-08-10 00:00:00.000000
+
+BRIN-индекс по timestamp создается опционально:
+``alembic -x brin=true upgrade head``.
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+COVERING_INDEX = "ix_prediction_logs_model_name_timestamp"
+BRIN_INDEX = "ix_prediction_logs_timestamp_brin"
+
+
+def is_partitioned() -> bool:
+    """Секционирована ли таблица (миграция 004)"""
+    result = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass('prediction_logs')"
+        )
+    )
+    return result.scalar() is not None
+
+
+def upgrade() -> None:
+    # На секционированную таблицу CONCURRENTLY не применим: индекс строится по секциям
+    concurrently = not is_partitioned()
+    with op.get_context().autocommit_block():
+        op.create_index(
+            COVERING_INDEX,
+            "prediction_logs",
+            ["model_name", "timestamp"],
+            postgresql_include=["duration_ms", "was_successful"],
+            postgresql_concurrently=concurrently,
+        )
+        # Составной индекс покрывает поиск по model_name
+        op.drop_index(
+            "ix_prediction_logs_model_name",
+            table_name="prediction_logs",
+            postgresql_concurrently=concurrently,
+        )
+
+    brin = context.get_x_argument(as_dictionary=True).get("brin", "false")
+    if brin.lower() == "true":
+        # Для append-only таблицы: индекс в тысячи раз меньше B-tree по timestamp
+        op.execute(
+            f"CREATE INDEX {BRIN_INDEX} ON prediction_logs "
+            "USING brin (timestamp) WITH (pages_per_range = 32)"
+        )
+
+
+def downgrade() -> None:
+    op.execute(f"DROP INDEX IF EXISTS {BRIN_INDEX}")
+    op.create_index("ix_prediction_logs_model_name", "prediction_logs", ["model_name"])
+    op.drop_index(COVERING_INDEX, table_name="prediction_logs")
@@ -0,0 +1,79 @@
+"""Move model names to the models dimension table
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-08-17 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+OLD_INDEX = "ix_prediction_logs_model_name_timestamp"
+NEW_INDEX = "ix_prediction_logs_model_id_timestamp"
+
+
+def upgrade() -> None:
+    op.create_table(
+        "models",
+        sa.Column("id", sa.SmallInteger(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.UniqueConstraint("name", name="uq_models_name"),
+    )
+    op.execute(
+        "INSERT INTO models (name) "
+        "SELECT DISTINCT model_name FROM prediction_logs ORDER BY model_name"
+    )
+
+    op.add_column("prediction_logs", sa.Column("model_id", sa.SmallInteger()))
+    # Переписывает всю таблицу: на больших объемах запускать в окно обслуживания
+    op.execute(
+        "UPDATE prediction_logs SET model_id = models.id "
+        "FROM models WHERE models.name = prediction_logs.model_name"
+    )
+    op.alter_column("prediction_logs", "model_id", nullable=False)
+    op.create_foreign_key(
+        "fk_prediction_logs_model_id",
+        "prediction_logs",
+        "models",
+        ["model_id"],
+        ["id"],
+    )
+
+    op.drop_index(OLD_INDEX, table_name="prediction_logs")
+    op.create_index(
+        NEW_INDEX,
+        "prediction_logs",
+        ["model_id", "timestamp"],
+        postgresql_include=["duration_ms", "was_successful"],
+    )
+    op.drop_column("prediction_logs", "model_name")
+
+
+def downgrade() -> None:
+    op.add_column("prediction_logs", sa.Column("model_name", sa.String(255)))
+    op.execute(
+        "UPDATE prediction_logs SET model_name = models.name "
+        "FROM models WHERE models.id = prediction_logs.model_id"
+    )
+    op.alter_column("prediction_logs", "model_name", nullable=False)
+
+    op.drop_index(NEW_INDEX, table_name="prediction_logs")
+    op.create_index(
+        OLD_INDEX,
+        "prediction_logs",
+        ["model_name", "timestamp"],
+        postgresql_include=["duration_ms", "was_successful"],
+    )
+    op.drop_constraint(
+        "fk_prediction_logs_model_id", "prediction_logs", type_="foreignkey"
+    )
+    op.drop_column("prediction_logs", "model_id")
+    op.drop_table("models")
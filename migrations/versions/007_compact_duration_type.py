@@ -0,0 +1,43 @@
+"""Store duration_ms as integer to match the models
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-08-24 00:00:00.000000
+
+Миграция 001 создала duration_ms как double precision, хотя модели и API
+работают с целыми миллисекундами. timestamp остается timestamp without
+time zone: метки хранятся в naive UTC и приводятся к нему при разборе запроса.
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Переписывает таблицу и индексы с duration_ms (в том числе покрывающий)
+    op.alter_column(
+        "prediction_logs",
+        "duration_ms",
+        type_=sa.Integer(),
+        existing_type=sa.Float(),
+        existing_nullable=False,
+        postgresql_using="round(duration_ms)::integer",
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "prediction_logs",
+        "duration_ms",
+        type_=sa.Float(),
+        existing_type=sa.Integer(),
+        existing_nullable=False,
+    )
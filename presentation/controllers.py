@@ -1,20 +1,51 @@
-from datetime import datetime
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.bulk_import import aiter_lines
+from application.columnar_export import (
+    COLUMNAR_FORMATS,
+    MEDIA_TYPES,
+    columnar_available,
+)
 from application.schemas import (
+    BulkImportResponse,
+    MultiModelStatsResponse,
+    PredictionLogBatchResponse,
     PredictionLogCreate,
+    PredictionLogPageResponse,
     PredictionLogResponse,
     PredictionStatsResponse,
+    PredictionTimeseriesResponse,
+    UtcDatetime,
+)
+from application.use_cases import (
+    BulkImportPredictionsUseCase,
+    ExportPredictionsUseCase,
+    GetModelsStatsUseCase,
+    GetPredictionStatsUseCase,
+    GetPredictionTimeseriesUseCase,
+    ListPredictionsUseCase,
+    LogPredictionBatchUseCase,
+    LogPredictionUseCase,
+    stats_single_flight,
 )
-from application.use_cases import GetPredictionStatsUseCase, LogPredictionUseCase
+from config import settings
+from domain.dto import PredictionLogFilter
+from domain.exceptions import WriteBufferClosedException, WriteBufferFullException
 from domain.services import PredictionLogService
 from infrastructure.database import get_db_session
 from infrastructure.repositories import SQLAlchemyPredictionLogRepository
-from utils.logger import log_error
+from infrastructure.stats_cache import get_stats_cache
+from infrastructure.write_buffer import get_write_buffer
+from presentation.middleware import ProfiledRoute
+from presentation.responses import FastJSONResponse
+from utils.datetimes import parse_utc
+from utils.logger import log_error, log_info
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 def get_prediction_service(
@@ -22,10 +53,50 @@ def get_prediction_service(
 ) -> PredictionLogService:
     """Dependency для получения сервиса предсказаний"""
     repository = SQLAlchemyPredictionLogRepository(session)
-    return PredictionLogService(repository)
+    return PredictionLogService(
+        repository, write_buffer=get_write_buffer(), stats_cache=get_stats_cache()
+    )
+
 
+def get_prediction_filters(
+    model_name: Optional[str] = Query(None, description="Название модели"),
+    from_date: Optional[UtcDatetime] = Query(None, description="Начало периода"),
+    to_date: Optional[UtcDatetime] = Query(None, description="Конец периода"),
+    was_successful: Optional[bool] = Query(None, description="Успешность"),
+) -> PredictionLogFilter:
+    """Dependency для получения фильтров выборки логов"""
+    return PredictionLogFilter(
+        model_name=model_name,
+        from_date=from_date,
+        to_date=to_date,
+        was_successful=was_successful,
+    )
+
+
+def parse_percentiles(value: Optional[str]) -> list[float]:
+    """Разобрать список перцентилей из строки запроса"""
+    if value is None:
+        # Без скетчей перцентили считаются полным сканированием - только по запросу
+        if not settings.stats_rollups_enabled:
+            return []
+        return list(settings.stats_default_percentiles)
+    try:
+        percentiles = [float(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise HTTPException(400, "Неверный список перцентилей")
+    if not all(0 <= percentile <= 100 for percentile in percentiles):
+        raise HTTPException(400, "Перцентили должны быть в диапазоне от 0 до 100")
+    return percentiles
 
-@router.post("/predict-log", response_model=PredictionLogResponse)
+
+@router.post(
+    "/predict-log",
+    response_model=PredictionLogResponse,
+    responses={
+        202: {"description": "Лог принят буфером отложенной записи"},
+        503: {"description": "Буфер отложенной записи переполнен"},
+    },
+)
 async def log_prediction(
     data: PredictionLogCreate,
     service: PredictionLogService = Depends(get_prediction_service),
@@ -34,15 +105,67 @@ async def log_prediction(
     try:
         use_case = LogPredictionUseCase(service)
         result = await use_case.execute(data)
+        if result is None:
+            return JSONResponse(status_code=202, content={"status": "accepted"})
         return result
+    except (WriteBufferFullException, WriteBufferClosedException) as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
     except ValueError as e:
-        log_error(e, "log_prediction validation")
+        log_error(e, "log_prediction validation", traceback=False)
         raise HTTPException(400, f"Неверные данные запроса {str(e)}")
     except Exception as e:
         log_error(e, "log_prediction")
         raise HTTPException(500, "Внутренняя ошибка сервера")
 
 
+@router.post("/predict-log/batch", response_model=PredictionLogBatchResponse)
+async def log_predictions_batch(
+    items: list[Any] = Body(..., description="Список логов предсказаний"),
+    service: PredictionLogService = Depends(get_prediction_service),
+):
+    """Записать пачку логов предсказаний одним запросом"""
+    if len(items) > settings.batch_max_size:
+        raise HTTPException(
+            413, f"Размер пачки превышает лимит {settings.batch_max_size}"
+        )
+
+    try:
+        use_case = LogPredictionBatchUseCase(service)
+        result = await use_case.execute(items)
+        return result
+    except Exception as e:
+        log_error(e, "log_predictions_batch")
+        raise HTTPException(500, "Внутренняя ошибка сервера")
+
+
+@router.post("/predict-log/import", response_model=BulkImportResponse)
+async def import_predictions(
+    request: Request,
+    format: str = Query(
+        "ndjson", pattern="^(ndjson|csv)$", description="Формат тела: ndjson или csv"
+    ),
+    service: PredictionLogService = Depends(get_prediction_service),
+):
+    """Массово загрузить исторические логи потоком NDJSON/CSV"""
+    try:
+        use_case = BulkImportPredictionsUseCase(
+            service,
+            chunk_size=settings.bulk_import_chunk_size,
+            max_reported_errors=settings.bulk_import_max_reported_errors,
+        )
+        result = await use_case.execute(aiter_lines(request.stream()), format)
+        log_info(
+            "Bulk import: %s accepted, %s rejected, %s rows/s",
+            result.accepted,
+            result.rejected,
+            result.rows_per_second,
+        )
+        return result
+    except Exception as e:
+        log_error(e, "import_predictions")
+        raise HTTPException(500, "Внутренняя ошибка сервера")
+
+
 @router.get("/predictions", response_model=list[PredictionLogResponse])
 async def get_all_predictions(
     service: PredictionLogService = Depends(get_prediction_service),
@@ -50,21 +173,85 @@ async def get_all_predictions(
     """Получить все логи предсказаний"""
     try:
         predictions = await service.get_all_predictions()
-        return [
-            PredictionLogResponse(
-                id=pred.id,
-                model_name=pred.model_name,
-                duration_ms=pred.duration_ms,
-                was_successful=pred.was_successful,
-                timestamp=pred.timestamp,
-            )
-            for pred in predictions
-        ]
+        # Поля сущности совпадают с PredictionLogResponse: сериализуем напрямую,
+        # response_model остается только для схемы OpenAPI
+        return FastJSONResponse(predictions)
     except Exception as e:
         log_error(e, "get_all_predictions")
         raise HTTPException(500, "Внутренняя ошибка сервера")
 
 
+@router.get("/predictions/page", response_model=PredictionLogPageResponse)
+async def get_predictions_page(
+    limit: int = Query(
+        settings.page_default_limit,
+        ge=1,
+        le=settings.page_max_limit,
+        description="Размер страницы",
+    ),
+    after: Optional[str] = Query(None, description="Курсор из next_cursor"),
+    filters: PredictionLogFilter = Depends(get_prediction_filters),
+    service: PredictionLogService = Depends(get_prediction_service),
+):
+    """Получить страницу логов предсказаний по курсору (timestamp, id)"""
+    try:
+        use_case = ListPredictionsUseCase(service)
+        predictions, next_cursor = await use_case.fetch(filters, limit, after)
+        return FastJSONResponse({"items": predictions, "next_cursor": next_cursor})
+    except ValueError as e:
+        log_error(e, "get_predictions_page cursor", traceback=False)
+        raise HTTPException(400, "Неверный курсор")
+    except Exception as e:
+        log_error(e, "get_predictions_page")
+        raise HTTPException(500, "Внутренняя ошибка сервера")
+
+
+@router.get(
+    "/predictions/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {
+                "application/x-ndjson": {},
+                "text/csv": {},
+                MEDIA_TYPES["arrow"]: {},
+                MEDIA_TYPES["parquet"]: {},
+            }
+        },
+    },
+)
+async def export_predictions(
+    format: str = Query(
+        "ndjson",
+        pattern="^(ndjson|csv|arrow|parquet)$",
+        description="Формат: ndjson, csv, arrow (IPC stream) или parquet",
+    ),
+    filters: PredictionLogFilter = Depends(get_prediction_filters),
+    service: PredictionLogService = Depends(get_prediction_service),
+):
+    """Потоково выгрузить логи предсказаний в NDJSON, CSV, Arrow или Parquet"""
+    if format in COLUMNAR_FORMATS:
+        if not columnar_available():
+            raise HTTPException(501, "Формат недоступен: не установлен pyarrow")
+        batch_size = settings.export_columnar_batch_size
+        media_type = MEDIA_TYPES[format]
+    else:
+        batch_size = settings.export_batch_size
+        media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    use_case = ExportPredictionsUseCase(service, batch_size=batch_size)
+
+    async def content():
+        # Статус уже отправлен, поэтому ошибку можно только залогировать
+        try:
+            async for chunk in use_case.execute(filters, format):
+                yield chunk
+        except Exception as e:
+            log_error(e, "export_predictions")
+            raise
+
+    return StreamingResponse(content(), media_type=media_type)
+
+
 @router.get("/predictions/{prediction_id}", response_model=PredictionLogResponse)
 async def get_prediction_by_id(
     prediction_id: int = Path(..., description="ID предсказания"),
@@ -76,13 +263,7 @@ async def get_prediction_by_id(
         if prediction is None:
             raise HTTPException(404, "Предсказание не найдено")
 
-        return PredictionLogResponse(
-            id=prediction.id,
-            model_name=prediction.model_name,
-            duration_ms=prediction.duration_ms,
-            was_successful=prediction.was_successful,
-            timestamp=prediction.timestamp,
-        )
+        return FastJSONResponse(prediction)
     except HTTPException:
         raise
     except Exception as e:
@@ -114,25 +295,131 @@ async def get_stats(
     model_name: str = Query(..., description="Название модели"),
     from_date: str = Query(..., description="Начальная дата (YYYY-MM-DD)"),
     to_date: str = Query(..., description="Конечная дата (YYYY-MM-DD)"),
+    percentiles: Optional[str] = Query(
+        None, description="Перцентили через запятую, например 50,90,99"
+    ),
+    exact: bool = Query(
+        False, description="Точные перцентили по сырым строкам вместо скетчей"
+    ),
     service: PredictionLogService = Depends(get_prediction_service),
 ):
     """Получить статистику предсказаний по модели за период"""
+    requested_percentiles = parse_percentiles(percentiles)
     try:
         # Парсим даты
-        from_dt = datetime.fromisoformat(from_date)
-        to_dt = datetime.fromisoformat(to_date)
-        # Убираем timezone для совместимости с PostgreSQL
-        if from_dt.tzinfo is not None:
-            from_dt = from_dt.replace(tzinfo=None)
-        if to_dt.tzinfo is not None:
-            to_dt = to_dt.replace(tzinfo=None)
-
-        use_case = GetPredictionStatsUseCase(service)
-        result = await use_case.execute(model_name, from_dt, to_dt)
+        from_dt = parse_utc(from_date)
+        to_dt = parse_utc(to_date)
+
+        use_case = GetPredictionStatsUseCase(
+            service,
+            stats_single_flight if settings.stats_single_flight_enabled else None,
+        )
+        result = await use_case.execute(
+            model_name, from_dt, to_dt, requested_percentiles, exact
+        )
         return result
     except ValueError as e:
-        log_error(e, "get_stats date parsing")
+        log_error(e, "get_stats date parsing", traceback=False)
         raise HTTPException(400, "Неверный формат даты")
     except Exception as e:
         log_error(e, "get_stats")
         raise HTTPException(500, "Внутренняя ошибка сервера")
+
+
+@router.get("/stats/cache")
+async def get_stats_cache_metrics():
+    """Получить счетчики кэша статистики"""
+    cache = get_stats_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.snapshot()}
+
+
+@router.get("/stats/timeseries", response_model=PredictionTimeseriesResponse)
+async def get_stats_timeseries(
+    model_name: str = Query(..., description="Название модели"),
+    from_date: str = Query(..., description="Начальная дата (YYYY-MM-DD)"),
+    to_date: str = Query(..., description="Конечная дата (YYYY-MM-DD)"),
+    interval: str = Query(
+        "1h", pattern="^(1m|5m|1h|1d)$", description="Интервал: 1m, 5m, 1h или 1d"
+    ),
+    histogram_bounds: Optional[str] = Query(
+        None, description="Границы гистограммы длительностей через запятую, мс"
+    ),
+    service: PredictionLogService = Depends(get_prediction_service),
+):
+    """Получить статистику предсказаний по интервалам за период"""
+    try:
+        from_dt = parse_utc(from_date)
+        to_dt = parse_utc(to_date)
+        bounds = (
+            [int(bound) for bound in histogram_bounds.split(",") if bound.strip()]
+            if histogram_bounds
+            else []
+        )
+
+        use_case = GetPredictionTimeseriesUseCase(
+            service, max_buckets=settings.timeseries_max_buckets
+        )
+        result = await use_case.execute(model_name, from_dt, to_dt, interval, bounds)
+        return result
+    except ValueError as e:
+        log_error(e, "get_stats_timeseries parameters", traceback=False)
+        raise HTTPException(400, f"Неверные параметры запроса {str(e)}")
+    except Exception as e:
+        log_error(e, "get_stats_timeseries")
+        raise HTTPException(500, "Внутренняя ошибка сервера")
+
+
+@router.get(
+    "/stats/models",
+    response_model=MultiModelStatsResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def get_models_stats(
+    model_names: Optional[list[str]] = Query(
+        None, description="Названия моделей; если не заданы - все модели"
+    ),
+    from_date: str = Query(..., description="Начальная дата (YYYY-MM-DD)"),
+    to_date: str = Query(..., description="Конечная дата (YYYY-MM-DD)"),
+    order_by: Optional[str] = Query(
+        None,
+        pattern="^(volume|error_rate|latency)$",
+        description="Сортировка по убыванию: volume, error_rate или latency",
+    ),
+    top_k: Optional[int] = Query(None, ge=1, description="Сколько моделей вернуть"),
+    format: str = Query(
+        "json", pattern="^(json|ndjson)$", description="json или потоковый ndjson"
+    ),
+    service: PredictionLogService = Depends(get_prediction_service),
+):
+    """Получить статистику по нескольким моделям одним запросом"""
+    try:
+        from_dt = parse_utc(from_date)
+        to_dt = parse_utc(to_date)
+    except ValueError as e:
+        log_error(e, "get_models_stats date parsing", traceback=False)
+        raise HTTPException(400, "Неверный формат даты")
+
+    use_case = GetModelsStatsUseCase(service)
+    if format == "ndjson":
+
+        async def content():
+            # Статус уже отправлен, поэтому ошибку можно только залогировать
+            try:
+                async for chunk in use_case.stream(
+                    model_names, from_dt, to_dt, order_by, top_k
+                ):
+                    yield chunk
+            except Exception as e:
+                log_error(e, "get_models_stats stream")
+                raise
+
+        return StreamingResponse(content(), media_type="application/x-ndjson")
+
+    try:
+        result = await use_case.execute(model_names, from_dt, to_dt, order_by, top_k)
+        return result
+    except Exception as e:
+        log_error(e, "get_models_stats")
+        raise HTTPException(500, "Внутренняя ошибка сервера")
@@ -0,0 +1,215 @@
+import asyncio
+import functools
+import inspect
+import re
+import time
+import uuid
+from typing import Any, Callable
+from urllib.parse import parse_qs
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from utils.logger import log_error, log_info, request_id
+from utils.metrics import Counter, Gauge, Histogram
+from utils.profiling import ProfileSampler, RequestProfile, current_profile
+
+http_requests_total = Counter("http_requests_total", "HTTP-запросы по маршрутам")
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "Длительность HTTP-запроса по маршрутам"
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP-запросы, обрабатываемые сейчас"
+)
+
+UNMATCHED = "unmatched"
+
+
+def route_label(scope: Scope) -> str:
+    """Шаблон маршрута вместо пути: /predictions/{prediction_id}, а не /predictions/1"""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path
+    # Произвольные пути не должны порождать новые ряды метрик
+    return UNMATCHED
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: число, длительность и конкурентность запросов по маршрутам"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            labels = {"method": scope["method"], "route": route_label(scope)}
+            # Для потоковых ответов время включает отправку тела
+            http_request_duration_seconds.observe(
+                time.perf_counter() - started, **labels
+            )
+            http_requests_total.inc(status=str(status), **labels)
+
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_VALID_REQUEST_ID = re.compile(rb"[A-Za-z0-9._:-]{1,128}")
+
+
+class RequestIdMiddleware:
+    """ASGI-middleware: идентификатор запроса для логов и заголовок X-Request-ID.
+
+    Идентификатор от балансировщика или клиента принимается, если он короткий и
+    без спецсимволов, иначе генерируется новый. Через contextvars он доходит до
+    логов репозиториев и журнала медленных запросов.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        value = None
+        for name, header in scope["headers"]:
+            if name == b"x-request-id" and _VALID_REQUEST_ID.fullmatch(header):
+                value = header.decode("ascii")
+                break
+        value = value or uuid.uuid4().hex
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, value)
+            await send(message)
+
+        token = request_id.set(value)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(token)
+
+
+def profiling_requested(scope: Scope) -> bool:
+    """Запрошена ли разбивка времени: заголовок X-Profile или параметр profile"""
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value not in (b"", b"0", b"false")
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", ["0"])[-1] not in ("", "0", "false")
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware: Server-Timing по запросу и выборочный захват cProfile"""
+
+    def __init__(self, app: ASGIApp, sampler: ProfileSampler, timing: bool = True):
+        self.app = app
+        self.sampler = sampler
+        self.timing = timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = (
+            RequestProfile() if self.timing and profiling_requested(scope) else None
+        )
+        route = route_label(scope)
+        profiler = self.sampler.start(route)
+        if profile is None and profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and profile is not None:
+                # Заголовки уходят до тела: потоковая отдача в разбивку не входит
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", profile.server_timing(time.perf_counter())
+                )
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+            if profiler is not None:
+                await self._save(profiler, scope["method"], route)
+
+    async def _save(self, profiler: Any, method: str, route: str) -> None:
+        # Профилировщик привязан к потоку event loop, файл пишется в отдельном
+        self.sampler.stop(profiler)
+        try:
+            path = await asyncio.to_thread(self.sampler.save, profiler, method, route)
+            log_info("Profile of %s %s saved to %s", method, route, path)
+        except Exception as e:
+            log_error(e, "profile capture")
+
+
+def _mark_handler(endpoint: Callable) -> Callable:
+    """Отмечать в профиле запроса начало и конец обработчика"""
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            profile = current_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            profile.handler_started = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.handler_finished = time.perf_counter()
+
+        return wrapper
+
+    @functools.wraps(endpoint)
+    def sync_wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        profile.handler_started = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.handler_finished = time.perf_counter()
+
+    return sync_wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Маршрут, отделяющий в профиле разбор запроса от обработчика и сериализации"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        super().__init__(path, _mark_handler(endpoint), **kwargs)
+
+
+def profile_sampler() -> ProfileSampler:
+    """Выборка cProfile из настроек"""
+    return ProfileSampler(
+        rate=settings.profiling_sample_rate,
+        output_dir=settings.profiling_output_dir,
+        routes=settings.profiling_sample_routes,
+    )
@@ -0,0 +1,20 @@
+import time
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from utils.profiling import current_profile
+from utils.serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, сериализуемый через orjson (stdlib json без него)"""
+
+    def render(self, content: Any) -> bytes:
+        profile = current_profile.get()
+        if profile is None:
+            return dumps(content)
+        started = time.perf_counter()
+        body = dumps(content)
+        profile.add_render(time.perf_counter() - started)
+        return body
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Скрипт для массового импорта исторических логов предсказаний из NDJSON/CSV
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import AsyncIterator
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from application.use_cases import BulkImportPredictionsUseCase  # noqa: E402
+from config import settings  # noqa: E402
+from domain.services import PredictionLogService  # noqa: E402
+from infrastructure.database import AsyncSessionLocal, engine  # noqa: E402
+from infrastructure.repositories import SQLAlchemyPredictionLogRepository  # noqa: E402
+
+
+async def read_lines(path: Path) -> AsyncIterator[str]:
+    """Построчно читать файл, не загружая его целиком"""
+    with path.open(encoding="utf-8", newline="") as file:
+        for line in file:
+            yield line.rstrip("\r\n")
+
+
+async def run_import(path: Path, fmt: str, chunk_size: int) -> int:
+    """Импортировать файл и вывести отчет"""
+    async with AsyncSessionLocal() as session:
+        service = PredictionLogService(SQLAlchemyPredictionLogRepository(session))
+        use_case = BulkImportPredictionsUseCase(
+            service,
+            chunk_size=chunk_size,
+            max_reported_errors=settings.bulk_import_max_reported_errors,
+        )
+        result = await use_case.execute(read_lines(path), fmt)
+    await engine.dispose()
+
+    print(f"Загружено строк: {result.accepted}")
+    print(f"Отклонено строк: {result.rejected}")
+    print(f"Время: {result.elapsed_seconds} с ({result.rows_per_second} строк/с)")
+    for rejected in result.rejected_lines:
+        print(f"  строка {rejected.line}: {rejected.errors}")
+    return 0 if result.rejected == 0 else 2
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Импорт логов предсказаний")
+    parser.add_argument("path", type=Path, help="Путь к файлу NDJSON или CSV")
+    parser.add_argument(
+        "--format",
+        choices=["ndjson", "csv"],
+        help="Формат файла (по умолчанию определяется по расширению)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=settings.bulk_import_chunk_size,
+        help="Количество строк в одной пачке COPY",
+    )
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.suffix.lower() == ".csv" else "ndjson")
+    return asyncio.run(run_import(args.path, fmt, args.chunk_size))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
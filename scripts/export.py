@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Скрипт для выгрузки логов предсказаний в Parquet, Arrow IPC, NDJSON или CSV
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from application.columnar_export import (  # noqa: E402
+    COLUMNAR_FORMATS,
+    columnar_available,
+)
+from application.use_cases import ExportPredictionsUseCase  # noqa: E402
+from config import settings  # noqa: E402
+from domain.dto import PredictionLogFilter  # noqa: E402
+from domain.services import PredictionLogService  # noqa: E402
+from infrastructure.database import AsyncSessionLocal, engine  # noqa: E402
+from infrastructure.repositories import SQLAlchemyPredictionLogRepository  # noqa: E402
+from utils.datetimes import parse_utc  # noqa: E402
+
+
+async def run_export(
+    output: Path, fmt: str, filters: PredictionLogFilter, batch_size: Optional[int]
+) -> int:
+    """Выгрузить логи в файл и вывести отчет"""
+    if fmt in COLUMNAR_FORMATS and not columnar_available():
+        print("Для форматов arrow и parquet нужен pyarrow: pip install pyarrow")
+        return 1
+    if batch_size is None:
+        batch_size = (
+            settings.export_columnar_batch_size
+            if fmt in COLUMNAR_FORMATS
+            else settings.export_batch_size
+        )
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        service = PredictionLogService(SQLAlchemyPredictionLogRepository(session))
+        use_case = ExportPredictionsUseCase(service, batch_size=batch_size)
+        with output.open("wb") as file:
+            async for chunk in use_case.execute(filters, fmt):
+                file.write(chunk)
+    await engine.dispose()
+
+    size_mb = output.stat().st_size / 1024 / 1024
+    print(f"Файл: {output} ({size_mb:.1f} МБ)")
+    print(f"Время: {time.perf_counter() - started:.1f} с")
+    return 0
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Выгрузка логов предсказаний")
+    parser.add_argument("output", type=Path, help="Путь к выходному файлу")
+    parser.add_argument(
+        "--format",
+        choices=["parquet", "arrow", "ndjson", "csv"],
+        default="parquet",
+        help="Формат выгрузки",
+    )
+    parser.add_argument("--model-name", help="Название модели")
+    parser.add_argument("--from-date", type=parse_utc, help="Начало периода (ISO 8601)")
+    parser.add_argument("--to-date", type=parse_utc, help="Конец периода (ISO 8601)")
+    parser.add_argument(
+        "--was-successful",
+        choices=["true", "false"],
+        help="Только успешные или только неуспешные",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, help="Строк в одной пачке курсора и record batch"
+    )
+    args = parser.parse_args()
+
+    filters = PredictionLogFilter(
+        model_name=args.model_name,
+        from_date=args.from_date,
+        to_date=args.to_date,
+        was_successful=(
+            None if args.was_successful is None else args.was_successful == "true"
+        ),
+    )
+    return asyncio.run(run_export(args.output, args.format, filters, args.batch_size))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
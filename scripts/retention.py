@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Скрипт для разовой очистки устаревших логов и агрегатов по политикам хранения
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import Optional
+
+# Добавляем корневую папку проекта в PYTHONPATH
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from infrastructure.database import engine  # noqa: E402
+from infrastructure.retention import create_retention_job  # noqa: E402
+
+
+async def run_retention(
+    dry_run: bool, batch_size: Optional[int], pause_ms: Optional[int]
+) -> int:
+    """Выполнить один проход очистки и вывести отчет"""
+    job = create_retention_job()
+    if batch_size is not None:
+        job.batch_size = batch_size
+    if pause_ms is not None:
+        job.batch_pause = pause_ms / 1000
+
+    report = await job.run(dry_run=dry_run)
+    await engine.dispose()
+
+    if report.skipped:
+        print("Пропущено: очистку сейчас выполняет другой процесс")
+        return 1
+    title = "Будет удалено" if dry_run else "Удалено"
+    for table_name, count in report.deleted.items():
+        print(f"{title} из {table_name}: {count}")
+    for partition in report.dropped_partitions:
+        print(f"Удалена секция: {partition}")
+    print(f"Время: {report.elapsed_seconds} с")
+    return 0
+
+
+def main():
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Очистка устаревших логов")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Только посчитать строки, которые будут удалены",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, help="Строк в одной транзакции удаления"
+    )
+    parser.add_argument(
+        "--pause-ms", type=int, help="Пауза между пачками в миллисекундах"
+    )
+    args = parser.parse_args()
+
+    return asyncio.run(run_retention(args.dry_run, args.batch_size, args.pause_ms))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
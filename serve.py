@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Продакшен-запуск приложения в нескольких процессах uvicorn (pre-fork).
+
+Мастер один раз импортирует приложение и открывает сокет, затем форкает
+воркеров; соединения принимает ядро, распределяя их между процессами.
+Пулы соединений с БД создаются заново в каждом воркере после fork.
+
+    python serve.py --workers 4
+    WORKERS=0 python serve.py              # по числу ядер
+
+SIGTERM/SIGINT - плавная остановка: воркеры перестают принимать соединения,
+дожидаются текущих запросов, дописывают буфер записи и закрывают пулы.
+SIGTTIN/SIGTTOU - добавить или плавно остановить одного воркера.
+"""
+
+import argparse
+import importlib.util
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, Optional, Set
+
+import uvicorn
+
+from config import settings
+from infrastructure.stats_cache import disable_settled_ttl
+from utils.logger import log_error, log_info, log_warning, stop_logging
+from utils.metrics import enable_shared_metrics, get_shared_metrics
+
+# Запас сверх таймаутов запросов и буфера записи до SIGKILL
+SHUTDOWN_MARGIN_S = 5.0
+# Код воркера, не прошедшего startup (БД недоступна, ошибка настроек):
+# перезапуск не поможет, мастер останавливается
+STARTUP_FAILURE = 3
+
+
+def resolve_workers(workers: int) -> int:
+    """Число воркеров; 0 - по числу доступных ядер"""
+    if workers > 0:
+        return workers
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def resolve_implementation(choice: str, fast: str, fallback: str) -> str:
+    """Реализация event loop или HTTP-парсера; auto - быстрая, если установлена"""
+    installed = importlib.util.find_spec(fast) is not None
+    if choice == "auto":
+        return fast if installed else fallback
+    if choice == fast and not installed:
+        raise RuntimeError(f"{fast} is not installed")
+    return choice
+
+
+def server_config(
+    app, host: str, port: int, loop: str, http: str, graceful_timeout: float
+) -> uvicorn.Config:
+    """Настройки uvicorn для воркера"""
+    return uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        loop=resolve_implementation(loop, "uvloop", "asyncio"),
+        http=resolve_implementation(http, "httptools", "h11"),
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keepalive_s,
+        timeout_graceful_shutdown=graceful_timeout,
+        # Логирование уже настроено utils.logger, dictConfig uvicorn его бы сбросил
+        log_config=None,
+        access_log=settings.debug,
+    )
+
+
+class Supervisor:
+    """Мастер-процесс: форкает воркеров, перезапускает упавших, останавливает всех"""
+
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int):
+        self.config = config
+        self.sock = sock
+        self.target = workers
+        # pid -> время запуска
+        self.workers: Dict[int, float] = {}
+        self.retiring: Set[int] = set()
+        self.should_exit = False
+        self.exit_code = 0
+        self.shutdown_timeout = (
+            (config.timeout_graceful_shutdown or 0)
+            + settings.write_behind_drain_timeout_s
+            + SHUTDOWN_MARGIN_S
+        )
+
+    def run(self) -> int:
+        """Запустить воркеров и следить за ними до сигнала остановки"""
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGTTIN, self._handle_scale)
+        signal.signal(signal.SIGTTOU, self._handle_scale)
+        log_info(
+            "Starting %s workers on %s:%s (loop %s, http %s)",
+            self.target,
+            self.config.host,
+            self.config.port,
+            self.config.loop,
+            self.config.http,
+        )
+
+        while not self.should_exit:
+            self.reap()
+            if not self.should_exit:
+                self.scale()
+            time.sleep(0.2)
+
+        self.stop()
+        return self.exit_code
+
+    def _handle_exit(self, signum, frame) -> None:
+        self.should_exit = True
+
+    def _handle_scale(self, signum, frame) -> None:
+        step = 1 if signum == signal.SIGTTIN else -1
+        self.target = max(self.target + step, 1)
+
+    def spawn(self) -> None:
+        """Форкнуть воркера; он обслуживает общий сокет до SIGTERM"""
+        pid = os.fork()
+        if pid == 0:
+            os._exit(self._run_worker())
+        self.workers[pid] = time.monotonic()
+        log_info("Started worker %s", pid)
+
+    def _run_worker(self) -> int:
+        code = 0
+        try:
+            # SIGTERM и SIGINT перехватывает uvicorn, сигналы масштабирования - мастер
+            signal.signal(signal.SIGTTIN, signal.SIG_IGN)
+            signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+            server = uvicorn.Server(self.config)
+            server.run(sockets=[self.sock])
+            if not server.started:
+                code = STARTUP_FAILURE
+        except BaseException as e:
+            log_error(e, "worker")
+            code = 1
+        finally:
+            stop_logging()
+        return code
+
+    def scale(self) -> None:
+        """Довести число работающих воркеров до целевого"""
+        active = [pid for pid in self.workers if pid not in self.retiring]
+        for _ in range(self.target - len(active)):
+            self.spawn()
+        # Останавливаем самых новых: старые уже прогрели пулы и кэши
+        for pid in sorted(active, key=self.workers.get)[self.target :]:
+            log_info("Stopping worker %s", pid)
+            self.retiring.add(pid)
+            self._signal(pid, signal.SIGTERM)
+
+    def reap(self) -> None:
+        """Собрать завершившихся воркеров"""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.workers.pop(pid, None) is None:
+                continue
+            self._archive_metrics(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if pid in self.retiring or self.should_exit:
+                self.retiring.discard(pid)
+                continue
+            if code == STARTUP_FAILURE:
+                log_warning("Worker %s failed to start", pid)
+                self.should_exit = True
+                self.exit_code = code
+                continue
+            log_warning("Worker %s exited with code %s, restarting", pid, code)
+
+    def stop(self) -> None:
+        """Плавно остановить воркеров, по истечении таймаута - принудительно"""
+        log_info("Stopping %s workers", len(self.workers))
+        for pid in self.workers:
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers):
+            log_warning("Worker %s did not stop in time, killing", pid)
+            self._signal(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            self.workers.pop(pid)
+            self._archive_metrics(pid)
+        self.sock.close()
+
+    @staticmethod
+    def _archive_metrics(pid: int) -> None:
+        # Счетчики завершившегося воркера остаются в сумме, gauge - нет
+        shared_metrics = get_shared_metrics()
+        if shared_metrics is not None:
+            shared_metrics.mark_process_dead(pid)
+
+    @staticmethod
+    def _signal(pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+
+def serve(
+    workers: int,
+    host: str,
+    port: int,
+    loop: str,
+    http: str,
+    graceful_timeout: float,
+) -> int:
+    """Импортировать приложение и обслуживать его workers процессами"""
+    # Импорт до fork: воркеры получают готовое приложение, ошибки видны сразу
+    from main import app
+
+    try:
+        config = server_config(app, host, port, loop, http, graceful_timeout)
+    except RuntimeError as e:
+        log_error(e, "server config", traceback=False)
+        return 1
+
+    workers = resolve_workers(workers)
+    if workers == 1:
+        server = uvicorn.Server(config)
+        server.run()
+        return 0 if server.started else STARTUP_FAILURE
+
+    # Кэш статистики у каждого воркера свой и не видит чужих записей
+    disable_settled_ttl()
+    # Метрики тоже свои у каждого воркера: /metrics складывает их через файлы
+    metrics_dir = settings.metrics_multiprocess_dir
+    temporary_dir = None
+    if settings.metrics_enabled:
+        if metrics_dir is None:
+            metrics_dir = temporary_dir = tempfile.mkdtemp(prefix="metrics-")
+        enable_shared_metrics(metrics_dir, settings.metrics_write_interval_s)
+    try:
+        config.load()
+        return Supervisor(config, config.bind_socket(), workers).run()
+    finally:
+        if temporary_dir is not None:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+
+
+def main() -> Optional[int]:
+    """Основная функция"""
+    parser = argparse.ArgumentParser(description="Запуск сервиса в продакшене")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.workers,
+        help="Число процессов, 0 - по числу ядер",
+    )
+    parser.add_argument("--host", default=settings.host)
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument(
+        "--loop", choices=["auto", "uvloop", "asyncio"], default=settings.server_loop
+    )
+    parser.add_argument(
+        "--http", choices=["auto", "httptools", "h11"], default=settings.server_http
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=settings.server_graceful_timeout_s,
+        help="Сколько секунд ждать текущие запросы при остановке",
+    )
+    args = parser.parse_args()
+
+    return serve(
+        args.workers,
+        args.host,
+        args.port,
+        args.loop,
+        args.http,
+        args.graceful_timeout,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,9 @@ import pytest
 from httpx import AsyncClient
 
 from infrastructure.database import engine, get_db_session
+from infrastructure.model_registry import get_model_registry
 from infrastructure.models import Base
+from infrastructure.stats_cache import get_stats_cache
 from main import app
 
 
@@ -30,6 +32,10 @@ def event_loop():
 @pytest.fixture(autouse=True)
 async def setup_database():
     """Настройка тестовой БД"""
+    # Кэши статистики и справочника моделей живут дольше тестовой БД
+    if get_stats_cache() is not None:
+        get_stats_cache().clear()
+    get_model_registry().clear()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield
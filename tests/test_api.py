@@ -1,6 +1,11 @@
+import io
+import json
+
 import pytest
 from httpx import AsyncClient
 
+from config import settings
+
 
 @pytest.mark.asyncio
 async def test_log_prediction_success(client: AsyncClient):
@@ -23,6 +28,38 @@ async def test_log_prediction_success(client: AsyncClient):
     assert "id" in result
 
 
+@pytest.mark.asyncio
+async def test_timestamps_are_normalized_to_utc(client: AsyncClient):
+    """Тест меток времени - смещение переводится в UTC при записи и чтении"""
+    data = {
+        "model_name": "tz_model",
+        "duration_ms": 100,
+        "was_successful": True,
+        "timestamp": "2025-06-05T15:00:00+03:00",
+    }
+    response = await client.post("/api/v1/predict-log", json=data)
+    assert response.status_code == 200
+    assert response.json()["timestamp"] == "2025-06-05T12:00:00"
+
+    params = {
+        "model_name": "tz_model",
+        "from_date": "2025-06-05T13:30:00+02:00",
+        "to_date": "2025-06-05T12:30:00+00:00",
+    }
+    response = await client.get("/api/v1/stats", params=params)
+    assert response.status_code == 200
+    assert response.json()["total_requests"] == 1
+
+    response = await client.get(
+        "/api/v1/predictions/page",
+        params={"model_name": "tz_model", "from_date": "2025-06-05T14:59:00+03:00"},
+    )
+    assert response.status_code == 200
+    assert [item["timestamp"] for item in response.json()["items"]] == [
+        "2025-06-05T12:00:00"
+    ]
+
+
 @pytest.mark.asyncio
 async def test_get_stats_success(client: AsyncClient):
     """Тест GET /stats - получение статистики"""
@@ -62,3 +99,292 @@ async def test_health_check(client: AsyncClient):
 
     assert response.status_code == 200
     assert response.json()["status"] == "healthy"
+
+
+@pytest.mark.asyncio
+async def test_log_predictions_batch(client: AsyncClient):
+    """Тест POST /predict-log/batch - валидные элементы сохраняются, ошибки по индексу"""
+    items = [
+        {
+            "model_name": "apartment_price_v1",
+            "duration_ms": 100,
+            "was_successful": True,
+            "timestamp": "2025-06-05T12:00:00",
+        },
+        {"model_name": "apartment_price_v1", "duration_ms": -1},
+        {
+            "model_name": "apartment_price_v2",
+            "duration_ms": 250,
+            "was_successful": False,
+            "timestamp": "2025-06-05T12:00:01",
+        },
+    ]
+
+    response = await client.post("/api/v1/predict-log/batch", json=items)
+
+    assert response.status_code == 200
+    result = response.json()
+
+    assert [item["model_name"] for item in result["created"]] == [
+        "apartment_price_v1",
+        "apartment_price_v2",
+    ]
+    assert result["created"][0]["id"] < result["created"][1]["id"]
+    assert [error["index"] for error in result["errors"]] == [1]
+
+    predictions = (await client.get("/api/v1/predictions")).json()
+    assert len(predictions) == 2
+
+
+@pytest.mark.asyncio
+async def test_import_predictions_ndjson(client: AsyncClient):
+    """Тест POST /predict-log/import - NDJSON с некорректными строками"""
+    body = "\n".join(
+        [
+            '{"model_name": "m1", "duration_ms": 10, "was_successful": true, "timestamp": "2024-01-01T00:00:00"}',
+            "not json",
+            '{"model_name": "m1", "duration_ms": -5, "was_successful": true}',
+            "",
+            '{"model_name": "m1", "duration_ms": 30, "was_successful": false, "timestamp": "2024-01-01T00:00:01"}',
+        ]
+    )
+
+    response = await client.post(
+        "/api/v1/predict-log/import", params={"format": "ndjson"}, content=body
+    )
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["accepted"] == 2
+    assert result["rejected"] == 2
+    assert [line["line"] for line in result["rejected_lines"]] == [2, 3]
+
+    predictions = (await client.get("/api/v1/predictions")).json()
+    assert sorted(p["duration_ms"] for p in predictions) == [10, 30]
+
+
+@pytest.mark.asyncio
+async def test_import_predictions_csv(client: AsyncClient):
+    """Тест POST /predict-log/import - CSV с заголовком"""
+    body = (
+        "model_name,duration_ms,was_successful,timestamp\n"
+        "m1,10,true,2024-01-01T00:00:00\n"
+        "m1,20,false,\n"
+        "m1,abc,true,2024-01-01T00:00:02\n"
+    )
+
+    response = await client.post(
+        "/api/v1/predict-log/import", params={"format": "csv"}, content=body
+    )
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["accepted"] == 2
+    assert [line["line"] for line in result["rejected_lines"]] == [4]
+
+
+async def seed_predictions(client: AsyncClient, count: int) -> None:
+    """Создать набор логов с возрастающими метками времени"""
+    items = [
+        {
+            "model_name": "apartment_price_v1" if i % 2 == 0 else "other_model",
+            "duration_ms": 100 + i,
+            "was_successful": i % 3 != 0,
+            "timestamp": f"2025-06-05T12:00:{i:02d}",
+        }
+        for i in range(count)
+    ]
+    response = await client.post("/api/v1/predict-log/batch", json=items)
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_get_predictions_page(client: AsyncClient):
+    """Тест GET /predictions/page - обход всех страниц по курсору"""
+    await seed_predictions(client, 10)
+
+    durations = []
+    params = {"model_name": "apartment_price_v1", "limit": 2}
+    while True:
+        response = await client.get("/api/v1/predictions/page", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        durations.extend(item["duration_ms"] for item in page["items"])
+        if page["next_cursor"] is None:
+            break
+        params["after"] = page["next_cursor"]
+
+    assert durations == [100, 102, 104, 106, 108]
+
+    response = await client.get("/api/v1/predictions/page", params={"after": "bad"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_predictions(client: AsyncClient):
+    """Тест GET /predictions/export - потоковая выгрузка NDJSON и CSV"""
+    await seed_predictions(client, 6)
+
+    response = await client.get(
+        "/api/v1/predictions/export", params={"was_successful": "false"}
+    )
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert [json.loads(line)["duration_ms"] for line in lines] == [100, 103]
+
+    response = await client.get("/api/v1/predictions/export", params={"format": "csv"})
+    assert response.status_code == 200
+    rows = response.text.splitlines()
+    assert rows[0] == "id,model_name,duration_ms,was_successful,timestamp"
+    assert len(rows) == 7
+
+
+@pytest.mark.asyncio
+async def test_export_predictions_columnar(client: AsyncClient, monkeypatch):
+    """Тест GET /predictions/export - Arrow IPC и Parquet пачками"""
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(settings, "export_columnar_batch_size", 2)
+    await seed_predictions(client, 10)
+
+    params = {"format": "arrow", "model_name": "apartment_price_v1"}
+    response = await client.get("/api/v1/predictions/export", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    batches = list(pa.ipc.open_stream(response.content))
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    table = pa.Table.from_batches(batches)
+    assert table.column("duration_ms").to_pylist() == [100, 102, 104, 106, 108]
+    assert set(table.column("model_name").to_pylist()) == {"apartment_price_v1"}
+
+    params = {"format": "parquet", "was_successful": "false"}
+    response = await client.get("/api/v1/predictions/export", params=params)
+    assert response.status_code == 200
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column("duration_ms").to_pylist() == [100, 103, 106, 109]
+    assert str(table.schema.field("timestamp").type) == "timestamp[us, tz=UTC]"
+
+
+@pytest.mark.asyncio
+async def test_get_stats_percentiles(client: AsyncClient):
+    """Тест GET /stats - перцентили и min/max длительности"""
+    await seed_predictions(client, 10)
+
+    params = {
+        "model_name": "apartment_price_v1",
+        "from_date": "2025-06-05",
+        "to_date": "2025-06-06",
+        "percentiles": "50,100",
+    }
+    response = await client.get("/api/v1/stats", params=params)
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["min_duration_ms"] == 100
+    assert result["max_duration_ms"] == 108
+    assert result["percentiles"]["p100"] == 108
+
+    response = await client.get("/api/v1/stats", params={**params, "exact": "true"})
+    assert response.json()["percentiles"] == {"p50": 104.0, "p100": 108.0}
+
+    response = await client.get("/api/v1/stats", params={**params, "percentiles": "x"})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_stats_default_percentiles_need_rollups(
+    client: AsyncClient, monkeypatch
+):
+    """Тест GET /stats - без агрегатов перцентили по умолчанию не считаются"""
+    await seed_predictions(client, 10)
+    params = {
+        "model_name": "apartment_price_v1",
+        "from_date": "2025-06-05",
+        "to_date": "2025-06-06",
+    }
+
+    response = await client.get("/api/v1/stats", params=params)
+    assert set(response.json()["percentiles"]) == {"p50", "p90", "p95", "p99"}
+
+    monkeypatch.setattr(settings, "stats_rollups_enabled", False)
+    response = await client.get("/api/v1/stats", params=params)
+    assert response.status_code == 200
+    assert response.json()["total_requests"] == 5
+    assert response.json()["percentiles"] == {}
+
+    response = await client.get("/api/v1/stats", params={**params, "percentiles": "50"})
+    assert response.json()["percentiles"] == {"p50": 104.0}
+
+
+@pytest.mark.asyncio
+async def test_get_stats_timeseries(client: AsyncClient):
+    """Тест GET /stats/timeseries - интервалы и гистограмма одним запросом"""
+    items = [
+        {
+            "model_name": "apartment_price_v1",
+            "duration_ms": duration,
+            "was_successful": duration < 300,
+            "timestamp": timestamp,
+        }
+        for duration, timestamp in [
+            (50, "2025-06-05T12:01:10"),
+            (150, "2025-06-05T12:04:59"),
+            (400, "2025-06-05T12:05:00"),
+            (120, "2025-06-05T13:30:00"),
+        ]
+    ]
+    await client.post("/api/v1/predict-log/batch", json=items)
+
+    params = {
+        "model_name": "apartment_price_v1",
+        "from_date": "2025-06-05",
+        "to_date": "2025-06-06",
+        "interval": "5m",
+        "histogram_bounds": "100,300",
+    }
+    response = await client.get("/api/v1/stats/timeseries", params=params)
+
+    assert response.status_code == 200
+    buckets = response.json()["buckets"]
+    assert [b["bucket_start"] for b in buckets] == [
+        "2025-06-05T12:00:00",
+        "2025-06-05T12:05:00",
+        "2025-06-05T13:30:00",
+    ]
+    assert [b["total_requests"] for b in buckets] == [2, 1, 1]
+    assert buckets[0]["average_duration_ms"] == 100.0
+    assert [b["histogram"] for b in buckets] == [[1, 1, 0], [0, 0, 1], [0, 1, 0]]
+
+    response = await client.get(
+        "/api/v1/stats/timeseries", params={**params, "interval": "1m", "to_date": "2040-01-01"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_models_stats(client: AsyncClient):
+    """Тест GET /stats/models - сводка по моделям, top-K и потоковый режим"""
+    await seed_predictions(client, 10)
+    params = {"from_date": "2025-06-05", "to_date": "2025-06-06"}
+
+    response = await client.get("/api/v1/stats/models", params=params)
+    assert response.status_code == 200
+    models = response.json()["models"]
+    assert [m["model_name"] for m in models] == ["apartment_price_v1", "other_model"]
+    assert [m["total_requests"] for m in models] == [5, 5]
+
+    response = await client.get(
+        "/api/v1/stats/models",
+        params={**params, "order_by": "latency", "top_k": 1},
+    )
+    assert [m["model_name"] for m in response.json()["models"]] == ["other_model"]
+
+    response = await client.get(
+        "/api/v1/stats/models",
+        params={**params, "model_names": ["other_model"], "format": "ndjson"},
+    )
+    lines = response.text.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["average_duration_ms"] == 105.0
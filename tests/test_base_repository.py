@@ -0,0 +1,83 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, event, update
+from sqlalchemy.dialects import postgresql
+
+from domain.entities import PredictionLog
+from infrastructure.database import AsyncSessionLocal, engine
+from infrastructure.models import PredictionLogModel
+from infrastructure.repositories import SQLAlchemyPredictionLogRepository
+
+
+@contextmanager
+def count_statements():
+    """Считать запросы к БД (round trip на каждый execute курсора)"""
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def make_log(duration_ms: int = 100) -> PredictionLog:
+    return PredictionLog(
+        model_name="m1",
+        duration_ms=duration_ms,
+        was_successful=True,
+        timestamp=datetime(2025, 6, 5, 12, 0, 0),
+    )
+
+
+@pytest.mark.asyncio
+async def test_create_update_delete_take_one_round_trip():
+    """Тест записи - create, update и delete выполняют по одному запросу"""
+    async with AsyncSessionLocal() as session:
+        repository = SQLAlchemyPredictionLogRepository(session, use_rollups=False)
+        # Ключ модели попадает в кэш справочника
+        await repository.create(make_log())
+
+        with count_statements() as statements:
+            created = await repository.create(make_log(200))
+        assert len(statements) == 1 and "RETURNING" in statements[0]
+        assert created.id is not None and created.duration_ms == 200
+
+        created.duration_ms = 300
+        created.timestamp += timedelta(minutes=1)
+        with count_statements() as statements:
+            updated = await repository.update(created)
+        assert len(statements) == 1 and statements[0].startswith("UPDATE")
+        assert updated == created
+        stored = await repository.get_by_id(created.id)
+        assert (stored.duration_ms, stored.timestamp) == (300, created.timestamp)
+
+        with count_statements() as statements:
+            assert await repository.delete(created.id) is True
+        assert len(statements) == 1 and statements[0].startswith("DELETE")
+        assert await repository.get_by_id(created.id) is None
+
+        assert await repository.delete(created.id) is False
+        with pytest.raises(ValueError):
+            await repository.update(created)
+
+
+def test_previous_state_is_read_in_the_same_statement():
+    """Тест PostgreSQL - прежнее состояние для агрегатов читается в том же запросе"""
+    repository = SQLAlchemyPredictionLogRepository(None, use_rollups=True)
+    table = PredictionLogModel.__table__
+    for statement in (update(table).values(duration_ms=1), delete(table)):
+        sql = str(
+            repository._returning_previous(statement, 1).compile(
+                dialect=postgresql.dialect()
+            )
+        )
+        assert sql.startswith("WITH previous AS MATERIALIZED")
+        assert "FOR UPDATE OF prediction_logs" in sql
+        assert "prediction_logs.timestamp = previous.timestamp" in sql
+        assert "RETURNING previous.id, previous.model_name" in sql
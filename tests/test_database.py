@@ -0,0 +1,73 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import main
+from infrastructure.database import (
+    InstrumentedAsyncAdaptedQueuePool,
+    engine_options,
+    pool_wait_seconds,
+)
+
+
+def test_engine_options_from_settings():
+    """Тест параметров движка - пул настраивается только для PostgreSQL"""
+    options = engine_options("postgresql+asyncpg://user:pass@db/ml_logging_db")
+
+    assert options["echo"] is False
+    assert options["poolclass"] is InstrumentedAsyncAdaptedQueuePool
+    assert options["pool_pre_ping"] is True
+    assert "statement_cache_size" in options["connect_args"]
+    assert "pool_size" not in engine_options("sqlite+aiosqlite:///:memory:")
+
+
+@pytest.mark.asyncio
+async def test_pool_records_wait_and_timeouts(tmp_path):
+    """Тест пула - ожидание соединения и таймауты попадают в метрики"""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    waits_before = pool_wait_seconds.count
+    timeouts_before = InstrumentedAsyncAdaptedQueuePool.timeouts
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+        assert engine.sync_engine.pool.checkedout() == 1
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect():
+                pass
+
+    await engine.dispose()
+    assert pool_wait_seconds.count - waits_before == 2
+    assert InstrumentedAsyncAdaptedQueuePool.timeouts - timeouts_before == 1
+
+
+@pytest.mark.asyncio
+async def test_ready_pings_database(client: AsyncClient, monkeypatch):
+    """Тест GET /ready - 200 при доступной БД и 503 при недоступной"""
+    response = await client.get("/ready")
+    assert response.status_code == 200
+
+    async def broken_ping(timeout):
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(main, "ping_database", broken_ping)
+    response = await client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "not ready"
+
+
+@pytest.mark.asyncio
+async def test_pool_status(client: AsyncClient):
+    """Тест GET /health/pool - гистограммы ожидания и подключения"""
+    response = await client.get("/health/pool")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert "+Inf" in data["wait_seconds"]["buckets"]
+    assert data["connect_seconds"]["count"] >= 1
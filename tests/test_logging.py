@@ -0,0 +1,114 @@
+import json
+import logging
+import queue
+
+import pytest
+from httpx import AsyncClient
+
+from utils.logger import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    RequestIdFilter,
+    log_records_dropped,
+    request_id,
+)
+
+
+def make_record(msg: str = "Created partition %s", args=("p1",), **extra):
+    record = logging.makeLogRecord(
+        {"name": "app", "levelno": logging.INFO, "levelname": "INFO", **extra}
+    )
+    record.msg, record.args = msg, args
+    return record
+
+
+def test_json_formatter_fields_and_request_id():
+    """Тест формата - JSON с полями записи, идентификатором запроса и трейсбеком"""
+    try:
+        raise ValueError("boom")
+    except ValueError as e:
+        record = make_record(
+            exc_info=(type(e), e, e.__traceback__),
+            context="flush",
+            batch_size=3,
+            dedup_key=("x",),
+        )
+    token = request_id.set("req-1")
+    try:
+        RequestIdFilter().filter(record)
+    finally:
+        request_id.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Created partition p1"
+    assert entry["request_id"] == "req-1"
+    assert entry["batch_size"] == 3
+    assert "ValueError: boom" in entry["exception"]
+    assert "dedup_key" not in entry
+
+
+def test_rate_limit_filter_reports_suppressed():
+    """Тест лимита - повторы подавляются, следующая запись сообщает их число"""
+    now = [0.0]
+    limiter = RateLimitFilter(burst=2, window_seconds=60, clock=lambda: now[0])
+
+    warning = {"levelno": logging.WARNING, "levelname": "WARNING"}
+    passed = [limiter.filter(make_record(args=(i,), **warning)) for i in range(5)]
+    other = limiter.filter(make_record("Dropped partition %s", **warning))
+    now[0] = 61.0
+    record = make_record(args=(5,), **warning)
+
+    assert passed == [True, True, False, False, False]
+    assert other is True
+    assert limiter.filter(record) is True
+    assert record.suppressed == 3
+
+
+def test_rate_limit_filter_passes_info_and_access_log():
+    """Тест лимита - повторы INFO и строк журнала доступа не подавляются"""
+    limiter = RateLimitFilter(burst=2, window_seconds=60)
+    access = {"name": "uvicorn.access"}
+    access_error = {**access, "levelno": logging.ERROR, "levelname": "ERROR"}
+
+    assert all(limiter.filter(make_record(args=(i,))) for i in range(20))
+    assert all(
+        limiter.filter(make_record('%s - "%s %s"', ("ip", "GET", "/"), **access))
+        for _ in range(20)
+    )
+    assert all(limiter.filter(make_record("x", (), **access_error)) for _ in range(5))
+    deduplicated = [limiter.filter(make_record(dedup_key=("k",))) for _ in range(3)]
+    assert deduplicated == [True, True, False]
+
+
+def test_queue_handler_drops_instead_of_blocking():
+    """Тест очереди - при переполнении запись отбрасывается без ожидания"""
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    dropped_before = log_records_dropped.value()
+
+    handler.handle(make_record())
+    handler.handle(make_record())
+
+    assert handler.queue.get_nowait().msg == "Created partition p1"
+    assert log_records_dropped.value() == dropped_before + 1
+
+
+@pytest.mark.asyncio
+async def test_request_id_propagates_to_logs(client: AsyncClient, caplog):
+    """Тест X-Request-ID - принимается от клиента и попадает в логи запроса"""
+    caplog.handler.addFilter(RequestIdFilter())
+
+    with caplog.at_level(logging.ERROR):
+        response = await client.get(
+            "/api/v1/predictions/page",
+            params={"after": "broken"},
+            headers={"X-Request-ID": "abc-123"},
+        )
+    generated = await client.get("/health", headers={"X-Request-ID": "bad id\n"})
+
+    assert response.headers["x-request-id"] == "abc-123"
+    errors = [r for r in caplog.records if r.name == "utils.logger"]
+    assert [r.request_id for r in errors] == ["abc-123"]
+    assert errors[0].exc_info is None
+    assert len(generated.headers["x-request-id"]) == 32
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+from httpx import AsyncClient
+
+from config import settings
+from infrastructure.instrumentation import db_query_seconds, prediction_logs_ingested
+from utils.metrics import Counter, Gauge, Histogram, MetricsDirectory, Registry
+
+
+def test_render_prometheus_text_format():
+    """Тест экспозиции - бакеты кумулятивные, значения меток экранируются"""
+    registry = Registry()
+    histogram = Histogram(
+        "op_seconds", "Длительность", buckets=(0.1, 1.0), registry=registry
+    )
+    counter = Counter("events_total", "События", registry=registry)
+    histogram.observe(0.05, operation="get")
+    histogram.observe(0.5, operation="get")
+    counter.inc(route='/a"b')
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE op_seconds histogram" in lines
+    assert 'op_seconds_bucket{operation="get",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{operation="get",le="+Inf"} 2' in lines
+    assert 'op_seconds_count{operation="get"} 2' in lines
+    assert 'events_total{route="/a\\"b"} 1' in lines
+    with pytest.raises(ValueError):
+        Counter("events_total", "Дубликат", registry=registry)
+
+
+def test_metrics_directory_sums_workers(tmp_path):
+    """Тест общего каталога - сумма по процессам, счетчики ушедших остаются"""
+    registry = Registry()
+    counter = Counter("events_total", "События", registry=registry)
+    gauge = Gauge("in_flight", "В работе", registry=registry)
+    histogram = Histogram("op_seconds", "Длительность", (1.0,), registry=registry)
+    directory = MetricsDirectory(str(tmp_path), registry=registry)
+    directory.clear()
+
+    pid = os.fork()
+    if pid == 0:
+        counter.inc(2)
+        gauge.set(5)
+        histogram.observe(0.5)
+        directory.write()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    counter.inc(1)
+    gauge.set(1)
+    histogram.observe(2.0)
+
+    lines = directory.render().splitlines()
+    assert "events_total 3" in lines
+    assert "in_flight 6" in lines
+    assert 'op_seconds_bucket{le="1"} 1' in lines
+    assert 'op_seconds_bucket{le="+Inf"} 2' in lines
+
+    directory.mark_process_dead(pid)
+    lines = directory.render().splitlines()
+    assert "events_total 3" in lines
+    assert "in_flight 1" in lines
+    assert "op_seconds_count 2" in lines
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client: AsyncClient, monkeypatch):
+    """Тест /metrics - маршруты по шаблону, запросы по методам репозитория"""
+    monkeypatch.setattr(settings, "metrics_model_labels", ["allowed_model"])
+    queries_before = db_query_seconds.snapshot(operation="get_by_id")["count"]
+    ingested_before = prediction_logs_ingested.value(model="allowed_model")
+    other_before = prediction_logs_ingested.value(model="other")
+
+    for model_name in ("allowed_model", "client_supplied_name"):
+        response = await client.post(
+            "/api/v1/predict-log",
+            json={"model_name": model_name, "duration_ms": 10, "was_successful": True},
+        )
+        assert response.status_code == 200
+    await client.get(f"/api/v1/predictions/{response.json()['id']}")
+    await client.get("/no/such/path")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'route="/api/v1/predictions/{prediction_id}",status="200"' in body
+    assert 'route="unmatched",status="404"' in body
+    assert "client_supplied_name" not in body
+    assert db_query_seconds.snapshot(operation="get_by_id")["count"] > queries_before
+    assert prediction_logs_ingested.value(model="allowed_model") == ingested_before + 1
+    assert prediction_logs_ingested.value(model="other") == other_before + 1
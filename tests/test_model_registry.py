@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, func, select
+
+from domain.entities import PredictionLog
+from infrastructure.database import AsyncSessionLocal, engine
+from infrastructure.model_registry import ModelRegistry, get_model_registry
+from infrastructure.models import ModelNameModel, PredictionLogModel
+from infrastructure.repositories import SQLAlchemyPredictionLogRepository
+
+
+def make_log(model_name: str) -> PredictionLog:
+    return PredictionLog(
+        model_name=model_name,
+        duration_ms=100,
+        was_successful=True,
+        timestamp=datetime(2025, 6, 5, 12, 0, 0),
+    )
+
+
+@pytest.mark.asyncio
+async def test_logs_reference_models_dimension():
+    """Тест записи - имена хранятся один раз в справочнике models"""
+    async with AsyncSessionLocal() as session:
+        repository = SQLAlchemyPredictionLogRepository(session)
+        await repository.create_many([make_log("a"), make_log("b"), make_log("a")])
+        created = await repository.create(make_log("a"))
+
+        names = (await session.scalars(select(ModelNameModel.name))).all()
+        assert sorted(names) == ["a", "b"]
+
+        model_id = get_model_registry().get("a")
+        assert model_id is not None
+        count = await session.scalar(
+            select(func.count()).where(PredictionLogModel.model_id == model_id)
+        )
+        assert count == 3
+        assert created.model_name == "a"
+        assert (await repository.get_by_id(created.id)).model_name == "a"
+
+
+@pytest.mark.asyncio
+async def test_registry_caches_only_committed_ids():
+    """Тест кэша - ключи из откаченной транзакции не кэшируются"""
+    registry = get_model_registry()
+    async with AsyncSessionLocal() as session:
+        resolved = await registry.resolve(session, ["new_model"])
+        assert "new_model" in resolved
+        assert registry.get("new_model") is None
+        await session.rollback()
+
+    assert registry.get("new_model") is None
+    async with AsyncSessionLocal() as session:
+        count = await session.scalar(select(func.count()).select_from(ModelNameModel))
+        assert count == 0
+
+        resolved = await registry.resolve(session, ["new_model"])
+        await session.commit()
+    assert registry.get("new_model") == resolved["new_model"]
+
+
+@pytest.mark.asyncio
+async def test_fresh_registry_resolves_existing_names_without_insert():
+    """Тест холодного кэша - существующие имена только читаются, без INSERT"""
+    async with AsyncSessionLocal() as session:
+        created = await get_model_registry().resolve(session, ["a", "b"])
+        await session.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        registry = ModelRegistry()
+        async with AsyncSessionLocal() as session:
+            assert await registry.resolve(session, ["a", "b"]) == created
+            await session.rollback()
+        assert registry.get("a") == created["a"]
+
+        preloaded = ModelRegistry()
+        async with AsyncSessionLocal() as session:
+            assert await preloaded.preload(session) == 2
+            assert await preloaded.resolve(session, ["b"]) == {"b": created["b"]}
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    assert not [s for s in statements if s.lstrip().upper().startswith("INSERT")]
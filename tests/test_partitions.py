@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pytest
+
+from infrastructure.database import engine
+from infrastructure.partitions import (
+    Partition,
+    PartitionManager,
+    partition_for,
+    plan_partitions,
+)
+
+
+def test_partition_for_month_and_day():
+    """Тест границ секций - метка попадает в полуинтервал [start, end)"""
+    ts = datetime(2025, 12, 31, 23, 59, 59, 999999)
+
+    assert partition_for(ts, "month") == Partition(
+        "prediction_logs_p202512", datetime(2025, 12, 1), datetime(2026, 1, 1)
+    )
+    assert partition_for(ts, "day") == Partition(
+        "prediction_logs_p20251231", datetime(2025, 12, 31), datetime(2026, 1, 1)
+    )
+
+
+def test_plan_partitions_premakes_future_ranges():
+    """Тест плана секций - текущая и следующие идут подряд без разрывов"""
+    plan = plan_partitions(datetime(2025, 11, 15, 8, 0, 0), "month", premake=3)
+
+    assert [partition.name for partition in plan] == [
+        "prediction_logs_p202511",
+        "prediction_logs_p202512",
+        "prediction_logs_p202601",
+        "prediction_logs_p202602",
+    ]
+    assert all(a.end == b.start for a, b in zip(plan, plan[1:]))
+
+
+@pytest.mark.asyncio
+async def test_manager_skips_unpartitioned_table():
+    """Тест менеджера - без секционированной таблицы ничего не создается"""
+    manager = PartitionManager(engine, interval="day")
+
+    assert await manager.ensure_partitions() == []
+    assert await manager.list_partitions() == []
+
+
+def test_manager_rejects_unknown_interval():
+    """Тест менеджера - неизвестный интервал секционирования"""
+    with pytest.raises(ValueError):
+        PartitionManager(engine, interval="week")
@@ -0,0 +1,67 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from config import settings
+from infrastructure.instrumentation import parameters_shape
+from presentation.controllers import router
+from presentation.middleware import ProfilingMiddleware
+from utils.profiling import ProfileSampler, RequestProfile
+
+
+def test_request_profile_phases():
+    """Тест разбивки - БД и сериализация в обработчике вычитаются из use case"""
+    profile = RequestProfile(started=10.0)
+    profile.handler_started = 10.002
+    profile.add_query(0.003)
+    profile.add_render(0.001)
+    profile.handler_finished = 10.010
+
+    phases = profile.phases(now=10.011)
+
+    assert phases["validation"] == pytest.approx(2)
+    assert phases["use_case"] == pytest.approx(4)
+    assert phases["db"] == pytest.approx(3)
+    assert phases["serialization"] == pytest.approx(2)
+    assert phases["total"] == pytest.approx(11)
+    assert 'db;dur=3.00;desc="1 queries"' in profile.server_timing(now=10.011)
+
+
+def test_parameters_shape_hides_values():
+    """Тест журнала медленных запросов - только типы и число строк"""
+    assert parameters_shape(("secret", 1)) == "(str, int)"
+    assert parameters_shape({"name": "secret"}) == "{name: str}"
+    assert parameters_shape([("a", 1), ("b", 2)], executemany=True) == "2 x (str, int)"
+
+
+@pytest.mark.asyncio
+async def test_profiling_middleware(tmp_path, monkeypatch, caplog):
+    """Тест профилирования - Server-Timing по флагу, cProfile, медленные запросы"""
+    monkeypatch.setattr(settings, "slow_query_threshold_ms", 0.0)
+    app = FastAPI()
+    app.include_router(router, prefix="/api/v1")
+    sampler = ProfileSampler(rate=1.0, output_dir=tmp_path, routes=["/api/v1/stats"])
+    app.add_middleware(ProfilingMiddleware, sampler=sampler)
+    params = {
+        "model_name": "apartment_price_v1",
+        "from_date": "2025-06-01T00:00:00",
+        "to_date": "2025-06-30T00:00:00",
+    }
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        with caplog.at_level(logging.WARNING):
+            response = await client.get(
+                "/api/v1/stats", params={**params, "profile": 1}
+            )
+        plain = await client.get("/api/v1/predictions")
+
+    assert response.status_code == 200
+    timing = response.headers["server-timing"].split(", ")
+    phases = [item.split(";")[0] for item in timing]
+    assert phases == ["validation", "use_case", "db", "serialization", "total"]
+    assert "server-timing" not in plain.headers
+    assert len(list(tmp_path.glob("GET_api_v1_stats_*.prof"))) == 1
+    assert "Slow query in get_stats" in caplog.text
+    assert "apartment_price_v1" not in caplog.text
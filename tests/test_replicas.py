@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from domain.entities import PredictionLog
+from infrastructure.database import create_session_factory
+from infrastructure.models import Base
+from infrastructure.replicas import ReplicaSet
+from infrastructure.repositories import SQLAlchemyPredictionLogRepository
+
+
+def make_log(model_name: str) -> PredictionLog:
+    return PredictionLog(
+        model_name=model_name,
+        duration_ms=100,
+        was_successful=True,
+        timestamp=datetime(2025, 6, 1, 12, 0, 0),
+    )
+
+
+@pytest.fixture
+async def databases(tmp_path):
+    """Основная БД и две реплики в отдельных файлах SQLite"""
+    engines = [
+        create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        for name in ("primary", "replica1", "replica2")
+    ]
+    for engine in engines:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        # Метка в каждой БД показывает, откуда пришло чтение
+        factory = create_session_factory(engine)
+        async with factory() as session:
+            await SQLAlchemyPredictionLogRepository(session, use_rollups=False).create(
+                make_log(str(engine.url.database).rsplit("/", 1)[-1])
+            )
+    yield engines
+    for engine in engines:
+        await engine.dispose()
+
+
+async def read_source(factory) -> str:
+    async with factory() as session:
+        repository = SQLAlchemyPredictionLogRepository(session, use_rollups=False)
+        return (await repository.get_by_id(1)).model_name
+
+
+@pytest.mark.asyncio
+async def test_reads_round_robin_over_replicas(databases):
+    """Тест чтения - запросы по очереди идут на реплики, не на основную БД"""
+    primary, *replica_engines = databases
+    factory = create_session_factory(primary, ReplicaSet(replica_engines))
+
+    sources = [await read_source(factory) for _ in range(4)]
+
+    assert sources == ["replica1.db", "replica2.db", "replica1.db", "replica2.db"]
+
+
+@pytest.mark.asyncio
+async def test_reads_after_write_stick_to_primary(databases):
+    """Тест read-your-writes - после записи сессия читает с основной БД"""
+    primary, *replica_engines = databases
+    factory = create_session_factory(primary, ReplicaSet(replica_engines))
+
+    async with factory() as session:
+        repository = SQLAlchemyPredictionLogRepository(session, use_rollups=False)
+        created = await repository.create(make_log("fresh"))
+
+        assert (await repository.get_by_id(created.id)).model_name == "fresh"
+        assert (await repository.get_by_id(1)).model_name == "primary.db"
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_replica_falls_back_to_primary(databases, tmp_path):
+    """Тест недоступной реплики - чтение повторяется на основной БД"""
+    primary = databases[0]
+    broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db")
+    replicas = ReplicaSet([broken], retry_after_s=60)
+    factory = create_session_factory(primary, replicas)
+
+    assert await read_source(factory) == "primary.db"
+    assert not replicas.is_healthy(broken)
+    assert await read_source(factory) == "primary.db"
+    await broken.dispose()
+
+
+def test_least_connections_prefers_idle_replica(databases):
+    """Тест стратегии least_connections - выбирается реплика с меньшей нагрузкой"""
+    _, busy, idle = databases
+    busy.sync_engine.pool.checkedout = lambda: 3
+    replicas = ReplicaSet([busy, idle], strategy="least_connections")
+
+    assert replicas.choose() is idle
@@ -0,0 +1,146 @@
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from domain.dto import RetentionPolicy
+from domain.entities import PredictionLog
+from infrastructure.database import AsyncSessionLocal, engine
+from infrastructure.models import (
+    PredictionLogModel,
+    PredictionStatsHourModel,
+    PredictionStatsMinuteModel,
+)
+from infrastructure.repositories import SQLAlchemyPredictionLogRepository
+from infrastructure.retention import (
+    RetentionJob,
+    retention_rows_deleted,
+    subtract_months,
+)
+
+NOW = datetime(2025, 6, 30, 12, 0, 0)
+
+
+async def seed() -> None:
+    """Логи двух моделей: раз в 6 часов за последние 60 дней"""
+    logs = [
+        PredictionLog(
+            model_name=model_name,
+            duration_ms=10 + hours,
+            was_successful=True,
+            timestamp=NOW - timedelta(hours=hours),
+        )
+        for model_name in ("m1", "m2")
+        for hours in range(0, 24 * 60, 6)
+    ]
+    async with AsyncSessionLocal() as session:
+        await SQLAlchemyPredictionLogRepository(session, use_rollups=True).create_many(
+            logs
+        )
+
+
+async def count(model, model_name: str) -> int:
+    async with engine.connect() as conn:
+        return (
+            await conn.execute(
+                select(func.count())
+                .select_from(model)
+                .where(model.model_name == model_name)
+            )
+        ).scalar_one()
+
+
+def test_subtract_months_clamps_day():
+    """Тест сдвига на месяцы - день обрезается до конца месяца"""
+    assert subtract_months(datetime(2025, 3, 31, 5), 1) == datetime(2025, 2, 28, 5)
+    assert subtract_months(datetime(2025, 1, 15), 13) == datetime(2023, 12, 15)
+
+
+@pytest.mark.asyncio
+async def test_retention_deletes_raw_rows_in_batches():
+    """Тест очистки - сырые строки удаляются пачками по политике модели"""
+    await seed()
+    job = RetentionJob(
+        engine,
+        RetentionPolicy(raw_days=30),
+        {"m2": RetentionPolicy(raw_days=None)},
+        batch_size=7,
+        batch_pause_ms=0,
+    )
+    hourly_before = await count(PredictionStatsHourModel, "m1")
+    deleted_before = retention_rows_deleted.value(table="prediction_logs")
+
+    planned = await job.run(now=NOW, dry_run=True)
+    report = await job.run(now=NOW)
+
+    # 60 дней по 4 лога: строго старше 30 дней - 119 логов m1
+    assert report.deleted["prediction_logs"] == planned.deleted["prediction_logs"]
+    assert report.deleted["prediction_logs"] == 119
+    assert await count(PredictionLogModel, "m1") == 121
+    assert await count(PredictionLogModel, "m2") == 240
+    assert await count(PredictionStatsMinuteModel, "m1") == 121
+    # Агрегаты живут по своей политике и переживают сырые строки
+    assert await count(PredictionStatsHourModel, "m1") == hourly_before
+    assert retention_rows_deleted.value(table="prediction_logs") - deleted_before == 119
+
+
+@pytest.mark.asyncio
+async def test_retention_expires_aggregates_and_keeps_stats():
+    """Тест очистки - статистика за старый период берется из агрегатов"""
+    await seed()
+    # Граница не совпадает с меткой лога: края читаются из сырых строк
+    old_from = NOW - timedelta(days=50)
+    old_to = NOW - timedelta(days=40, hours=1)
+
+    async with AsyncSessionLocal() as session:
+        repository = SQLAlchemyPredictionLogRepository(session, use_rollups=True)
+        expected = await repository.get_stats("m1", old_from, old_to)
+
+    job = RetentionJob(
+        engine,
+        RetentionPolicy(raw_days=30, aggregate_months=2),
+        {"m2": RetentionPolicy(raw_days=30, aggregate_months=1)},
+        batch_pause_ms=0,
+    )
+    await job.run(now=NOW)
+
+    async with AsyncSessionLocal() as session:
+        repository = SQLAlchemyPredictionLogRepository(session, use_rollups=True)
+        # Окно старше raw_days, но моложе aggregate_months: сырых строк уже нет
+        assert await repository.get_stats("m1", old_from, old_to) == expected
+        assert await repository.get_raw_stats("m1", old_from, old_to) != expected
+
+    # Часовые бакеты не старше месяца: с 30 мая 12:00 по 30 июня 12:00
+    assert await count(PredictionStatsHourModel, "m2") == 4 * 31 + 1
+
+
+@pytest.mark.asyncio
+async def test_retention_skips_pass_when_locked_or_without_rollups(caplog):
+    """Тест очистки - пропуск при занятой блокировке, сырые строки без агрегатов"""
+    await seed()
+    job = RetentionJob(engine, RetentionPolicy(raw_days=30), batch_pause_ms=0)
+
+    @asynccontextmanager
+    async def locked():
+        yield False
+
+    job._exclusive = locked
+    report = await job.run(now=NOW)
+
+    assert report.skipped is True
+    assert await count(PredictionLogModel, "m1") == 240
+
+    job = RetentionJob(
+        engine,
+        RetentionPolicy(raw_days=30, aggregate_months=1),
+        batch_pause_ms=0,
+        rollups_enabled=False,
+    )
+    with caplog.at_level(logging.WARNING):
+        report = await job.run(now=NOW)
+
+    assert "prediction_logs" not in report.deleted
+    assert await count(PredictionLogModel, "m1") == 240
+    assert "rollups are disabled" in caplog.text
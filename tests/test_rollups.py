@@ -0,0 +1,163 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from domain.entities import PredictionLog
+from infrastructure.database import AsyncSessionLocal
+from infrastructure.models import PredictionLatencyDayModel
+from infrastructure.repositories import SQLAlchemyPredictionLogRepository
+from infrastructure import rollups
+from infrastructure.rollups import (
+    SKETCH_RELATIVE_ACCURACY,
+    StatsRollups,
+    plan_ranges,
+)
+from utils.sketch import DDSketch
+
+START = datetime(2025, 6, 1, 22, 50, 0)
+
+
+async def seed(repository: SQLAlchemyPredictionLogRepository) -> list[PredictionLog]:
+    """Создать логи с неровными метками по обе стороны границ суток"""
+    rng = random.Random(42)
+    logs = [
+        PredictionLog(
+            model_name=rng.choice(["m1", "m2"]),
+            duration_ms=rng.randint(0, 1000),
+            was_successful=rng.random() > 0.2,
+            timestamp=START + timedelta(seconds=rng.randint(0, 60 * 60 * 30)),
+        )
+        for _ in range(300)
+    ]
+    return await repository.create_many(logs)
+
+
+def test_plan_ranges_covers_interval():
+    """Тест разбиения диапазона - бакеты и края покрывают его без пересечений"""
+    start = datetime(2025, 6, 1, 10, 15, 30)
+    end = datetime(2025, 6, 3, 4, 7, 10)
+
+    buckets, raw = plan_ranges(start, end)
+
+    assert buckets["day"] == [(datetime(2025, 6, 2), datetime(2025, 6, 3))]
+    assert buckets["hour"] == [
+        (datetime(2025, 6, 1, 11), datetime(2025, 6, 2)),
+        (datetime(2025, 6, 3), datetime(2025, 6, 3, 4)),
+    ]
+    assert raw == [
+        (start, datetime(2025, 6, 1, 10, 16)),
+        (datetime(2025, 6, 3, 4, 7), end),
+    ]
+
+    ranges = sorted(r for level in buckets.values() for r in level) + raw
+    ranges.sort()
+    assert ranges[0][0] == start and ranges[-1][1] == end
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+@pytest.mark.asyncio
+async def test_rollup_stats_match_raw_scan():
+    """Тест статистики по бакетам - результат совпадает с полным сканированием"""
+    async with AsyncSessionLocal() as session:
+        repository = SQLAlchemyPredictionLogRepository(session, use_rollups=True)
+        logs = await seed(repository)
+
+        windows = [
+            (START, START + timedelta(days=2)),
+            (datetime(2025, 6, 1, 23, 0, 0), datetime(2025, 6, 2, 23, 59, 59)),
+            (datetime(2025, 6, 1, 23, 17, 3, 5), datetime(2025, 6, 2, 5, 44, 1)),
+            (logs[0].timestamp, logs[0].timestamp),
+            (datetime(2025, 6, 2, 3, 0, 0), datetime(2025, 6, 2, 3, 0, 0)),
+        ]
+
+        # Удаление и изменение пересчитывают затронутые бакеты
+        await repository.delete(logs[1].id)
+        logs[2].duration_ms = 5000
+        logs[2].timestamp += timedelta(hours=3)
+        await repository.update(logs[2])
+
+        for model_name in ["m1", "m2"]:
+            for from_date, to_date in windows:
+                expected = await repository.get_raw_stats(model_name, from_date, to_date)
+                actual = await repository.get_stats(model_name, from_date, to_date)
+                assert actual == expected
+
+
+@pytest.mark.asyncio
+async def test_sketch_percentiles_close_to_exact():
+    """Тест перцентилей по скетчам - в пределах точности скетча от точных"""
+    async with AsyncSessionLocal() as session:
+        repository = SQLAlchemyPredictionLogRepository(session, use_rollups=True)
+        await seed(repository)
+
+        percentiles = [50, 90, 99]
+        from_date = datetime(2025, 6, 1, 23, 17, 3)
+        to_date = datetime(2025, 6, 2, 20, 0, 0)
+
+        estimated = await repository.get_stats("m1", from_date, to_date, percentiles)
+        exact = await repository.get_stats(
+            "m1", from_date, to_date, percentiles, exact=True
+        )
+
+        assert estimated.min_duration_ms == exact.min_duration_ms
+        assert estimated.max_duration_ms == exact.max_duration_ms
+        assert set(estimated.percentiles) == {"p50", "p90", "p99"}
+        for label, value in exact.percentiles.items():
+            assert estimated.percentiles[label] == pytest.approx(value, rel=0.03, abs=2)
+
+
+@pytest.mark.asyncio
+async def test_sketch_bins_in_sql_match_python_keys():
+    """Тест скетчей - бакеты, посчитанные в SQL, совпадают с DDSketch.key"""
+    async with AsyncSessionLocal() as session:
+        repository = SQLAlchemyPredictionLogRepository(session, use_rollups=True)
+        logs = await seed(repository)
+        # Пересчет суток после изменения идет через агрегацию в SQL
+        logs[0].duration_ms = 0
+        await repository.update(logs[0])
+
+        day = logs[0].timestamp.replace(hour=0, minute=0, second=0)
+        expected = DDSketch(SKETCH_RELATIVE_ACCURACY)
+        expected.add_all(
+            log.duration_ms
+            for log in logs
+            if log.model_name == logs[0].model_name
+            and day <= log.timestamp < day + timedelta(days=1)
+        )
+        sketch_model = PredictionLatencyDayModel
+        rows = await session.execute(
+            select(sketch_model.bin, sketch_model.count).where(
+                sketch_model.model_name == logs[0].model_name,
+                sketch_model.bucket == day,
+            )
+        )
+        assert dict(rows.all()) == expected.bins
+
+        # Окно без целых часов: все значения приходят с краев диапазона
+        start, end = datetime(2025, 6, 2, 3, 10), datetime(2025, 6, 2, 4, 50)
+        expected = DDSketch(SKETCH_RELATIVE_ACCURACY)
+        expected.add_all(
+            log.duration_ms
+            for log in logs
+            if log.model_name == "m2" and start <= log.timestamp < end
+        )
+        merged = await StatsRollups(session)._merge_sketch("m2", start, end)
+        assert merged.bins == expected.bins
+
+
+@pytest.mark.asyncio
+async def test_rollup_upsert_split_by_parameter_limit(monkeypatch):
+    """Тест upsert - строки сверх предела параметров идут несколькими выражениями"""
+    # 7 параметров на строку минутного бакета: по 2 строки в выражении
+    monkeypatch.setattr(rollups, "MAX_BIND_PARAMETERS", 14)
+    async with AsyncSessionLocal() as session:
+        repository = SQLAlchemyPredictionLogRepository(session, use_rollups=True)
+        await seed(repository)
+
+        from_date, to_date = START, START + timedelta(days=2)
+        for model_name in ["m1", "m2"]:
+            expected = await repository.get_raw_stats(model_name, from_date, to_date)
+            actual = await repository.get_stats(model_name, from_date, to_date)
+            assert actual == expected
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from infrastructure.database import engine
+from infrastructure.models import Base
+from infrastructure.schema_check import find_schema_drift
+
+PROJECT_ROOT = Path(__file__).parent.parent
+# Пустая PostgreSQL база для прогона миграций с нуля
+MIGRATIONS_DATABASE_URL = os.getenv("MIGRATIONS_DATABASE_URL")
+
+
+@pytest.mark.asyncio
+async def test_no_drift_for_created_schema():
+    """Тест сверки схемы - таблицы из метаданных совпадают с моделями"""
+    assert await find_schema_drift(engine) == []
+
+
+@pytest.mark.asyncio
+async def test_drift_is_reported(tmp_path):
+    """Тест сверки схемы - лишняя колонка видна, секции и BRIN пропускаются"""
+    scratch = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'drift.db'}")
+    async with scratch.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("ALTER TABLE prediction_logs ADD COLUMN extra TEXT"))
+        await conn.execute(text("CREATE TABLE prediction_logs_p202501 (id INTEGER)"))
+        await conn.execute(
+            text(
+                "CREATE INDEX ix_prediction_logs_timestamp_brin "
+                "ON prediction_logs (timestamp)"
+            )
+        )
+
+    try:
+        assert await find_schema_drift(scratch) == [
+            "remove_column prediction_logs.extra"
+        ]
+    finally:
+        await scratch.dispose()
+
+
+@pytest.mark.skipif(
+    MIGRATIONS_DATABASE_URL is None, reason="MIGRATIONS_DATABASE_URL is not set"
+)
+@pytest.mark.asyncio
+async def test_migrations_match_models():
+    """Тест миграций - схема после upgrade head совпадает с моделями"""
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "DATABASE_URL": MIGRATIONS_DATABASE_URL},
+        check=True,
+    )
+    migrated = create_async_engine(MIGRATIONS_DATABASE_URL)
+    try:
+        assert await find_schema_drift(migrated) == []
+    finally:
+        await migrated.dispose()
@@ -0,0 +1,60 @@
+import json
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+
+from domain.entities import PredictionLog
+from utils import serialization
+from utils.serialization import dumps
+
+RESPONSE_FIELDS = {"id", "model_name", "duration_ms", "was_successful", "timestamp"}
+
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    """Тест сериализации - без orjson результат тот же"""
+    value = {
+        "items": [
+            PredictionLog(
+                id=1,
+                model_name="модель",
+                duration_ms=5,
+                was_successful=True,
+                timestamp=datetime(2025, 6, 5, 12, 0, 0, 123456),
+            )
+        ],
+        "next_cursor": None,
+    }
+    fast = dumps(value)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(dumps(value)) == json.loads(fast)
+    assert json.loads(fast)["items"][0]["timestamp"] == "2025-06-05T12:00:00.123456"
+
+
+@pytest.mark.asyncio
+async def test_list_endpoints_keep_response_schema(client: AsyncClient):
+    """Тест быстрых ответов - поля и схема OpenAPI не меняются"""
+    data = {
+        "model_name": "apartment_price_v1",
+        "duration_ms": 124,
+        "was_successful": True,
+        "timestamp": "2025-06-09T12:00:00",
+    }
+    created = (await client.post("/api/v1/predict-log", json=data)).json()
+
+    items = (await client.get("/api/v1/predictions")).json()
+    assert items == [created]
+    assert set(items[0]) == RESPONSE_FIELDS
+
+    response = await client.get(f"/api/v1/predictions/{created['id']}")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == created
+
+    page = (await client.get("/api/v1/predictions/page")).json()
+    assert page == {"items": [created], "next_cursor": None}
+
+    paths = (await client.get("/openapi.json")).json()["paths"]
+    schema = paths["/api/v1/predictions"]["get"]["responses"]["200"]["content"][
+        "application/json"
+    ]["schema"]
+    assert schema["items"]["$ref"].endswith("/PredictionLogResponse")
@@ -0,0 +1,133 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from infrastructure.database import engine
+from serve import resolve_implementation, resolve_workers
+
+project_root = Path(__file__).parent.parent
+
+
+def test_resolve_implementation(monkeypatch):
+    """Тест выбора loop/http - auto откатывается на стандартную реализацию"""
+    monkeypatch.setattr(
+        "importlib.util.find_spec", lambda name: None if name == "uvloop" else object()
+    )
+
+    assert resolve_implementation("auto", "uvloop", "asyncio") == "asyncio"
+    assert resolve_implementation("auto", "httptools", "h11") == "httptools"
+    assert resolve_implementation("h11", "httptools", "h11") == "h11"
+    with pytest.raises(RuntimeError):
+        resolve_implementation("uvloop", "uvloop", "asyncio")
+    assert resolve_workers(3) == 3
+    assert resolve_workers(0) >= 1
+
+
+def test_fork_resets_engine_pool():
+    """Тест fork - дочерний процесс не получает пул соединений родителя"""
+    parent_pool = engine.sync_engine.pool
+
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if engine.sync_engine.pool is not parent_pool else 1)
+    _, status = os.waitpid(pid, 0)
+
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert engine.sync_engine.pool is parent_pool
+
+
+def test_serve_workers_and_graceful_stop(tmp_path):
+    """Тест serve.py - мастер форкает воркеров и плавно останавливается по SIGTERM"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{tmp_path / 'serve.db'}",
+        "SCHEMA_DRIFT_CHECK": "off",
+        "LOG_LEVEL": "WARNING",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", "2", "--port", str(port)],
+        cwd=project_root,
+        env=env,
+    )
+    children = Path(f"/proc/{process.pid}/task/{process.pid}/children")
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            assert process.poll() is None
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/health")
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        workers = children.read_text().split() if children.exists() else None
+    finally:
+        process.send_signal(signal.SIGTERM)
+        code = process.wait(timeout=30)
+
+    assert response.status_code == 200
+    assert workers is None or len(workers) == 2
+    assert code == 0
+
+
+def scrape_counter(url: str, prefix: str) -> float:
+    """Сумма сэмплов метрики, начинающихся с prefix"""
+    lines = httpx.get(f"{url}/metrics").text.splitlines()
+    values = [line.rsplit(" ", 1)[1] for line in lines if line.startswith(prefix)]
+    return sum(float(value) for value in values)
+
+
+def test_serve_metrics_sum_workers(tmp_path):
+    """Тест /metrics при двух воркерах - счетчики общие и не убывают"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{tmp_path / 'serve.db'}",
+        "SCHEMA_DRIFT_CHECK": "off",
+        "LOG_LEVEL": "WARNING",
+        "METRICS_MULTIPROCESS_DIR": str(tmp_path / "metrics"),
+        "METRICS_WRITE_INTERVAL_S": "0.1",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", "2", "--port", str(port)],
+        cwd=project_root,
+        env=env,
+    )
+    prefix = 'http_requests_total{method="GET",route="/health"'
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            assert process.poll() is None
+            try:
+                httpx.get(f"{url}/health")
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        # Каждый запрос - новое соединение: ядро раздает их обоим воркерам
+        scraped = []
+        for _ in range(30):
+            httpx.get(f"{url}/health")
+            scraped.append(scrape_counter(url, prefix))
+        time.sleep(0.5)
+        total = scrape_counter(url, prefix)
+        files = sorted(os.listdir(tmp_path / "metrics"))
+    finally:
+        process.send_signal(signal.SIGTERM)
+        code = process.wait(timeout=30)
+
+    assert scraped == sorted(scraped)
+    assert total == 31
+    assert len([name for name in files if name.endswith(".json")]) == 2
+    assert code == 0
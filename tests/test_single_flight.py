@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+class SlowQuery:
+    """Запрос, который ждет сигнала и считает свои вызовы"""
+
+    def __init__(self, result=None, error=None):
+        self.release = asyncio.Event()
+        self.calls = 0
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_query():
+    """Тест объединения - одинаковые вызовы выполняют один запрос"""
+    flight = SingleFlight()
+    query = SlowQuery(result=42)
+
+    tasks = [asyncio.create_task(flight.do("key", query)) for _ in range(50)]
+    await asyncio.sleep(0)
+    query.release.set()
+
+    assert await asyncio.gather(*tasks) == [42] * 50
+    assert query.calls == 1
+    assert flight.coalesced == 49
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_error_propagates_to_all_waiters():
+    """Тест ошибок - исключение ведущего получают все ожидающие"""
+    flight = SingleFlight()
+    query = SlowQuery(error=RuntimeError("db is down"))
+
+    tasks = [asyncio.create_task(flight.do("key", query)) for _ in range(3)]
+    await asyncio.sleep(0)
+    query.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert query.calls == 1
+
+    # Ошибка не кэшируется: следующий вызов выполняет запрос заново
+    query.error = None
+    query.result = 1
+    assert await flight.do("key", query) == 1
+    assert query.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_leader_cancellation_promotes_waiter():
+    """Тест отмены ведущего - ожидающий повторяет запрос сам"""
+    flight = SingleFlight()
+    query = SlowQuery(result="ok")
+
+    leader = asyncio.create_task(flight.do("key", query))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("key", query))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    await asyncio.sleep(0)
+    query.release.set()
+
+    assert await follower == "ok"
+    assert leader.cancelled()
+    assert query.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancellation_keeps_leader_running():
+    """Тест отмены ожидающего - общий запрос продолжает выполняться"""
+    flight = SingleFlight()
+    query = SlowQuery(result="ok")
+
+    leader = asyncio.create_task(flight.do("key", query))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("key", query))
+    await asyncio.sleep(0)
+
+    follower.cancel()
+    await asyncio.sleep(0)
+    query.release.set()
+
+    assert await leader == "ok"
+    assert follower.cancelled()
+    assert query.calls == 1
@@ -0,0 +1,132 @@
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+
+from domain.dto import PredictionStatsDTO
+from infrastructure import stats_cache
+from infrastructure.stats_cache import InMemoryStatsCache, disable_settled_ttl
+
+NOW = datetime(2025, 6, 10, 12, 0, 0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.value = 0.0
+
+    def __call__(self) -> float:
+        return self.value
+
+
+def make_stats(total: int) -> PredictionStatsDTO:
+    return PredictionStatsDTO(
+        total_requests=total, successful_requests=total, average_duration_ms=1.0
+    )
+
+
+def make_cache(**kwargs) -> tuple[InMemoryStatsCache, FakeClock]:
+    clock = FakeClock()
+    cache = InMemoryStatsCache(clock=clock, now=lambda: NOW, **kwargs)
+    return cache, clock
+
+
+def put(cache: InMemoryStatsCache, key, from_date, to_date, total=1) -> None:
+    cache.put(
+        key, make_stats(total), "m1", from_date, to_date, cache.version("m1")
+    )
+
+
+def test_ttl_short_for_recent_windows_long_for_past():
+    """Тест TTL - текущие окна истекают быстро, окна в прошлом - по длинному TTL"""
+    cache, clock = make_cache(ttl_seconds=5, settled_ttl_seconds=600)
+    put(cache, "past", datetime(2025, 6, 1), datetime(2025, 6, 2))
+    put(cache, "current", datetime(2025, 6, 10), datetime(2025, 6, 11))
+
+    clock.value = 10
+    assert cache.get("past") is not None
+    assert cache.get("current") is None
+    assert cache.snapshot()["hits"] == 1
+    assert cache.snapshot()["misses"] == 1
+
+    clock.value = 601
+    assert cache.get("past") is None
+
+
+def test_disable_settled_ttl_for_multiple_workers(monkeypatch):
+    """Тест нескольких воркеров - окна в прошлом истекают по короткому TTL"""
+    cache, clock = make_cache(ttl_seconds=5, settled_ttl_seconds=600)
+    monkeypatch.setattr(stats_cache, "stats_cache", cache)
+    disable_settled_ttl()
+    put(cache, "past", datetime(2025, 6, 1), datetime(2025, 6, 2))
+
+    clock.value = 10
+    assert cache.get("past") is None
+
+
+def test_lru_eviction():
+    """Тест LRU - при переполнении вытесняется давно не читанная запись"""
+    cache, _ = make_cache(max_entries=2)
+    put(cache, "a", datetime(2025, 6, 1), datetime(2025, 6, 2))
+    put(cache, "b", datetime(2025, 6, 1), datetime(2025, 6, 2))
+    cache.get("a")
+    put(cache, "c", datetime(2025, 6, 1), datetime(2025, 6, 2))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.snapshot()["evictions"] == 1
+
+
+def test_write_invalidates_covering_windows():
+    """Тест инвалидации - вытесняются только окна, содержащие новую метку"""
+    cache, _ = make_cache()
+    put(cache, "june1", datetime(2025, 6, 1), datetime(2025, 6, 2))
+    put(cache, "june5", datetime(2025, 6, 5), datetime(2025, 6, 6))
+
+    cache.invalidate("m1", [datetime(2025, 6, 1, 12, 0, 0)])
+    cache.invalidate("m2", [datetime(2025, 6, 5, 12, 0, 0)])
+
+    assert cache.get("june1") is None
+    assert cache.get("june5") is not None
+
+
+def test_put_skipped_after_concurrent_write():
+    """Тест гонки - результат запроса, начатого до записи, не кэшируется"""
+    cache, _ = make_cache()
+    version = cache.version("m1")
+    cache.invalidate("m1", [datetime(2025, 6, 1, 12, 0, 0)])
+
+    cache.put(
+        "stale",
+        make_stats(1),
+        "m1",
+        datetime(2025, 6, 1),
+        datetime(2025, 6, 2),
+        version,
+    )
+
+    assert cache.get("stale") is None
+
+
+@pytest.mark.asyncio
+async def test_stats_cache_invalidated_by_api_write(client: AsyncClient):
+    """Тест GET /stats - новая запись в окне сразу видна в статистике"""
+    params = {
+        "model_name": "apartment_price_v1",
+        "from_date": "2025-06-01",
+        "to_date": "2025-06-09",
+    }
+    log_data = {
+        "model_name": "apartment_price_v1",
+        "duration_ms": 100,
+        "was_successful": True,
+        "timestamp": "2025-06-05T12:00:00",
+    }
+
+    await client.post("/api/v1/predict-log", json=log_data)
+    first = await client.get("/api/v1/stats", params=params)
+    cached = await client.get("/api/v1/stats", params=params)
+    await client.post("/api/v1/predict-log", json=log_data)
+    fresh = await client.get("/api/v1/stats", params=params)
+
+    assert first.json() == cached.json()
+    assert fresh.json()["total_requests"] == 2
@@ -0,0 +1,94 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from domain.entities import PredictionLog
+from domain.exceptions import WriteBufferClosedException, WriteBufferFullException
+from infrastructure.database import AsyncSessionLocal
+from infrastructure.repositories import SQLAlchemyPredictionLogRepository
+from infrastructure.write_buffer import AsyncPredictionLogWriteBuffer
+
+
+def make_log(duration_ms: int = 100) -> PredictionLog:
+    return PredictionLog(
+        model_name="apartment_price_v1",
+        duration_ms=duration_ms,
+        was_successful=True,
+        timestamp=datetime(2025, 6, 5, 12, 0, 0),
+    )
+
+
+async def count_logs() -> int:
+    async with AsyncSessionLocal() as session:
+        return len(await SQLAlchemyPredictionLogRepository(session).get_all())
+
+
+@pytest.mark.asyncio
+async def test_accepted_mode_flushes_on_stop():
+    """Тест режима accepted - логи записываются при остановке буфера"""
+    buffer = AsyncPredictionLogWriteBuffer(
+        AsyncSessionLocal, batch_size=10, flush_interval_ms=100
+    )
+    await buffer.start()
+
+    for duration in range(25):
+        assert await buffer.submit(make_log(duration)) is None
+
+    await buffer.stop(timeout=5)
+
+    assert await count_logs() == 25
+
+
+@pytest.mark.asyncio
+async def test_durable_mode_returns_id():
+    """Тест режима durable - ответ приходит после записи с id"""
+    buffer = AsyncPredictionLogWriteBuffer(
+        AsyncSessionLocal, flush_interval_ms=5, ack_mode="durable"
+    )
+    await buffer.start()
+
+    created = await buffer.submit(make_log())
+    await buffer.stop(timeout=5)
+
+    assert created.id is not None
+    assert await count_logs() == 1
+
+
+@pytest.mark.asyncio
+async def test_durable_waiters_fail_after_drain_timeout():
+    """Тест остановки - после таймаута ожидающие получают ошибку, а не висят"""
+
+    @asynccontextmanager
+    async def slow_session():
+        await asyncio.sleep(10)
+        yield None
+
+    buffer = AsyncPredictionLogWriteBuffer(
+        slow_session, batch_size=1, flush_interval_ms=1, ack_mode="durable"
+    )
+    await buffer.start()
+    waiters = [asyncio.create_task(buffer.submit(make_log())) for _ in range(3)]
+    await asyncio.sleep(0.05)
+
+    await buffer.stop(timeout=0.05)
+    results = await asyncio.wait_for(
+        asyncio.gather(*waiters, return_exceptions=True), 1
+    )
+
+    assert all(isinstance(r, WriteBufferClosedException) for r in results)
+    assert buffer.queue_size() == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects():
+    """Тест переполнения - в режиме reject лишние логи отклоняются"""
+    buffer = AsyncPredictionLogWriteBuffer(AsyncSessionLocal, max_queue_size=2)
+    # Без фонового сброса очередь не разгружается
+    buffer._closed = False
+
+    await buffer.submit(make_log())
+    await buffer.submit(make_log())
+    with pytest.raises(WriteBufferFullException):
+        await buffer.submit(make_log())
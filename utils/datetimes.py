@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+# Метки времени хранятся в БД как naive UTC (timestamp without time zone);
+# к этому виду они приводятся один раз на границе API
+
+
+def utcnow() -> datetime:
+    """Текущее время в naive UTC"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Привести метку к naive UTC; naive метки считаются заданными в UTC"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def parse_utc(value: str) -> datetime:
+    """Разобрать дату в формате ISO 8601 и привести к naive UTC"""
+    return to_utc_naive(datetime.fromisoformat(value))
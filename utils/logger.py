@@ -1,29 +1,234 @@
+import atexit
+import copy
 import logging
-from typing import Optional
+import os
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Hashable, Optional, Tuple
 
 from config import settings
+from utils.metrics import Counter
+from utils.serialization import dumps
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO if not settings.debug else logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+logger = logging.getLogger(__name__)
+
+# Идентификатор HTTP-запроса; ставится middleware и виден во всех логах запроса
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+log_records_dropped = Counter(
+    "log_records_dropped_total", "Записи лога, отброшенные при полной очереди"
+)
+log_records_suppressed = Counter(
+    "log_records_suppressed_total", "Повторы записей лога, подавленные лимитом"
 )
 
-logger = logging.getLogger(__name__)
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Служебные атрибуты LogRecord не попадают в JSON как поля
+_RECORD_ATTRIBUTES = {"message", "dedup_key", *logging.makeLogRecord({}).__dict__}
+_JSON_TYPES = (str, int, float, bool, list, dict)
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись: время UTC, уровень, сообщение и поля"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        created = datetime.fromtimestamp(record.created, timezone.utc)
+        entry: Dict[str, Any] = {
+            "timestamp": created.isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key in _RECORD_ATTRIBUTES or value is None:
+                continue
+            entry[key] = value if isinstance(value, _JSON_TYPES) else str(value)
+        if record.exc_info:
+            # Трейсбек рендерится в потоке записи, а не в обработчике запроса
+            entry["exception"] = self.formatException(record.exc_info)
+        return dumps(entry).decode()
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавить к записи идентификатор текущего запроса"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Не больше burst одинаковых записей за окно; о подавленных сообщает следующая.
+
+    Одинаковыми считаются записи с общим шаблоном сообщения (или dedup_key),
+    поэтому сообщения нужно передавать шаблоном с аргументами, а не f-строкой.
+    Ограничиваются только предупреждения, ошибки и записи с dedup_key: у
+    рутинных INFO и журнала доступа uvicorn шаблон один на все строки.
+    """
+
+    def __init__(
+        self,
+        burst: int,
+        window_seconds: float,
+        max_keys: int = 10000,
+        clock=time.monotonic,
+        min_level: int = logging.WARNING,
+        exempt_loggers: Tuple[str, ...] = ("uvicorn.access",),
+    ):
+        super().__init__()
+        self.burst = burst
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self.min_level = min_level
+        self.exempt_loggers = exempt_loggers
+        self._clock = clock
+        # Ключ -> (начало окна, записей в окне, подавлено в окне)
+        self._windows: Dict[Hashable, Tuple[float, int, int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0 or record.name in self.exempt_loggers:
+            return True
+        dedup_key = getattr(record, "dedup_key", None)
+        if dedup_key is None and record.levelno < self.min_level:
+            return True
+        key = dedup_key or (
+            record.name,
+            record.levelno,
+            str(record.msg),
+        )
+        now = self._clock()
+        with self._lock:
+            started, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.window:
+                started, count = now, 0
+            if count >= self.burst:
+                self._windows[key] = (started, count, suppressed + 1)
+                log_records_suppressed.inc()
+                return False
+            if len(self._windows) >= self.max_keys and key not in self._windows:
+                # Ограничиваем память при потоке уникальных сообщений
+                self._windows.clear()
+            self._windows[key] = (started, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Кладет записи в ограниченную очередь и никогда не ждет писателя"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Аргументы подставляются сразу: к моменту записи объекты могут измениться.
+        # JSON и трейсбек формируются в потоке QueueListener.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def _stream_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def _start_listener() -> None:
+    global _listener
+    _queue_handler.queue = queue.Queue(maxsize=settings.log_queue_size)
+    _listener = QueueListener(_queue_handler.queue, _stream_handler())
+    _listener.start()
+
+
+def configure_logging() -> None:
+    """Направить логи приложения и uvicorn через очередь в фоновый поток"""
+    global _queue_handler
+    level = settings.log_level or ("DEBUG" if settings.debug else "INFO")
+    _queue_handler = NonBlockingQueueHandler(queue.Queue())
+    _queue_handler.addFilter(RequestIdFilter())
+    _queue_handler.addFilter(
+        RateLimitFilter(settings.log_rate_limit_burst, settings.log_rate_limit_window_s)
+    )
+    _start_listener()
+
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(level)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        # Логи uvicorn тоже не должны писаться синхронно из event loop
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    atexit.register(stop_logging)
+    # Поток писателя не переживает fork: в дочернем процессе запускаем новый
+    os.register_at_fork(after_in_child=_start_listener)
+
+
+def stop_logging() -> None:
+    """Дописать очередь и остановить поток записи"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+configure_logging()
+
+
+def log_error(
+    error: Exception,
+    context: Optional[str] = None,
+    traceback: bool = True,
+    **fields: Any,
+) -> None:
+    """Логирует ошибку для отладки без раскрытия деталей пользователю.
+
+    traceback=False - для ожидаемых ошибок клиента, где трейсбек бесполезен.
+    """
+    context = context or "unknown context"
+    logger.error(
+        "Error in %s: %s",
+        context,
+        error,
+        exc_info=(type(error), error, error.__traceback__) if traceback else None,
+        extra={
+            "context": context,
+            "error_type": type(error).__name__,
+            "dedup_key": ("error", context, type(error).__name__),
+            **fields,
+        },
+    )
 
 
-def log_error(error: Exception, context: Optional[str] = None) -> None:
-    """Логирует ошибку для отладки без раскрытия деталей пользователю"""
-    error_message = f"Error in {context or 'unknown context'}: {str(error)}"
-    logger.error(error_message, exc_info=True)
+def log_warning(message: str, *args: Any, **fields: Any) -> None:
+    """Логирует предупреждение; args подставляются, только если уровень включен"""
+    logger.warning(message, *args, extra=fields)
 
 
-def log_info(message: str) -> None:
+def log_info(message: str, *args: Any, **fields: Any) -> None:
     """Логирует информационное сообщение"""
-    logger.info(message)
+    logger.info(message, *args, extra=fields)
 
 
-def log_debug(message: str) -> None:
+def log_debug(message: str, *args: Any, **fields: Any) -> None:
     """Логирует отладочное сообщение"""
-    if settings.debug:
-        logger.debug(message)
+    logger.debug(message, *args, extra=fields)
@@ -0,0 +1,433 @@
+import bisect
+import fcntl
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Границы бакетов в секундах: от долей миллисекунды до десятков секунд
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+# Имя сэмпла, метки и значение в формате экспозиции Prometheus
+Sample = Tuple[str, LabelKey, float]
+# Имя метрики, описание, тип и сэмплы
+Family = Tuple[str, str, str, List[Sample]]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Registry:
+    """Набор метрик процесса для экспозиции в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric) -> None:
+        """Добавить метрику; имена должны быть уникальны"""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def unregister(self, metric) -> None:
+        """Убрать метрику из экспозиции"""
+        with self._lock:
+            self._metrics.pop(metric.name, None)
+
+    def collect(self) -> List[Family]:
+        """Текущие значения всех метрик"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [
+            (metric.name, metric.help, metric.kind, metric.collect())
+            for metric in metrics
+        ]
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате 0.0.4"""
+        return render_families(self.collect())
+
+
+registry = Registry()
+
+
+def render_families(families: List[Family]) -> str:
+    """Метрики в текстовом формате 0.0.4"""
+    lines: List[str] = []
+    for name, help, kind, samples in families:
+        lines.append(f"# HELP {name} {_escape_help(help)}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample_name, labels, value in samples:
+            labels_text = _format_labels(labels)
+            lines.append(f"{sample_name}{labels_text} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def merge_families(sources: List[List[Family]]) -> List[Family]:
+    """Сложить одноименные сэмплы метрик нескольких процессов"""
+    merged: Dict[str, Tuple[str, str, Dict[Tuple[str, LabelKey], float]]] = {}
+    for families in sources:
+        for name, help, kind, samples in families:
+            _, _, values = merged.setdefault(name, (help, kind, {}))
+            for sample_name, labels, value in samples:
+                key = (sample_name, labels)
+                values[key] = values.get(key, 0) + value
+    return [
+        (name, help, kind, [(sample, key, v) for (sample, key), v in values.items()])
+        for name, (help, kind, values) in merged.items()
+    ]
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _HistogramSeries:
+    """Счетчики бакетов и сумма для одного набора меток"""
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами бакетов (как в Prometheus)"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = registry,
+    ):
+        self.name = name
+        self.help = help
+        self.bounds = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, _HistogramSeries] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Учесть наблюдение для набора меток"""
+        index = bisect.bisect_left(self.bounds, value)
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.bounds) + 1)
+            series.counts[index] += 1
+            series.sum += value
+
+    @property
+    def count(self) -> int:
+        """Число наблюдений по всем наборам меток"""
+        with self._lock:
+            return sum(sum(series.counts) for series in self._series.values())
+
+    def snapshot(self, **labels: str) -> Dict[str, object]:
+        """Кумулятивные счетчики по бакетам, сумма и количество"""
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            counts = list(series.counts) if series else [0] * (len(self.bounds) + 1)
+            total = series.sum if series else 0.0
+        return self._cumulative(counts, total)
+
+    def collect(self) -> List[Sample]:
+        """Сэмплы _bucket, _sum и _count по всем наборам меток"""
+        with self._lock:
+            series = [
+                (key, list(s.counts), s.sum) for key, s in sorted(self._series.items())
+            ]
+
+        samples: List[Sample] = []
+        for key, counts, total in series:
+            snapshot = self._cumulative(counts, total)
+            for bound, cumulative in snapshot["buckets"].items():
+                bucket_key = key + (("le", bound),)
+                samples.append((f"{self.name}_bucket", bucket_key, cumulative))
+            samples.append((f"{self.name}_sum", key, total))
+            samples.append((f"{self.name}_count", key, snapshot["count"]))
+        return samples
+
+    def _cumulative(self, counts: List[int], total: float) -> Dict[str, object]:
+        buckets: Dict[str, int] = {}
+        cumulative = 0
+        for bound, bucket_count in zip(self.bounds, counts):
+            cumulative += bucket_count
+            buckets[f"{bound:g}"] = cumulative
+        buckets["+Inf"] = cumulative + counts[-1]
+        return {"count": buckets["+Inf"], "sum": total, "buckets": buckets}
+
+    def reset(self) -> None:
+        """Обнулить гистограмму"""
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """Монотонный счетчик с необязательными метками"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, registry: Optional[Registry] = registry):
+        self.name = name
+        self.help = help
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Увеличить счетчик для набора меток"""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Текущее значение для набора меток"""
+        return self._values.get(_label_key(labels), 0)
+
+    def snapshot(self) -> Dict[LabelKey, float]:
+        """Значения по всем наборам меток"""
+        with self._lock:
+            return dict(self._values)
+
+    def collect(self) -> List[Sample]:
+        values = sorted(self.snapshot().items())
+        return [(self.name, key, value) for key, value in values]
+
+
+class Gauge(Counter):
+    """Значение, которое может расти и убывать (запросы в работе, размер очереди)"""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        """Уменьшить значение для набора меток"""
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        """Установить значение для набора меток"""
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class CallbackMetric:
+    """Метрика, значение которой читается из объекта в момент экспозиции.
+
+    Подходит для счетчиков, которые уже ведут пул, кэш или single-flight:
+    функция возвращает число или словарь {метки: значение}.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        func: Callable[[], Union[float, Dict[LabelKey, float], None]],
+        kind: str = "gauge",
+        registry: Optional[Registry] = registry,
+    ):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self._func = func
+        if registry is not None:
+            registry.register(self)
+
+    def collect(self) -> List[Sample]:
+        value = self._func()
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            return [(self.name, key, v) for key, v in sorted(value.items())]
+        return [(self.name, (), value)]
+
+
+class MetricsDirectory:
+    """Файлы метрик воркеров: /metrics любого воркера отдает сумму по всем.
+
+    Каждый воркер периодически перезаписывает свой файл <pid>.json. Перед
+    экспозицией воркер сохраняет свои значения, поэтому значение каждого файла
+    только растет и сумма счетчиков монотонна, какой бы воркер ни ответил.
+    Счетчики и гистограммы завершившихся воркеров переносятся в архив, их
+    gauge больше не учитываются.
+    """
+
+    ARCHIVE = "archive.json"
+
+    def __init__(
+        self,
+        path: str,
+        write_interval_s: float = 1.0,
+        registry: Registry = registry,
+    ):
+        self.path = path
+        self.write_interval_s = write_interval_s
+        self.registry = registry
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def clear(self) -> None:
+        """Создать каталог и удалить файлы прошлого запуска"""
+        os.makedirs(self.path, exist_ok=True)
+        with self._locked(fcntl.LOCK_EX):
+            for name in os.listdir(self.path):
+                if name.endswith((".json", ".tmp")):
+                    os.remove(os.path.join(self.path, name))
+
+    def start(self) -> None:
+        """Сохранять метрики процесса в фоновом потоке"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Остановить поток и сохранить итоговые значения процесса"""
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+    def write(self) -> None:
+        """Сохранить текущие значения процесса в его файл"""
+        path = self._file(os.getpid())
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.registry.collect(), file)
+        # Читатели видят либо старый файл целиком, либо новый
+        os.replace(temporary, path)
+
+    def collect(self) -> List[Family]:
+        """Сумма метрик всех воркеров, включая свои текущие значения"""
+        self.write()
+        with self._locked(fcntl.LOCK_SH):
+            sources = [
+                self._read(os.path.join(self.path, name))
+                for name in sorted(os.listdir(self.path))
+                if name.endswith(".json")
+            ]
+        return merge_families(sources)
+
+    def render(self) -> str:
+        """Сумма метрик всех воркеров в текстовом формате 0.0.4"""
+        return render_families(self.collect())
+
+    def mark_process_dead(self, pid: int) -> None:
+        """Перенести счетчики и гистограммы завершившегося воркера в архив"""
+        path = self._file(pid)
+        archive = os.path.join(self.path, self.ARCHIVE)
+        with self._locked(fcntl.LOCK_EX):
+            if not os.path.exists(path):
+                return
+            families = [
+                family for family in self._read(path) if family[2] != "gauge"
+            ]
+            merged = merge_families([self._read(archive), families])
+            temporary = f"{archive}.tmp"
+            with open(temporary, "w") as file:
+                json.dump(merged, file)
+            os.replace(temporary, archive)
+            os.remove(path)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.write_interval_s):
+            self.write()
+
+    def _file(self, pid: int) -> str:
+        return os.path.join(self.path, f"{pid}.json")
+
+    @staticmethod
+    def _read(path: str) -> List[Family]:
+        try:
+            with open(path) as file:
+                families = json.load(file)
+        except FileNotFoundError:
+            return []
+        return [
+            (
+                name,
+                help,
+                kind,
+                [
+                    (sample, tuple(tuple(label) for label in labels), value)
+                    for sample, labels, value in samples
+                ],
+            )
+            for name, help, kind, samples in families
+        ]
+
+    @contextmanager
+    def _locked(self, operation: int) -> Iterator[None]:
+        # Архивирование не должно попасть между чтениями файлов
+        with open(os.path.join(self.path, ".lock"), "a") as lock:
+            fcntl.flock(lock, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+shared_metrics: Optional[MetricsDirectory] = None
+
+
+def enable_shared_metrics(path: str, write_interval_s: float) -> MetricsDirectory:
+    """Суммировать метрики воркеров через файлы в каталоге path"""
+    global shared_metrics
+    shared_metrics = MetricsDirectory(path, write_interval_s)
+    shared_metrics.clear()
+    return shared_metrics
+
+
+def get_shared_metrics() -> Optional[MetricsDirectory]:
+    """Общий каталог метрик или None в однопроцессном режиме"""
+    return shared_metrics
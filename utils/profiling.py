@@ -0,0 +1,109 @@
+import cProfile
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+
+@dataclass
+class RequestProfile:
+    """Отметки времени одного запроса для разбивки по фазам"""
+
+    started: float = field(default_factory=time.perf_counter)
+    handler_started: Optional[float] = None
+    handler_finished: Optional[float] = None
+    db_seconds: float = 0.0
+    db_queries: int = 0
+    # Ответы, собранные прямо в обработчике, сериализуются до его завершения
+    render_in_handler: float = 0.0
+
+    def add_query(self, seconds: float) -> None:
+        """Учесть выполненный SQL-запрос"""
+        self.db_seconds += seconds
+        self.db_queries += 1
+
+    def add_render(self, seconds: float) -> None:
+        """Учесть сериализацию тела ответа"""
+        if self.handler_started is not None and self.handler_finished is None:
+            self.render_in_handler += seconds
+
+    def phases(self, now: float) -> Dict[str, float]:
+        """Фазы в миллисекундах: разбор запроса, use case, БД, сериализация"""
+        handler_started = self.handler_started or now
+        handler_finished = self.handler_finished or now
+        handler = handler_finished - handler_started
+        use_case = handler - self.db_seconds - self.render_in_handler
+        return {
+            "validation": (handler_started - self.started) * 1000,
+            "use_case": max(use_case, 0) * 1000,
+            "db": self.db_seconds * 1000,
+            "serialization": (now - handler_finished + self.render_in_handler) * 1000,
+            "total": (now - self.started) * 1000,
+        }
+
+    def server_timing(self, now: float) -> str:
+        """Значение заголовка Server-Timing"""
+        metrics = []
+        for name, duration in self.phases(now).items():
+            metric = f"{name};dur={duration:.2f}"
+            if name == "db":
+                metric += f';desc="{self.db_queries} queries"'
+            metrics.append(metric)
+        return ", ".join(metrics)
+
+
+# Профиль текущего запроса; None, если профилирование не запрошено
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+class ProfileSampler:
+    """Выборочный захват cProfile для запросов к выбранным маршрутам.
+
+    Профилировщик Python один на процесс, поэтому одновременно пишется только
+    один профиль. В него попадают и другие корутины, которые event loop
+    выполнял во время запроса.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        output_dir: str,
+        routes: Sequence[str] = (),
+        rng: Optional[random.Random] = None,
+    ):
+        self.rate = rate
+        self.output_dir = Path(output_dir)
+        self.routes = set(routes)
+        self._rng = rng or random.Random()
+        self._busy = threading.Lock()
+
+    def start(self, route: str) -> Optional[cProfile.Profile]:
+        """Начать захват, если запрос попал в выборку и профилировщик свободен"""
+        if self.rate <= 0 or (self.routes and route not in self.routes):
+            return None
+        if self._rng.random() >= self.rate or not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop(self, profiler: cProfile.Profile) -> None:
+        """Остановить захват; вызывается в том же потоке, что и start"""
+        try:
+            profiler.disable()
+        finally:
+            self._busy.release()
+
+    def save(self, profiler: cProfile.Profile, method: str, route: str) -> Path:
+        """Сохранить профиль для pstats/snakeviz"""
+        name = re.sub(r"[^A-Za-z0-9]+", "_", f"{method}_{route}").strip("_")
+        path = self.output_dir / f"{name}_{time.time_ns() // 1_000_000}.prof"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        return path
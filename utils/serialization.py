@@ -0,0 +1,29 @@
+import dataclasses
+import json
+from datetime import datetime
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - зависит от окружения
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Сериализация типов, которых нет в stdlib json"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value):
+        # Поверхностно: поля сущностей - простые значения
+        return value.__dict__
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Сериализовать в JSON-байты: orjson, если установлен, иначе stdlib json"""
+    if orjson is not None:
+        # orjson напрямую кодирует dataclass и datetime без промежуточных dict
+        return orjson.dumps(value)
+    return json.dumps(
+        value, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """Ведущий запрос отменен, ожидающие должны повторить вызов сами"""
+
+
+class SingleFlight:
+    """Объединение одинаковых конкурентных вызовов в один.
+
+    Первый вызов с ключом (ведущий) выполняет функцию, остальные ждут его
+    результат или исключение. Если ведущего отменили, его отмена не передается
+    ожидающим: один из них становится новым ведущим и повторяет вызов.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        """Число выполняющихся сейчас вызовов"""
+        return len(self._calls)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Выполнить func или дождаться уже выполняющегося вызова с тем же ключом"""
+        while True:
+            future = self._calls.get(key)
+            if future is None:
+                return await self._lead(key, func)
+
+            self.coalesced += 1
+            try:
+                # shield: отмена ожидающего не должна отменять общий результат
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                continue
+
+    async def _lead(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.leaders += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self._fail(future, _LeaderCancelled())
+            raise
+        except BaseException as e:
+            self._fail(future, e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    @staticmethod
+    def _fail(future: asyncio.Future, error: BaseException) -> None:
+        future.set_exception(error)
+        # Без ожидающих исключение никто не прочитает: помечаем его полученным
+        future.exception()
@@ -0,0 +1,66 @@
+import math
+from typing import Dict, Iterable, Mapping, Optional
+
+# Ключ для нулевых значений: лог-бакеты определены только для положительных
+ZERO_KEY = -(2**31)
+
+
+class DDSketch:
+    """Квантильный скетч с гарантированной относительной точностью (DDSketch).
+
+    Значения раскладываются по логарифмическим бакетам; скетчи объединяются
+    сложением счетчиков бакетов, поэтому их можно хранить и сливать в SQL.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.count = 0
+
+    def key(self, value: float) -> int:
+        """Ключ бакета для значения"""
+        if value < 0:
+            raise ValueError("DDSketch accepts only non-negative values")
+        if value == 0:
+            return ZERO_KEY
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def value(self, key: int) -> float:
+        """Представитель бакета с относительной ошибкой не больше заданной"""
+        if key == ZERO_KEY:
+            return 0.0
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Добавить значение"""
+        key = self.key(value)
+        self.bins[key] = self.bins.get(key, 0) + count
+        self.count += count
+
+    def add_all(self, values: Iterable[float]) -> None:
+        """Добавить несколько значений"""
+        for value in values:
+            self.add(value)
+
+    def merge_bins(self, bins: Mapping[int, int]) -> None:
+        """Слить счетчики бакетов другого скетча"""
+        for key, count in bins.items():
+            self.bins[key] = self.bins.get(key, 0) + int(count)
+            self.count += int(count)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля q из [0, 1]"""
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be within [0, 1]")
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(max(self.bins))